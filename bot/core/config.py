@@ -13,9 +13,76 @@ WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # полный внешний URL веб
 WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
 WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
 WEBAPP_PORT = int(os.getenv("PORT", os.getenv("WEBAPP_PORT", "8080")))
+# Секрет из заголовка X-Telegram-Bot-Api-Secret-Token (опционально)
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+
+# tg_id админов через запятую — им доступны служебные команды (/recount_bets и т.п.).
+ADMIN_IDS = frozenset(
+    int(value) for value in os.getenv("ADMIN_IDS", "").replace(",", " ").split()
+)
+
+
+def _env_int(name: str) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else None
+
+
+def _env_bool(name: str) -> bool | None:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return None
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Профиль подключения к БД: serverless / long_running / pooler
+# (см. bot/database/engine_profiles.py). По умолчанию — long_running для bot.server;
+# деплой облачной функции (.sourcecraft/ci.yaml) задаёт serverless.
+# Отдельные параметры можно переопределить.
+DB_ENGINE_PROFILE = os.getenv("DB_ENGINE_PROFILE", "long_running")
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE")
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW")
+DB_POOL_TIMEOUT = _env_int("DB_POOL_TIMEOUT")
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE")
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING")
+DB_IDLE_TIMEOUT = _env_int("DB_IDLE_TIMEOUT")
+DB_STATEMENT_CACHE_SIZE = _env_int("DB_STATEMENT_CACHE_SIZE")
+DB_CONNECT_TIMEOUT = _env_int("DB_CONNECT_TIMEOUT")
+
+# Счётчики SQL на апдейт (bot/database/sql_stats.py): печатать итоги каждого апдейта
+# и/или только тех, что сделали больше SQL_STATEMENT_BUDGET стейтментов.
+SQL_STATS_LOG = bool(_env_bool("SQL_STATS_LOG"))
+SQL_STATEMENT_BUDGET = _env_int("SQL_STATEMENT_BUDGET")
+
+# Журнал медленных запросов и хендлеров (bot/core/profiler.py), JSON‑строки в stdout.
+SLOW_SQL_MS = _env_int("SLOW_SQL_MS") or 250
+SLOW_HANDLER_MS = _env_int("SLOW_HANDLER_MS") or 1500
+# Доля медленных запросов, для которых в фоне снимается EXPLAIN (ANALYZE, BUFFERS); 0 — выключено.
+SLOW_SQL_EXPLAIN_SAMPLE = float(os.getenv("SLOW_SQL_EXPLAIN_SAMPLE") or 0)
+
+# Метрики (bot/core/metrics.py): путь Prometheus в режиме сервера (пусто — выключено)
+# и период JSON‑снимка в облачной функции, в секундах (0 — выключено).
+METRICS_PATH = os.getenv("METRICS_PATH", "/metrics")
+METRICS_DUMP_INTERVAL = _env_int("METRICS_DUMP_INTERVAL")
+if METRICS_DUMP_INTERVAL is None:
+    METRICS_DUMP_INTERVAL = 300
+
+# Трассировка апдейтов (bot/core/tracing.py): доля трассируемых апдейтов (0 — выключено),
+# файл для JSON‑строк спанов (необязательно) и размер кольцевого буфера в памяти.
+TRACE_SAMPLE = float(os.getenv("TRACE_SAMPLE") or 0)
+TRACE_FILE = os.getenv("TRACE_FILE")
+TRACE_BUFFER_SIZE = _env_int("TRACE_BUFFER_SIZE") or 200
+
+# Цитаты Бетов: API для фоновой докачки и локальный корпус (bot/data/quotes.txt по умолчанию).
+QUOTE_API_URL = os.getenv("QUOTE_API_URL", "https://api.quotable.io/quotes/random")
+QUOTES_FILE = os.getenv("QUOTES_FILE")
+# Полностью офлайн: только локальный корпус, без запросов в сеть.
+QUOTES_OFFLINE = bool(_env_bool("QUOTES_OFFLINE"))
 
 if not TOKEN:
     raise ValueError("TOKEN/BOT_TOKEN не найден")
 if not DATABASE_URL:
-    raise ValueError("DATABASE_URL (строка подключения к БД) не найдена")
+    raise ValueError(
+        "DATABASE_URL (строка подключения к БД) не найдена: "
+        "postgresql+asyncpg://… или для локальных прогонов sqlite+aiosqlite:///beth.db"
+    )
 
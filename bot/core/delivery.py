@@ -0,0 +1,284 @@
+import asyncio
+import html
+import time
+from typing import Any, Dict, List
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    CopyMessage,
+    ForwardMessage,
+    SendAnimation,
+    SendDocument,
+    SendMessage,
+    SendPhoto,
+    SendSticker,
+    SendVideo,
+)
+from aiogram.methods.base import TelegramMethod, TelegramType
+
+from bot.core.cache import LRUCache
+from bot.core.metrics import bot_api_duration, bot_api_errors
+from bot.core.tracing import trace_span
+
+# Глобальный лимит Telegram — около 30 сообщений в секунду на бота.
+GLOBAL_RATE_PER_SECOND = 30.0
+GLOBAL_BURST = 30
+# В личный чат — около одного сообщения в секунду (короткие всплески допустимы).
+PRIVATE_CHAT_RATE_PER_SECOND = 1.0
+# В группу — не больше 20 сообщений в минуту.
+GROUP_CHAT_RATE_PER_SECOND = 20 / 60
+CHAT_BURST = 5
+CHAT_BUCKETS_SIZE = 10_000
+CHAT_BUCKET_TTL_SECONDS = 10 * 60
+
+# Сколько раз повторять запрос после 429 и сколько максимум ждать retry_after.
+MAX_RETRIES = 3
+MAX_RETRY_AFTER_SECONDS = 30
+
+# Максимальная длина текста сообщения в Telegram.
+MESSAGE_MAX_LENGTH = 4096
+
+# Отправка этих методов расходует лимиты на сообщения.
+RATE_LIMITED_METHODS = (
+    SendMessage,
+    SendPhoto,
+    SendAnimation,
+    SendDocument,
+    SendSticker,
+    SendVideo,
+    CopyMessage,
+    ForwardMessage,
+)
+
+
+class TokenBucket:
+    """
+    Token bucket с резервированием: каждый вызов reserve() забирает токен
+    (баланс может уйти в минус) и возвращает, сколько секунд подождать.
+    Блокировки не нужны — всё происходит в одном event loop.
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+
+        delay = max(0.0, self.blocked_until - now)
+        if self.tokens < 0:
+            delay = max(delay, -self.tokens / self.rate)
+        return delay
+
+    def block(self, seconds: float) -> None:
+        """Telegram ответил 429 — не отправляем ничего до истечения retry_after."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+_global_bucket = TokenBucket(GLOBAL_RATE_PER_SECOND, GLOBAL_BURST)
+_chat_buckets = LRUCache(CHAT_BUCKETS_SIZE, ttl=CHAT_BUCKET_TTL_SECONDS)
+
+
+def _chat_bucket(chat_id: int | str) -> TokenBucket:
+    bucket = _chat_buckets.get(chat_id)
+    if bucket is None:
+        is_group = isinstance(chat_id, str) or chat_id < 0
+        rate = GROUP_CHAT_RATE_PER_SECOND if is_group else PRIVATE_CHAT_RATE_PER_SECOND
+        bucket = TokenBucket(rate, CHAT_BURST)
+    # Обновляем TTL при каждом обращении.
+    _chat_buckets.set(chat_id, bucket)
+    return bucket
+
+
+class DeliveryMiddleware(BaseRequestMiddleware):
+    """
+    Request‑middleware сессии бота: соблюдает глобальный и поштучный (на чат)
+    лимиты отправки сообщений и повторяет запрос после 429 Too Many Requests.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ):
+        chat_id = getattr(method, "chat_id", None)
+        limited = isinstance(method, RATE_LIMITED_METHODS) and chat_id is not None
+
+        attempt = 0
+        while True:
+            if limited:
+                delay = max(_chat_bucket(chat_id).reserve(), _global_bucket.reserve())
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if attempt > MAX_RETRIES or e.retry_after > MAX_RETRY_AFTER_SECONDS:
+                    raise
+
+                if chat_id is not None:
+                    _chat_bucket(chat_id).block(e.retry_after)
+                else:
+                    _global_bucket.block(e.retry_after)
+                print(
+                    f"> 429 на {type(method).__name__} (chat_id={chat_id}), "
+                    f"повтор через {e.retry_after} с"
+                )
+                if not limited:
+                    await asyncio.sleep(e.retry_after)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Request‑middleware сессии бота: длительность и ошибки каждого запроса
+    к Bot API по методам. Регистрируется последним, поэтому видит каждую
+    реальную попытку (включая повторы после 429), но не ответы, ушедшие
+    в теле вебхука.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ):
+        api_method = method.__api_method__
+        started_at = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            bot_api_errors.inc(api_method, type(e).__name__)
+            raise
+        finally:
+            bot_api_duration.observe(time.perf_counter() - started_at, api_method)
+
+
+class ApiTracingMiddleware(BaseRequestMiddleware):
+    """Request‑middleware сессии бота: спан трассировки на каждый запрос к Bot API."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ):
+        with trace_span(method.__api_method__, "bot_api", chat_id=getattr(method, "chat_id", None)):
+            return await make_request(bot, method)
+
+
+class Outbox:
+    """
+    Исходящие сообщения одного апдейта.
+
+    Хендлер складывает сообщения через send(), а после коммита транзакции
+    они отправляются: подряд идущие сообщения в один чат склеиваются в одно,
+    разные чаты обслуживаются параллельно.
+    """
+
+    def __init__(self) -> None:
+        self._messages: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def send(
+        self,
+        chat_id: int,
+        text: str,
+        parse_mode: str | None = None,
+        reply_markup: Any = None,
+    ) -> None:
+        self._messages.append(
+            {
+                "chat_id": chat_id,
+                "text": text,
+                "parse_mode": parse_mode,
+                "reply_markup": reply_markup,
+            }
+        )
+
+    def clear(self) -> None:
+        self._messages.clear()
+
+    def _coalesced(self) -> Dict[int, List[Dict[str, Any]]]:
+        by_chat: Dict[int, List[Dict[str, Any]]] = {}
+        for message in self._messages:
+            queue = by_chat.setdefault(message["chat_id"], [])
+            merged = _merge(queue[-1], message) if queue else None
+            if merged is not None:
+                queue[-1] = merged
+            else:
+                queue.append(dict(message))
+        return by_chat
+
+    async def flush(self, bot: Bot) -> int:
+        """
+        Отправить накопленные сообщения. Ошибки отправки только логируются:
+        к этому моменту изменения в БД уже зафиксированы.
+        Возвращает количество фактически отправленных сообщений.
+        """
+        if not self._messages:
+            return 0
+
+        by_chat = self._coalesced()
+        self._messages.clear()
+
+        results = await asyncio.gather(
+            *(_send_chat(bot, chat_id, queue) for chat_id, queue in by_chat.items())
+        )
+        return sum(results)
+
+
+def _merge(first: Dict[str, Any], second: Dict[str, Any]) -> Dict[str, Any] | None:
+    """
+    Склеить два сообщения в одно, если это ничего не ломает:
+    у первого нет клавиатуры, режимы разметки совместимы и текст влезает в лимит.
+    """
+    if first["reply_markup"] is not None:
+        return None
+
+    modes = {first["parse_mode"], second["parse_mode"]}
+    if len(modes) == 1:
+        parse_mode = first["parse_mode"]
+        first_text, second_text = first["text"], second["text"]
+    elif modes == {None, "HTML"}:
+        # Простой текст безопасно превращается в HTML через экранирование.
+        parse_mode = "HTML"
+        first_text = first["text"] if first["parse_mode"] else html.escape(first["text"])
+        second_text = second["text"] if second["parse_mode"] else html.escape(second["text"])
+    else:
+        return None
+
+    text = f"{first_text}\n\n{second_text}"
+    if len(text) > MESSAGE_MAX_LENGTH:
+        return None
+
+    return {
+        "chat_id": first["chat_id"],
+        "text": text,
+        "parse_mode": parse_mode,
+        "reply_markup": second["reply_markup"],
+    }
+
+
+async def _send_chat(bot: Bot, chat_id: int, queue: List[Dict[str, Any]]) -> int:
+    sent = 0
+    for message in queue:
+        try:
+            await bot.send_message(**message)
+            sent += 1
+        except Exception as e:
+            # Например, пользователь заблокировал бота.
+            print(f"> !Не удалось отправить сообщение в чат {chat_id}: {e!r}")
+    return sent
@@ -0,0 +1,80 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import IntegrityError
+
+from bot.core.cache import LRUCache
+from bot.database.models.base import async_session
+from bot.database.models.processed_update import ProcessedUpdate
+from bot.database.sql_stats import track_sql
+
+# Первый уровень — update_id, уже виденные этим инстансом.
+SEEN_UPDATES_LRU_SIZE = 10_000
+# Telegram ретраит недоставленный апдейт не дольше суток.
+PROCESSED_UPDATE_TTL = timedelta(hours=24)
+# Как часто (не чаще) чистить устаревшие строки processed_updates.
+PRUNE_INTERVAL_SECONDS = 600
+
+_seen_updates = LRUCache(SEEN_UPDATES_LRU_SIZE)
+_last_prune_at: float | None = None
+
+
+@track_sql()
+async def claim_update(update_id: int) -> bool:
+    """
+    Застолбить апдейт за текущим вызовом.
+
+    Возвращает True, если апдейт новый и его нужно обработать,
+    и False, если это повторная доставка уже принятого апдейта.
+    """
+    global _last_prune_at
+
+    if update_id in _seen_updates:
+        return False
+    # Отмечаем до INSERT, чтобы параллельная доставка того же апдейта
+    # в этот же инстанс не дошла до БД; при сбое отметку снимаем.
+    _seen_updates.set(update_id, True)
+
+    async with async_session() as session:
+        try:
+            await session.execute(
+                insert(ProcessedUpdate).values(update_id=update_id)
+            )
+
+            now = time.monotonic()
+            if _last_prune_at is None or now - _last_prune_at >= PRUNE_INTERVAL_SECONDS:
+                _last_prune_at = now
+                await session.execute(
+                    delete(ProcessedUpdate).where(
+                        ProcessedUpdate.processed_at
+                        < datetime.now(timezone.utc) - PROCESSED_UPDATE_TTL
+                    )
+                )
+
+            await session.commit()
+        except IntegrityError:
+            # Апдейт уже принял другой инстанс (или этот — до перезапуска).
+            await session.rollback()
+            return False
+        except Exception:
+            # Апдейт не застолблён (обрыв соединения, таймаут пула) —
+            # ретрай от Telegram должен обработаться, а не отброситься.
+            _seen_updates.pop(update_id)
+            raise
+
+    return True
+
+
+async def release_update(update_id: int) -> None:
+    """
+    Снять отметку с апдейта, обработка которого упала с ошибкой,
+    чтобы ретрай от Telegram не был отброшен как дубликат.
+    """
+    _seen_updates.pop(update_id)
+
+    async with async_session() as session:
+        await session.execute(
+            delete(ProcessedUpdate).where(ProcessedUpdate.update_id == update_id)
+        )
+        await session.commit()
@@ -1,5 +1,14 @@
 from aiogram import Bot, Dispatcher
 from bot.core.config import TOKEN
+from bot.core.delivery import ApiMetricsMiddleware, ApiTracingMiddleware, DeliveryMiddleware
+from bot.core.webhook_reply import WebhookReplyMiddleware
 
 dispathcer = Dispatcher()
-bot = Bot(token=TOKEN)
\ No newline at end of file
+bot = Bot(token=TOKEN)
+# Первый ответ апдейта — в теле ответа вебхука, без отдельного запроса.
+bot.session.middleware(WebhookReplyMiddleware())
+# Лимиты отправки и повтор после 429 — для всех запросов бота.
+bot.session.middleware(DeliveryMiddleware())
+# Длительность и ошибки запросов к Bot API — см. bot/core/metrics.py.
+bot.session.middleware(ApiMetricsMiddleware())
+bot.session.middleware(ApiTracingMiddleware())
@@ -0,0 +1,295 @@
+"""
+Метрики процесса: счётчики и гистограммы в памяти.
+
+Без внешних зависимостей: в режиме сервера отдаются в текстовом формате
+Prometheus (METRICS_PATH, см. bot/server.py), в облачной функции —
+периодически печатаются JSON‑строкой (`dump_metrics_if_due`).
+
+Что меряем:
+- длительность и ошибки хендлеров по роутерам (модуль хендлера) и хендлерам;
+- исходы сервисов по `reason` из их результата (`count_outcomes`);
+- ожидание соединения из пула БД и число занятых соединений;
+- длительность и ошибки запросов к Bot API по методам.
+"""
+import bisect
+import functools
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple, TypeVar
+
+from bot.core import config
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+
+    def _key(self, label_values: Tuple[Any, ...]) -> Tuple[str, ...]:
+        if len(label_values) != len(self.labels):
+            raise ValueError(f"{self.name}: ожидались метки {self.labels}, получено {label_values}")
+        return tuple(str(value) for value in label_values)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: Any, amount: float = 1.0) -> None:
+        key = self._key(label_values)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {value:g}")
+        return lines
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [
+            {"labels": dict(zip(self.labels, key)), "value": value}
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *label_values: Any, value: float) -> None:
+        self._values[self._key(label_values)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Для каждой комбинации меток: счётчики по корзинам (+Inf последней), сумма.
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *label_values: Any) -> None:
+        key = self._key(label_values)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = series
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def _quantile(self, counts: List[int], q: float) -> float | None:
+        count = sum(counts)
+        if not count:
+            return None
+        threshold = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts[:-1]):
+            cumulative += bucket_count
+            if cumulative >= threshold:
+                return self.buckets[index]
+        return float("inf")
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels + ("le",), key + (f"{bound:g}",))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            cumulative += counts[-1]
+            labels = _format_labels(self.labels + ("le",), key + ("+Inf",))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total[0]:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        # Квантили — верхние границы корзин, этого достаточно, чтобы увидеть хвосты.
+        return [
+            {
+                "labels": dict(zip(self.labels, key)),
+                "count": sum(counts),
+                "sum": round(total[0], 6),
+                "p50": self._quantile(counts, 0.5),
+                "p95": self._quantile(counts, 0.95),
+                "p99": self._quantile(counts, 0.99),
+            }
+            for key, (counts, total) in sorted(self._series.items())
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _register(self, metric: _Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Функция, которая обновляет gauge'и прямо перед выгрузкой."""
+        self._collectors.append(collector)
+
+    def _collect(self) -> None:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"> !Ошибка сбора метрик: {e!r}")
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus 0.0.4."""
+        self._collect()
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._collect()
+        result: Dict[str, Any] = {}
+        for name, metric in self._metrics.items():
+            samples = metric.snapshot()
+            if samples:
+                result[name] = samples
+        return result
+
+
+registry = MetricsRegistry()
+
+handler_duration = registry.histogram(
+    "beth_handler_duration_seconds",
+    "Длительность хендлеров aiogram",
+    ("router", "handler"),
+)
+handler_errors = registry.counter(
+    "beth_handler_errors_total",
+    "Исключения в хендлерах aiogram",
+    ("router", "handler"),
+)
+service_outcomes = registry.counter(
+    "beth_service_outcomes_total",
+    "Исходы игровых сервисов по reason из результата",
+    ("service", "outcome"),
+)
+db_pool_checkout = registry.histogram(
+    "beth_db_pool_checkout_seconds",
+    "Ожидание соединения из пула БД (включая открытие нового)",
+)
+db_pool_checked_out = registry.gauge(
+    "beth_db_pool_checked_out",
+    "Соединения БД, выданные из пула прямо сейчас",
+)
+db_connections_opened = registry.counter(
+    "beth_db_connections_opened_total",
+    "Открытые соединения БД",
+)
+bot_api_duration = registry.histogram(
+    "beth_bot_api_duration_seconds",
+    "Длительность запросов к Bot API",
+    ("method",),
+)
+bot_api_errors = registry.counter(
+    "beth_bot_api_errors_total",
+    "Ошибки запросов к Bot API",
+    ("method", "error"),
+)
+
+
+def count_outcomes(service: str) -> Callable[[F], F]:
+    """
+    Декоратор сервиса, который возвращает dict с `ok`/`reason`:
+    считает исходы — `ok`, значение `reason` или `error` при исключении.
+    """
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                service_outcomes.inc(service, "error")
+                raise
+
+            outcome = "ok"
+            if isinstance(result, dict):
+                outcome = result.get("reason") or ("ok" if result.get("ok", True) else "failed")
+            service_outcomes.inc(service, outcome)
+            return result
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+_last_dump_at = time.monotonic()
+
+
+def dump_metrics_if_due(force: bool = False) -> bool:
+    """Напечатать снимок метрик JSON‑строкой раз в METRICS_DUMP_INTERVAL секунд."""
+    global _last_dump_at
+
+    interval = config.METRICS_DUMP_INTERVAL
+    if not interval and not force:
+        return False
+    if not force and time.monotonic() - _last_dump_at < interval:
+        return False
+
+    _last_dump_at = time.monotonic()
+    record = {
+        "ts": datetime.now(timezone.utc).isoformat(),
+        "kind": "metrics",
+        "metrics": registry.snapshot(),
+    }
+    print(json.dumps(record, ensure_ascii=False, default=str))
+    return True
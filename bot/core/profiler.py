@@ -0,0 +1,149 @@
+"""
+Журнал медленных запросов и хендлеров.
+
+Каждая запись — одна JSON‑строка в stdout (её забирают логи функции/сервера):
+
+- `slow_sql`     — запрос дольше SLOW_SQL_MS: нормализованный текст, форма
+                   параметров (только типы, без значений) и область, из
+                   которой он выполнен (хендлер / сервис, см. sql_stats.py);
+- `slow_handler` — хендлер дольше SLOW_HANDLER_MS вместе с его счётчиками SQL;
+- `sql_explain`  — план `EXPLAIN (ANALYZE, BUFFERS)` для доли SLOW_SQL_EXPLAIN_SAMPLE
+                   медленных запросов. Снимается в фоне, на отдельном соединении
+                   и в транзакции, которая откатывается, — только для Postgres.
+"""
+import asyncio
+import json
+import random
+import re
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from sqlalchemy import event
+
+from bot.core import config
+from bot.database.sql_stats import current_scopes
+
+MAX_STATEMENT_LENGTH = 2000
+# Одновременно снимаем не больше стольких планов, остальные пропускаем.
+MAX_PENDING_EXPLAINS = 2
+
+_PLACEHOLDER = r"(?:\$\d+|\?|%\(\w+\)s|:\w+)"
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+_VALUES_ROWS = re.compile(r"(VALUES\s*\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+_explaining: ContextVar[bool] = ContextVar("profiler_explaining", default=False)
+_explain_tasks: set = set()
+
+
+def emit(kind: str, **fields: Any) -> None:
+    record = {"ts": datetime.now(timezone.utc).isoformat(), "kind": kind, **fields}
+    print(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def normalize_statement(statement: str) -> str:
+    """Свернуть пробелы и списки плейсхолдеров, чтобы одинаковые запросы совпадали."""
+    text = _WHITESPACE.sub(" ", statement).strip()
+    text = _PLACEHOLDER_LIST.sub("(...)", text)
+    text = _VALUES_ROWS.sub(r"\1", text)
+    return text[:MAX_STATEMENT_LENGTH]
+
+
+def _value_shape(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return [_value_shape(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _value_shape(item) for key, item in value.items()}
+    return type(value).__name__
+
+
+def parameter_shape(parameters: Any, executemany: bool) -> Any:
+    """Форма параметров без значений: типы, для executemany — ещё и число строк."""
+    if executemany and isinstance(parameters, (list, tuple)):
+        return {
+            "rows": len(parameters),
+            "row": _value_shape(parameters[0]) if parameters else None,
+        }
+    return _value_shape(parameters)
+
+
+def _issuer() -> Dict[str, Any]:
+    scopes = current_scopes()
+    handler = next((name for name in scopes if name.startswith("handler:")), None)
+    return {"handler": handler, "scope": scopes[-1] if scopes else None}
+
+
+async def _explain(async_engine, statement: str, parameters: Any) -> None:
+    token = _explaining.set(True)
+    try:
+        async with async_engine.connect() as conn:
+            trans = await conn.begin()
+            try:
+                result = await conn.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters
+                )
+                plan = result.scalar()
+            finally:
+                # ANALYZE выполняет запрос по‑настоящему — изменения не сохраняем.
+                await trans.rollback()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        emit("sql_explain", statement=normalize_statement(statement), plan=plan)
+    except Exception as e:
+        emit("sql_explain_failed", statement=normalize_statement(statement), error=repr(e))
+    finally:
+        _explaining.reset(token)
+
+
+def _schedule_explain(async_engine, statement: str, parameters: Any) -> None:
+    if len(_explain_tasks) >= MAX_PENDING_EXPLAINS:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_explain(async_engine, statement, parameters))
+    _explain_tasks.add(task)
+    task.add_done_callback(_explain_tasks.discard)
+
+
+def install_slow_sql_log(async_engine) -> None:
+    """Подписать журнал медленных запросов на события движка."""
+    sync_engine = async_engine.sync_engine
+    can_explain = sync_engine.dialect.name == "postgresql"
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _on_cursor_start(conn, cursor, statement, parameters, context, executemany):
+        conn.info["slow_sql_started_at"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _on_cursor_end(conn, cursor, statement, parameters, context, executemany):
+        started_at = conn.info.pop("slow_sql_started_at", None)
+        if started_at is None or _explaining.get():
+            return
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+        if elapsed_ms < config.SLOW_SQL_MS:
+            return
+
+        emit(
+            "slow_sql",
+            ms=round(elapsed_ms, 3),
+            statement=normalize_statement(statement),
+            params=parameter_shape(parameters, executemany),
+            **_issuer(),
+        )
+        if (
+            can_explain
+            and not executemany
+            and config.SLOW_SQL_EXPLAIN_SAMPLE > 0
+            and random.random() < config.SLOW_SQL_EXPLAIN_SAMPLE
+        ):
+            _schedule_explain(async_engine, statement, parameters)
+
+
+async def wait_for_explains() -> None:
+    """Дождаться фоновых EXPLAIN перед остановкой процесса."""
+    if _explain_tasks:
+        await asyncio.gather(*list(_explain_tasks), return_exceptions=True)
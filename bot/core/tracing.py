@@ -0,0 +1,237 @@
+"""
+Трассировка апдейтов без внешнего коллектора.
+
+Один корневой спан на апдейт (`start_trace` в bot/main.py), внутри — спаны
+middleware, хендлера и сервисов (области sql_stats.py), каждого SQL‑запроса
+и каждого запроса к Bot API. Решение о записи принимается один раз на
+апдейт (TRACE_SAMPLE), поэтому без трассировки дочерние спаны почти ничего
+не стоят.
+
+Готовые трассы попадают в кольцевой буфер в памяти (`recent_traces()`)
+и, если задан TRACE_FILE, — JSON‑строками (по строке на спан) в файл.
+Флейм‑чарт: `python -m bot.core.tracing trace.jsonl -o chrome.json`
+и открыть результат в Perfetto / chrome://tracing / speedscope.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List
+
+from sqlalchemy import event
+
+from bot.core import config
+
+MAX_SQL_NAME_LENGTH = 200
+
+_WHITESPACE = re.compile(r"\s+")
+
+_current: ContextVar["Span | None"] = ContextVar("trace_span", default=None)
+_recent: Deque[List[Dict[str, Any]]] = deque(maxlen=config.TRACE_BUFFER_SIZE)
+_trace_file = None
+
+
+def _new_id() -> str:
+    return os.urandom(8).hex()
+
+
+class _Trace:
+    __slots__ = ("trace_id", "wall_start_us", "perf_start", "spans")
+
+    def __init__(self) -> None:
+        self.trace_id = _new_id()
+        self.wall_start_us = time.time_ns() // 1000
+        self.perf_start = time.perf_counter()
+        self.spans: List["Span"] = []
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "attrs", "started_at", "duration", "error")
+
+    def __init__(self, trace: _Trace, parent_id: str | None, name: str, kind: str, attrs: Dict[str, Any]) -> None:
+        self.trace = trace
+        self.span_id = _new_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attrs = attrs
+        self.started_at = time.perf_counter()
+        self.duration: float | None = None
+        self.error: str | None = None
+
+    def finish(self, error: BaseException | None = None) -> None:
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self.started_at
+        if error is not None:
+            self.error = type(error).__name__
+        self.trace.spans.append(self)
+
+    def as_dict(self) -> Dict[str, Any]:
+        trace = self.trace
+        return {
+            "trace_id": trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "ts_us": trace.wall_start_us + int((self.started_at - trace.perf_start) * 1_000_000),
+            "dur_us": int((self.duration or 0.0) * 1_000_000),
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+
+def _export(trace: _Trace) -> None:
+    global _trace_file
+
+    records = [span.as_dict() for span in trace.spans]
+    _recent.append(records)
+    if not config.TRACE_FILE:
+        return
+    try:
+        if _trace_file is None:
+            _trace_file = open(config.TRACE_FILE, "a", encoding="utf-8")
+        for record in records:
+            _trace_file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        _trace_file.flush()
+    except OSError as e:
+        print(f"> !Не удалось записать трассу: {e!r}")
+
+
+@contextmanager
+def start_trace(name: str, kind: str = "update", **attrs: Any) -> Iterator["Span | None"]:
+    """Корневой спан; записывается с вероятностью TRACE_SAMPLE."""
+    if config.TRACE_SAMPLE <= 0 or random.random() >= config.TRACE_SAMPLE:
+        yield None
+        return
+
+    trace = _Trace()
+    span = Span(trace, None, name, kind, attrs)
+    token = _current.set(span)
+    error = None
+    try:
+        yield span
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        span.finish(error)
+        _current.reset(token)
+        _export(trace)
+
+
+def start_span(name: str, kind: str, **attrs: Any) -> "Span | None":
+    """
+    Дочерний спан без смены текущего — для событий вроде SQL, где начало
+    и конец приходят разными колбэками. Закрывается вызовом `finish()`.
+    """
+    parent = _current.get()
+    if parent is None:
+        return None
+    return Span(parent.trace, parent.span_id, name, kind, attrs)
+
+
+@contextmanager
+def trace_span(name: str, kind: str, **attrs: Any) -> Iterator["Span | None"]:
+    """Дочерний спан на блок кода; вне трассы ничего не делает."""
+    span = start_span(name, kind, **attrs)
+    if span is None:
+        yield None
+        return
+
+    token = _current.set(span)
+    error = None
+    try:
+        yield span
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        span.finish(error)
+        _current.reset(token)
+
+
+def recent_traces() -> List[List[Dict[str, Any]]]:
+    """Последние TRACE_BUFFER_SIZE трасс, каждая — список спанов."""
+    return list(_recent)
+
+
+def clear_traces() -> None:
+    _recent.clear()
+
+
+def install_sql_tracing(sync_engine) -> None:
+    """Спан на каждый запрос к БД (по выполнению курсора)."""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _on_cursor_start(conn, cursor, statement, parameters, context, executemany):
+        name = _WHITESPACE.sub(" ", statement).strip()[:MAX_SQL_NAME_LENGTH]
+        span = start_span(name, "sql")
+        if span is not None:
+            if executemany:
+                span.attrs["rows"] = len(parameters)
+            conn.info["trace_span"] = span
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _on_cursor_end(conn, cursor, statement, parameters, context, executemany):
+        span = conn.info.pop("trace_span", None)
+        if span is not None:
+            span.finish()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _on_error(exception_context):
+        conn = exception_context.connection
+        span = conn.info.pop("trace_span", None) if conn is not None else None
+        if span is not None:
+            span.finish(exception_context.original_exception)
+
+
+def to_chrome_trace(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Спаны → формат Chrome Trace Event (одна «нить» на трассу)."""
+    threads: Dict[str, int] = {}
+    events = []
+    for record in records:
+        tid = threads.setdefault(record["trace_id"], len(threads) + 1)
+        args = dict(record.get("attrs") or {})
+        if record.get("error"):
+            args["error"] = record["error"]
+        events.append(
+            {
+                "name": record["name"],
+                "cat": record["kind"],
+                "ph": "X",
+                "ts": record["ts_us"],
+                "dur": record["dur_us"],
+                "pid": 1,
+                "tid": tid,
+                "args": args,
+            }
+        )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Трассы BETH (JSON‑строки) → Chrome Trace Event")
+    parser.add_argument("trace_file")
+    parser.add_argument("-o", "--output", default="-")
+    args = parser.parse_args()
+
+    with open(args.trace_file, encoding="utf-8") as source:
+        records = [json.loads(line) for line in source if line.strip()]
+
+    result = json.dumps(to_chrome_trace(records), ensure_ascii=False)
+    if args.output == "-":
+        print(result)
+    else:
+        with open(args.output, "w", encoding="utf-8") as target:
+            target.write(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Ответ в теле вебхука.
+
+Telegram позволяет вернуть в HTTP‑ответе на вебхук один вызов Bot API —
+он выполняется без отдельного запроса от бота к api.telegram.org.
+Пока апдейт обрабатывается, первый подходящий вызов откладывается в «слот»,
+а хендлеру возвращается заглушка. Если в тот же чат уходит ещё один вызов,
+отложенный сначала отправляется обычным запросом — порядок сообщений
+сохраняется. Что осталось в слоте к концу апдейта, уходит в теле ответа.
+"""
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import (
+    AnswerCallbackQuery,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    SendMessage,
+)
+from aiogram.methods.base import TelegramMethod, TelegramType
+from aiogram.types import Chat, Message
+
+# Вызовы, результат которых хендлеру не нужен (или заменяется заглушкой).
+REPLY_METHODS = (
+    SendMessage,
+    AnswerCallbackQuery,
+    EditMessageText,
+    EditMessageReplyMarkup,
+)
+
+
+class ReplySlot:
+    """Место под один отложенный вызов Bot API на время обработки апдейта."""
+
+    def __init__(self) -> None:
+        self.method: TelegramMethod | None = None
+        self.chat_id: int | None = None
+        self.enabled = True
+
+    def take(self) -> TelegramMethod | None:
+        method, self.method, self.chat_id = self.method, None, None
+        return method
+
+    def payload(self, bot: Bot) -> Dict[str, Any] | None:
+        """JSON‑тело ответа вебхука с отложенным вызовом (или None)."""
+        method = self.take()
+        if method is None:
+            return None
+
+        files: Dict[str, Any] = {}
+        body: Dict[str, Any] = {"method": method.__api_method__}
+        for key, value in method.model_dump(warnings=False).items():
+            value = bot.session.prepare_value(value, bot=bot, files=files)
+            if value is not None:
+                body[key] = value
+        return body
+
+
+_slot: ContextVar[ReplySlot | None] = ContextVar("webhook_reply_slot", default=None)
+
+
+def open_reply_slot() -> ReplySlot:
+    slot = ReplySlot()
+    _slot.set(slot)
+    return slot
+
+
+def close_reply_slot() -> None:
+    _slot.set(None)
+
+
+def skip_webhook_reply() -> None:
+    """
+    Отключить ответ в теле вебхука для текущего апдейта.
+    Нужно хендлерам, которые используют результат отправки (например, message_id).
+    """
+    slot = _slot.get()
+    if slot is not None:
+        slot.enabled = False
+
+
+def _placeholder(bot: Bot, method: TelegramMethod) -> Any:
+    if isinstance(method, SendMessage):
+        # Настоящий message_id станет известен только Telegram.
+        return Message(
+            message_id=0,
+            date=datetime.now(timezone.utc),
+            chat=Chat(id=method.chat_id, type="private" if method.chat_id > 0 else "group"),
+            text=method.text,
+        ).as_(bot)
+    return True
+
+
+class WebhookReplyMiddleware(BaseRequestMiddleware):
+    """Request‑middleware сессии бота: откладывает первый ответ апдейта в слот."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ):
+        slot = _slot.get()
+        if slot is None or not slot.enabled:
+            return await make_request(bot, method)
+
+        chat_id = getattr(method, "chat_id", None)
+
+        if slot.method is not None and slot.chat_id == chat_id:
+            # Новый вызов в тот же чат: отложенный должен уйти раньше него.
+            held = slot.take()
+            await make_request(bot, held)
+
+        eligible = isinstance(method, REPLY_METHODS) and (
+            chat_id is None or isinstance(chat_id, int)
+        )
+        if slot.method is None and eligible:
+            slot.method = method
+            slot.chat_id = chat_id
+            return _placeholder(bot, method)
+
+        return await make_request(bot, method)
@@ -0,0 +1,179 @@
+import hashlib
+import time
+from typing import Any, Dict
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+
+import bot.database.models  # noqa: F401 — регистрируем все модели в Base.metadata
+from bot.database.models.base import Base, engine
+from bot.database.models.schema import SchemaVersion
+from bot.database.request.inventory import reconcile_inventory_counters
+
+# Ключ advisory‑блокировки Postgres, под которой выполняется DDL.
+# Любое стабильное 64‑битное число; здесь — байты "BETH".
+SCHEMA_LOCK_KEY = 0x42455448
+SCHEMA_ROW_ID = 1
+
+# Старые индексы, которые заменены составными/частичными
+# из __table_args__ моделей; на существующих БД их удаляем.
+SUPERSEDED_INDEXES = (
+    "ix_bets_owner_id",
+    "ix_merge_sessions_player1_id",
+    "ix_merge_sessions_player2_id",
+    "ix_merge_sessions_status",
+    "ix_bets_in_lab",
+)
+
+
+def schema_fingerprint() -> str:
+    """
+    Хеш объявленной схемы: DDL всех таблиц и индексов в диалекте текущего движка.
+    Меняется при любом изменении моделей, влияющем на CREATE TABLE / CREATE INDEX.
+    """
+    dialect = engine.dialect
+    hasher = hashlib.sha256()
+    for table in Base.metadata.sorted_tables:
+        hasher.update(str(CreateTable(table).compile(dialect=dialect)).encode("utf-8"))
+        for index in sorted(table.indexes, key=lambda idx: idx.name or ""):
+            hasher.update(str(CreateIndex(index).compile(dialect=dialect)).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def _add_missing_columns(sync_conn: Connection) -> None:
+    """
+    create_all не трогает уже существующие таблицы, поэтому новые колонки
+    моделей добавляем сами через ALTER TABLE ... ADD COLUMN.
+    Новые колонки должны быть nullable или иметь server_default.
+    """
+    inspector = inspect(sync_conn)
+    existing_tables = set(inspector.get_table_names())
+    preparer = sync_conn.dialect.identifier_preparer
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_ddl = CreateColumn(column).compile(dialect=sync_conn.dialect)
+            sync_conn.execute(
+                text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {column_ddl}")
+            )
+            print(f"> Добавлена колонка {table.name}.{column.name}")
+
+
+def _sync_indexes(sync_conn: Connection) -> None:
+    """
+    create_all не создаёт индексы у существующих таблиц — добавляем новые
+    индексы моделей и удаляем заменённые ими старые.
+    """
+    inspector = inspect(sync_conn)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            index.create(sync_conn)
+            print(f"> Добавлен индекс {index.name}")
+
+    for name in SUPERSEDED_INDEXES:
+        sync_conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+async def _read_fingerprint(conn: AsyncConnection) -> str | None:
+    return await conn.scalar(
+        select(SchemaVersion.fingerprint).where(SchemaVersion.id == SCHEMA_ROW_ID)
+    )
+
+
+async def _apply_schema(conn: AsyncConnection, fingerprint: str) -> bool:
+    """
+    Применить DDL внутри уже открытой транзакции.
+    Возвращает True, если схема действительно обновлялась.
+    """
+    if conn.dialect.name == "postgresql":
+        # Транзакционная блокировка: параллельные холодные старты ждут здесь,
+        # а отпускается она автоматически при COMMIT/ROLLBACK.
+        await conn.execute(
+            text("SELECT pg_advisory_xact_lock(:key)"),
+            {"key": SCHEMA_LOCK_KEY},
+        )
+
+    await conn.run_sync(SchemaVersion.__table__.create, checkfirst=True)
+
+    # Пока мы ждали блокировку, схему мог обновить соседний инстанс.
+    current = await _read_fingerprint(conn)
+    if current == fingerprint:
+        return False
+
+    await conn.run_sync(Base.metadata.create_all)
+    await conn.run_sync(_add_missing_columns)
+    await conn.run_sync(_sync_indexes)
+
+    # Новые денормализованные колонки приходят нулями — сверяем со строками.
+    repaired = await reconcile_inventory_counters(conn)
+    if repaired:
+        print(f"> Счётчики инвентаря исправлены у {repaired} игроков")
+
+    if current is None:
+        await conn.execute(
+            SchemaVersion.__table__.insert().values(
+                id=SCHEMA_ROW_ID,
+                fingerprint=fingerprint,
+            )
+        )
+    else:
+        await conn.execute(
+            SchemaVersion.__table__.update()
+            .where(SchemaVersion.id == SCHEMA_ROW_ID)
+            .values(fingerprint=fingerprint)
+        )
+    return True
+
+
+async def ensure_schema() -> Dict[str, Any]:
+    """
+    Убедиться, что схема БД соответствует моделям.
+
+    Быстрый путь — один SELECT отпечатка. DDL выполняется только если отпечаток
+    отличается (или таблицы ещё нет), и только одним инстансом за раз.
+    """
+    started = time.perf_counter()
+    fingerprint = schema_fingerprint()
+
+    current = None
+    try:
+        async with engine.connect() as conn:
+            current = await _read_fingerprint(conn)
+    except DBAPIError:
+        # Таблицы schema_version ещё нет — первый запуск на пустой БД.
+        current = None
+
+    migrated = False
+    if current != fingerprint:
+        async with engine.begin() as conn:
+            migrated = await _apply_schema(conn, fingerprint)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(
+        f"> Схема БД проверена за {elapsed_ms:.1f} мс "
+        f"({'DDL применён' if migrated else 'без DDL'})"
+    )
+
+    return {
+        "ok": True,
+        "migrated": migrated,
+        "fingerprint": fingerprint,
+        "elapsed_ms": elapsed_ms,
+    }
@@ -0,0 +1,148 @@
+"""
+Различия диалектов БД в одном месте.
+
+Прод работает на Postgres (asyncpg), локальные прогоны и бенчмарки — на SQLite
+(aiosqlite): в памяти (`sqlite+aiosqlite://`) или в файле с WAL
+(`sqlite+aiosqlite:///beth.db`). Всё, что зависит от диалекта — драйвер по
+умолчанию, пул и PRAGMA, часовые пояса, upsert, RETURNING, SKIP LOCKED, —
+закрыто маленькими адаптерами ниже, а запросы и сервисы их просто вызывают.
+"""
+import ssl
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.sql import sqltypes
+
+# Драйвер по умолчанию для URL без явного "+driver".
+_ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def normalize_url(database_url: str) -> URL:
+    """
+    URL с асинхронным драйвером: строки вида `postgres://…` (как их выдают
+    Neon/Heroku) и `sqlite:///…` превращаются в asyncpg/aiosqlite.
+    """
+    url = make_url(database_url)
+    if "+" not in url.drivername and url.drivername in _ASYNC_DRIVERS:
+        url = url.set(drivername=_ASYNC_DRIVERS[url.drivername])
+    return url
+
+
+def is_sqlite(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite"
+
+
+def is_sqlite_memory(url: URL) -> bool:
+    database = url.database or ""
+    return database in ("", ":memory:") or "mode=memory" in database
+
+
+def sqlite_connect_args(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Аргументы aiosqlite: писатели ждут друг друга до connect_timeout секунд
+    вместо немедленного «database is locked», а соединение можно отдавать
+    из пула в поток драйвера.
+    """
+    return {"timeout": profile["connect_timeout"], "check_same_thread": False}
+
+
+def postgres_connect_args(url: URL) -> Dict[str, Any]:
+    """
+    Облачные Postgres (Neon и т.п.) требуют TLS, поэтому по умолчанию он включён.
+    Если режим задан в самом URL (`?ssl=disable` для локальной базы) — не трогаем.
+    """
+    if "ssl" in url.query or "sslmode" in url.query:
+        return {}
+    return {"ssl": ssl.create_default_context()}
+
+
+def install_sqlite_pragmas(sync_engine, memory: bool) -> None:
+    """PRAGMA на каждое новое соединение SQLite."""
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        if not memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+
+class _UtcDateTime(sqlite.DATETIME):
+    """
+    DateTime(timezone=True) для SQLite: сам SQLite часовых поясов не хранит
+    и возвращает «наивные» datetime, а код сравнивает их с
+    datetime.now(timezone.utc). Пишем всегда в UTC, читаем — с tzinfo=UTC,
+    как это делает asyncpg.
+    """
+
+    def bind_processor(self, dialect):
+        process = super().bind_processor(dialect)
+        if not self.timezone:
+            return process
+
+        def convert(value):
+            if isinstance(value, datetime) and value.tzinfo is not None:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            return process(value)
+
+        return convert
+
+    def result_processor(self, dialect, coltype):
+        process = super().result_processor(dialect, coltype)
+        if not self.timezone:
+            return process
+
+        def convert(value):
+            value = process(value)
+            if value is not None and value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            return value
+
+        return convert
+
+
+def install_sqlite_datetimes(sync_engine) -> None:
+    """Подменить тип DateTime у диалекта этого движка (до первого запроса)."""
+    dialect = sync_engine.dialect
+    dialect.colspecs = {**dialect.colspecs, sqltypes.DateTime: _UtcDateTime}
+
+
+def dialect_name(bind) -> str:
+    """Имя диалекта сессии, соединения или движка (sync или async)."""
+    if hasattr(bind, "get_bind"):
+        bind = bind.get_bind()
+    return bind.dialect.name
+
+
+def insert_on_conflict(bind_or_name, table):
+    """INSERT с `on_conflict_do_*` для текущего диалекта."""
+    name = bind_or_name if isinstance(bind_or_name, str) else dialect_name(bind_or_name)
+    return postgresql.insert(table) if name == "postgresql" else sqlite.insert(table)
+
+
+def skip_locked(stmt, bind_or_name, of=None):
+    """
+    `FOR UPDATE [OF …] SKIP LOCKED` там, где он есть. SQLite блокирует всю
+    базу на запись и строк не блокирует, поэтому запрос остаётся как есть:
+    параллельные писатели и так выстраиваются в очередь.
+    """
+    name = bind_or_name if isinstance(bind_or_name, str) else dialect_name(bind_or_name)
+    if name == "postgresql":
+        return stmt.with_for_update(skip_locked=True, of=of)
+    return stmt
+
+
+def supports_update_returning(bind) -> bool:
+    """UPDATE … RETURNING: Postgres и SQLite 3.35+."""
+    if hasattr(bind, "get_bind"):
+        bind = bind.get_bind()
+    return bool(bind.dialect.update_returning)
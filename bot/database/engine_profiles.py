@@ -0,0 +1,212 @@
+import time
+import uuid
+from typing import Any, Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, StaticPool
+
+from bot.core.metrics import db_connections_opened, db_pool_checked_out, db_pool_checkout, registry
+from bot.database.dialect import is_sqlite, is_sqlite_memory, sqlite_connect_args
+
+# Профили подключения к БД (выбираются через DB_ENGINE_PROFILE):
+#
+# - serverless   — инстанс функции живёт минуты и обрабатывает апдейты по одному.
+#                  Держим 1–2 соединения между тёплыми вызовами; после заморозки
+#                  инстанса соединение могло умереть, поэтому «старые по простою»
+#                  соединения меняем на новые без лишнего SELECT 1.
+# - long_running — постоянный процесс (bot.server): обычный пул на десяток соединений.
+# - pooler       — подключение через PgBouncer / Neon pooler в transaction‑режиме:
+#                  серверные prepared statements между транзакциями не живут,
+#                  поэтому кэш asyncpg выключен, а имена стейтментов уникальны.
+ENGINE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "serverless": {
+        "pool_size": 1,
+        "max_overflow": 2,
+        "pool_timeout": 10,
+        "pool_recycle": 300,
+        "pool_pre_ping": False,
+        "idle_timeout": 60,
+        "statement_cache_size": 100,
+        "connect_timeout": 5,
+    },
+    "long_running": {
+        "pool_size": 10,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": False,
+        "idle_timeout": 300,
+        "statement_cache_size": 100,
+        "connect_timeout": 10,
+    },
+    "pooler": {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 30,
+        "pool_recycle": 600,
+        "pool_pre_ping": False,
+        "idle_timeout": 120,
+        "statement_cache_size": 0,
+        "connect_timeout": 10,
+    },
+}
+DEFAULT_ENGINE_PROFILE = "long_running"
+
+
+class PoolStats:
+    """Счётчики пула: сколько ждали соединение, сколько открыли новых и т.п."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.connects = 0
+        self.idle_recycles = 0
+        self.invalidations = 0
+
+    def observe_wait(self, elapsed_ms: float) -> None:
+        self.checkouts += 1
+        self.wait_total_ms += elapsed_ms
+        db_pool_checkout.observe(elapsed_ms / 1000)
+        if elapsed_ms > self.wait_max_ms:
+            self.wait_max_ms = elapsed_ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "checkouts": self.checkouts,
+            "wait_total_ms": round(self.wait_total_ms, 3),
+            "wait_avg_ms": round(self.wait_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max_ms, 3),
+            "connects": self.connects,
+            "idle_recycles": self.idle_recycles,
+            "invalidations": self.invalidations,
+        }
+
+
+pool_stats = PoolStats()
+
+
+class _TimedPoolMixin:
+    """Меряет время ожидания соединения из пула (включая открытие нового)."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_stats.observe_wait((time.perf_counter() - started) * 1000)
+
+
+class TimedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(_TimedPoolMixin, NullPool):
+    pass
+
+
+class TimedStaticPool(_TimedPoolMixin, StaticPool):
+    pass
+
+
+def resolve_profile(
+    name: str | None,
+    overrides: Dict[str, Any] | None = None,
+) -> Dict[str, Any]:
+    """Параметры профиля с учётом переопределений из окружения (None — не задано)."""
+    name = (name or DEFAULT_ENGINE_PROFILE).strip().lower().replace("-", "_")
+    if name not in ENGINE_PROFILES:
+        raise ValueError(
+            f"Неизвестный DB_ENGINE_PROFILE={name!r}, "
+            f"допустимо: {', '.join(ENGINE_PROFILES)}"
+        )
+
+    profile = {"name": name, **ENGINE_PROFILES[name]}
+    for key, value in (overrides or {}).items():
+        if value is not None:
+            profile[key] = value
+    return profile
+
+
+def engine_kwargs(database_url: str | URL, profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Аргументы create_async_engine для выбранного профиля."""
+    url = make_url(database_url)
+    if is_sqlite(url) and is_sqlite_memory(url):
+        # База в памяти живёт, пока открыто её единственное соединение:
+        # одно соединение на процесс, размеры пула и recycle тут не при чём.
+        # Годится для последовательных тестов; файловая база — для нагрузки.
+        return {"poolclass": TimedStaticPool, "connect_args": sqlite_connect_args(profile)}
+    kwargs: Dict[str, Any] = {
+        "pool_recycle": profile["pool_recycle"],
+        "pool_pre_ping": profile["pool_pre_ping"],
+    }
+
+    if profile["pool_size"] <= 0:
+        kwargs["poolclass"] = TimedNullPool
+    else:
+        kwargs["poolclass"] = TimedQueuePool
+        kwargs["pool_size"] = profile["pool_size"]
+        kwargs["max_overflow"] = profile["max_overflow"]
+        kwargs["pool_timeout"] = profile["pool_timeout"]
+
+    connect_args: Dict[str, Any] = {}
+    if url.get_driver_name() == "asyncpg":
+        connect_args["timeout"] = profile["connect_timeout"]
+        # Кэш prepared statements адаптера SQLAlchemy и собственный кэш asyncpg.
+        connect_args["prepared_statement_cache_size"] = profile["statement_cache_size"]
+        connect_args["statement_cache_size"] = profile["statement_cache_size"]
+        if profile["statement_cache_size"] == 0:
+            # PgBouncer в transaction‑режиме может отдать «чужой» серверный коннект,
+            # где имя prepared statement уже занято — делаем имена уникальными.
+            connect_args["prepared_statement_name_func"] = _unique_statement_name
+    elif is_sqlite(url):
+        connect_args.update(sqlite_connect_args(profile))
+    kwargs["connect_args"] = connect_args
+    return kwargs
+
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4().hex}__"
+
+
+def install_pool_events(sync_engine, idle_timeout: float | None) -> None:
+    """
+    Счётчики соединений и замена соединений, простаивавших дольше idle_timeout.
+
+    Вместо pre‑ping (лишний round trip на каждый checkout) проверяем только
+    время простоя: свежие соединения выдаются сразу, «залежавшиеся» —
+    пересоздаются пулом до выдачи.
+    """
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        pool_stats.connects += 1
+        db_connections_opened.inc()
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        pool_stats.invalidations += 1
+
+    pool = sync_engine.pool
+    if hasattr(pool, "checkedout"):
+        registry.add_collector(lambda: db_pool_checked_out.set(value=pool.checkedout()))
+
+    if not idle_timeout:
+        return
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is not None and time.monotonic() - checked_in_at > idle_timeout:
+            pool_stats.idle_recycles += 1
+            # Пул закроет это соединение и повторит checkout с новым.
+            raise exc.DisconnectionError("соединение простаивало дольше idle_timeout")
@@ -0,0 +1,215 @@
+"""
+Регрессионная проверка индексов горячих запросов через EXPLAIN.
+
+Во временной схеме локального Postgres создаются таблицы моделей,
+засеваются синтетические данные, после ANALYZE для каждого горячего
+запроса снимается план. Если где‑то есть Seq Scan по нашим таблицам —
+скрипт завершается с кодом 1. Вся работа идёт в одной транзакции,
+которая в конце откатывается, так что база остаётся нетронутой.
+
+Запуск: `EXPLAIN_DATABASE_URL=postgresql+asyncpg://... python -m bot.database.explain_check`.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+import bot.database.models  # noqa: F401 — регистрируем все модели в Base.metadata
+from bot.database.models.base import Base
+from bot.database.models.bets.bet import Bet
+from bot.database.models.merge import MergeSession
+from bot.database.models.shelter import ShelterListing
+
+CHECK_SCHEMA = "beth_explain_check"
+# Игроков в засеве; Бетов — BETS_PER_PLAYER на игрока.
+DEFAULT_PLAYERS = 20_000
+BETS_PER_PLAYER = 25
+
+# Один «типичный» игрок, по которому строятся запросы.
+PLAYER_ID = 42
+
+
+def hot_queries() -> Dict[str, Any]:
+    """Горячие запросы в том виде, в каком их строят хендлеры и сервисы."""
+    return {
+        "инвентарь: активные вне лаборатории и приюта": select(Bet).where(
+            Bet.owner_id == PLAYER_ID,
+            Bet.is_active == True,
+            Bet.in_lab == False,
+            Bet.in_shelter == False,
+        ),
+        "ношение: дубликат по имени": select(Bet).where(
+            Bet.owner_id == PLAYER_ID,
+            Bet.name == "Тоша",
+            Bet.is_active == True,
+        ),
+        "профиль: Беты в лаборатории": select(Bet).where(
+            Bet.owner_id == PLAYER_ID,
+            Bet.is_active == True,
+            Bet.in_lab == True,
+        ),
+        "приют: витрина": select(ShelterListing)
+        .where(ShelterListing.is_active == True)
+        .order_by(ShelterListing.created_at.desc())
+        .limit(15),
+        "слияние: ожидающая сессия": select(MergeSession)
+        .where(MergeSession.status == "waiting")
+        .order_by(MergeSession.created_at)
+        .limit(1),
+        "слияние: активная сессия игрока": select(MergeSession.id).where(
+            MergeSession.status.in_(["waiting", "confirm", "select_bet"]),
+            or_(
+                MergeSession.player1_id == PLAYER_ID,
+                MergeSession.player2_id == PLAYER_ID,
+            ),
+        ),
+        "лаборатория: готовые к уведомлению": select(Bet.id)
+        .where(
+            Bet.is_active == True,
+            Bet.in_lab == True,
+            Bet.lab_notified == False,
+            Bet.lab_ends_at <= func.now(),
+        )
+        .order_by(Bet.lab_ends_at)
+        .limit(500),
+        "лаборатория: ближайшие сроки": select(Bet.lab_ends_at)
+        .where(
+            Bet.is_active == True,
+            Bet.in_lab == True,
+            Bet.lab_notified == False,
+            Bet.lab_ends_at.is_not(None),
+        )
+        .order_by(Bet.lab_ends_at)
+        .limit(10_000),
+        "профиль: число слияний": select(func.count())
+        .select_from(MergeSession)
+        .where(
+            MergeSession.status == "completed",
+            or_(
+                MergeSession.player1_id == PLAYER_ID,
+                MergeSession.player2_id == PLAYER_ID,
+            ),
+        ),
+    }
+
+
+SEED_SQL = (
+    """
+    INSERT INTO users (id, tg_id)
+    SELECT g, 1000000 + g FROM generate_series(1, :players) AS g
+    """,
+    """
+    INSERT INTO players (id, user_id, rank, xp, neurons, count_bets, noshenie_count)
+    SELECT g, g, g % 40, 0, 500, 0, 0 FROM generate_series(1, :players) AS g
+    """,
+    """
+    INSERT INTO bets (owner_id, rarity, name, level, is_active, in_lab, in_shelter, lab_ends_at, lab_notified)
+    SELECT
+        1 + g % :players,
+        'Обычный',
+        'Бет' || (g % 16),
+        5,
+        g % 7 <> 0,
+        g % 23 = 0,
+        g % 41 = 0,
+        CASE WHEN g % 23 = 0 THEN now() + (g % 1440 - 120) * interval '1 minute' END,
+        g % 23 = 0 AND g % 1440 < 60
+    FROM generate_series(1, :players * :bets_per_player) AS g
+    """,
+    """
+    INSERT INTO shelter_listings (bet_id, seller_id, price, is_active, created_at)
+    SELECT id, owner_id, 100, id % 20 = 0, now() - id * interval '1 second'
+    FROM bets WHERE in_shelter
+    """,
+    """
+    INSERT INTO merge_sessions (player1_id, player2_id, status, created_at)
+    SELECT
+        1 + g % :players,
+        1 + (g * 7) % :players,
+        CASE WHEN g % 500 = 0 THEN 'waiting' WHEN g % 50 = 0 THEN 'cancelled' ELSE 'completed' END,
+        now() - g * interval '1 second'
+    FROM generate_series(1, :players * 3) AS g
+    """,
+)
+
+
+def _plan_nodes(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+async def _explain(conn: AsyncConnection, stmt) -> Dict[str, Any]:
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    raw = await conn.scalar(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+    plan = json.loads(raw) if isinstance(raw, str) else raw
+    return plan[0]["Plan"]
+
+
+async def run_check(url: str, players: int) -> List[str]:
+    """Вернуть список найденных проблем (пустой — всё хорошо)."""
+    engine = create_async_engine(url)
+    tables = {table.name for table in Base.metadata.sorted_tables}
+    problems: List[str] = []
+
+    try:
+        async with engine.connect() as conn:
+            trans = await conn.begin()
+            try:
+                await conn.execute(text(f"CREATE SCHEMA {CHECK_SCHEMA}"))
+                await conn.execute(text(f"SET LOCAL search_path TO {CHECK_SCHEMA}"))
+                await conn.run_sync(Base.metadata.create_all)
+
+                params = {"players": players, "bets_per_player": BETS_PER_PLAYER}
+                for sql in SEED_SQL:
+                    await conn.execute(text(sql), params)
+                await conn.execute(text("ANALYZE"))
+
+                for name, stmt in hot_queries().items():
+                    plan = await _explain(conn, stmt)
+                    seq_scans = [
+                        node["Relation Name"]
+                        for node in _plan_nodes(plan)
+                        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in tables
+                    ]
+                    indexes = sorted(
+                        {node["Index Name"] for node in _plan_nodes(plan) if "Index Name" in node}
+                    )
+                    status = "SEQ SCAN " + ", ".join(seq_scans) if seq_scans else "ok"
+                    print(f"> {name}: {status} (индексы: {', '.join(indexes) or '—'})")
+                    if seq_scans:
+                        problems.append(f"{name}: Seq Scan по {', '.join(seq_scans)}")
+            finally:
+                # Схема, таблицы и засев исчезают вместе с откатом.
+                await trans.rollback()
+    finally:
+        await engine.dispose()
+
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="EXPLAIN‑проверка индексов горячих запросов")
+    parser.add_argument("--url", default=os.getenv("EXPLAIN_DATABASE_URL"))
+    parser.add_argument("--players", type=int, default=DEFAULT_PLAYERS)
+    args = parser.parse_args()
+
+    if not args.url:
+        sys.exit("Укажи локальный Postgres через --url или EXPLAIN_DATABASE_URL")
+
+    problems = asyncio.run(run_check(args.url, args.players))
+    if problems:
+        print("\nГорячие запросы без индекса:")
+        for problem in problems:
+            print(f"  - {problem}")
+        sys.exit(1)
+    print("\nВсе горячие запросы идут по индексам.")
+
+
+if __name__ == "__main__":
+    main()
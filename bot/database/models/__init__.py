@@ -4,6 +4,9 @@ from bot.database.models.bets.bet import Bet
 from bot.database.models.merge import MergeSession
 from bot.database.models.promo import PromoCode, PromoRedemption
 from bot.database.models.shelter import ShelterListing, ShelterSellRequest
+from bot.database.models.schema import SchemaVersion
+from bot.database.models.processed_update import ProcessedUpdate
+from bot.database.models.ledger import NeuronLedgerEntry, NeuronBalanceSnapshot
 
 __all__ = [
     "User",
@@ -14,4 +17,8 @@ __all__ = [
     "PromoRedemption",
     "ShelterListing",
     "ShelterSellRequest",
+    "SchemaVersion",
+    "ProcessedUpdate",
+    "NeuronLedgerEntry",
+    "NeuronBalanceSnapshot",
 ]
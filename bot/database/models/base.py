@@ -1,24 +1,62 @@
-import ssl
-
 from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
+from bot.core import config
+from bot.core.profiler import install_slow_sql_log
+from bot.core.tracing import install_sql_tracing
 from bot.core.config import DATABASE_URL
+from bot.database.dialect import (
+    install_sqlite_datetimes,
+    install_sqlite_pragmas,
+    is_sqlite,
+    is_sqlite_memory,
+    normalize_url,
+    postgres_connect_args,
+)
+from bot.database.engine_profiles import engine_kwargs, install_pool_events, resolve_profile
+from bot.database.sql_stats import install_sql_events
 
 
 def _create_engine():
     """
     Создаём движок SQLAlchemy.
 
-    Для облачных БД вроде Neon требуется SSL, поэтому
-    сразу включаем его через стандартный SSL‑контекст.
+    Параметры пула и драйвера берутся из профиля DB_ENGINE_PROFILE
+    (serverless / long_running / pooler) с переопределениями из окружения.
+    Диалект определяется по DATABASE_URL: Postgres (для облачных БД вроде
+    Neon сразу включаем SSL) или SQLite — в памяти или в файле с WAL,
+    для локальных прогонов и тестов (см. bot/database/dialect.py).
     """
-    ssl_context = ssl.create_default_context()
-    return create_async_engine(
-        DATABASE_URL,
-        echo=False,
-        connect_args={"ssl": ssl_context},
+    profile = resolve_profile(
+        config.DB_ENGINE_PROFILE,
+        {
+            "pool_size": config.DB_POOL_SIZE,
+            "max_overflow": config.DB_MAX_OVERFLOW,
+            "pool_timeout": config.DB_POOL_TIMEOUT,
+            "pool_recycle": config.DB_POOL_RECYCLE,
+            "pool_pre_ping": config.DB_POOL_PRE_PING,
+            "idle_timeout": config.DB_IDLE_TIMEOUT,
+            "statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+            "connect_timeout": config.DB_CONNECT_TIMEOUT,
+        },
     )
+    url = normalize_url(DATABASE_URL)
+    kwargs = engine_kwargs(url, profile)
+    if url.get_backend_name() == "postgresql":
+        kwargs["connect_args"].update(postgres_connect_args(url))
+
+    new_engine = create_async_engine(url, echo=False, **kwargs)
+    if is_sqlite(url):
+        install_sqlite_datetimes(new_engine.sync_engine)
+        install_sqlite_pragmas(new_engine.sync_engine, memory=is_sqlite_memory(url))
+    # Соединение базы в памяти пересоздавать по простою нельзя — с ним пропадут данные.
+    idle_timeout = None if is_sqlite(url) and is_sqlite_memory(url) else profile["idle_timeout"]
+    install_pool_events(new_engine.sync_engine, idle_timeout)
+    install_sql_events(new_engine.sync_engine)
+    install_slow_sql_log(new_engine)
+    install_sql_tracing(new_engine.sync_engine)
+    print(f"> Профиль подключения к БД: {profile['name']} ({url.get_backend_name()})")
+    return new_engine
 
 
 engine = _create_engine()
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Integer, String, DateTime, func, ForeignKey, Boolean
+from sqlalchemy import Integer, String, DateTime, func, ForeignKey, Boolean, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import expression
 
@@ -9,11 +9,31 @@ from bot.database.models.base import Base
 
 class Bet(Base):
     __tablename__ = "bets"
+    __table_args__ = (
+        # Инвентарь игрока: активные / в лаборатории / в приюте.
+        Index("ix_bets_owner_state", "owner_id", "is_active", "in_lab", "in_shelter"),
+        # Поиск дубликата при ношении.
+        Index(
+            "ix_bets_owner_name_active",
+            "owner_id",
+            "name",
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active"),
+        ),
+        # Очередь уведомлений лаборатории (bot/service/lab_scheduler.py):
+        # Беты в лаборатории, о которых игрок ещё не знает, по времени окончания.
+        Index(
+            "ix_bets_lab_due",
+            "lab_ends_at",
+            "owner_id",
+            postgresql_where=text("is_active AND in_lab AND NOT lab_notified"),
+            sqlite_where=text("is_active AND in_lab AND NOT lab_notified"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     owner_id: Mapped[int | None] = mapped_column(
         ForeignKey("players.id"),
-        index=True,
         nullable=True,
     )
     rarity: Mapped[str] = mapped_column(String(16))
@@ -42,6 +62,12 @@ class Bet(Base):
         DateTime(timezone=True),
         nullable=True,
     )
+    # Игроку уже отправлено уведомление «Бет вернулся из лаборатории».
+    lab_notified: Mapped[bool] = mapped_column(
+        Boolean,
+        nullable=False,
+        server_default=expression.false(),
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Index, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from bot.database.models.base import Base
+
+
+class NeuronLedgerEntry(Base):
+    """
+    Журнал изменений баланса нейронов: только вставки, никогда не правится.
+    Записи апдейта вставляются одним INSERT перед коммитом, в той же транзакции,
+    что и изменение баланса: фиксируются и откатываются вместе с ним
+    (см. bot/database/request/ledger.py).
+    """
+
+    __tablename__ = "neuron_ledger"
+    __table_args__ = (
+        Index("ix_neuron_ledger_player_id_id", "player_id", "id"),
+    )
+
+    # В SQLite автоинкремент работает только у INTEGER PRIMARY KEY.
+    id: Mapped[int] = mapped_column(
+        BigInteger().with_variant(Integer, "sqlite"),
+        primary_key=True,
+        autoincrement=True,
+    )
+    player_id: Mapped[int] = mapped_column(ForeignKey("players.id"), nullable=False)
+    delta: Mapped[int] = mapped_column(Integer, nullable=False)
+    balance_after: Mapped[int] = mapped_column(Integer, nullable=False)
+    reason: Mapped[str] = mapped_column(String(32), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class NeuronBalanceSnapshot(Base):
+    """
+    Свёртка журнала: баланс игрока на конец периода.
+    Снимок есть только за периоды с изменениями; баланс за любой период —
+    последний снимок не позже него, одна строка по первичному ключу.
+    """
+
+    __tablename__ = "neuron_balance_snapshots"
+
+    player_id: Mapped[int] = mapped_column(ForeignKey("players.id"), primary_key=True)
+    period_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    balance: Mapped[int] = mapped_column(Integer, nullable=False)
+    delta_sum: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    entries: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_entry_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
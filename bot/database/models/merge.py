@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Integer, DateTime, func, ForeignKey, String, Boolean
+from sqlalchemy import Integer, DateTime, func, ForeignKey, String, Boolean, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from bot.database.models.base import Base
@@ -8,11 +8,23 @@ from bot.database.models.base import Base
 
 class MergeSession(Base):
     __tablename__ = "merge_sessions"
+    __table_args__ = (
+        # Очередь ожидания слияния: самая старая сессия первой.
+        Index(
+            "ix_merge_sessions_waiting",
+            "created_at",
+            postgresql_where=text("status = 'waiting'"),
+            sqlite_where=text("status = 'waiting'"),
+        ),
+        # Сессии игрока по статусу (активная сессия, счётчик слияний в профиле).
+        Index("ix_merge_sessions_player1_status", "player1_id", "status"),
+        Index("ix_merge_sessions_player2_status", "player2_id", "status"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    player1_id: Mapped[int] = mapped_column(ForeignKey("players.id"), index=True)
+    player1_id: Mapped[int] = mapped_column(ForeignKey("players.id"))
     player2_id: Mapped[int | None] = mapped_column(
-        ForeignKey("players.id"), nullable=True, index=True
+        ForeignKey("players.id"), nullable=True
     )
     player1_confirmed: Mapped[bool] = mapped_column(Boolean, default=False)
     player2_confirmed: Mapped[bool] = mapped_column(Boolean, default=False)
@@ -22,7 +34,7 @@ class MergeSession(Base):
     player2_bet_id: Mapped[int | None] = mapped_column(
         ForeignKey("bets.id"), nullable=True
     )
-    status: Mapped[str] = mapped_column(String(32), default="waiting", index=True)
+    status: Mapped[str] = mapped_column(String(32), default="waiting")
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
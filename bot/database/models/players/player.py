@@ -20,6 +20,10 @@ class Player(Base):
     neurons: Mapped[int] = mapped_column(Integer, default=0)
     count_bets: Mapped[int] = mapped_column(Integer, default=0)
     noshenie_count: Mapped[int] = mapped_column(Integer, default=0)
+    # Денормализованные счётчики инвентаря, см. bot/service/inventory_service.py.
+    active_bets_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    lab_bets_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    shelter_bets_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
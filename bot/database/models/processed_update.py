@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from bot.database.models.base import Base
+
+
+class ProcessedUpdate(Base):
+    """
+    Уже принятые к обработке update_id от Telegram.
+    Нужна, чтобы повторная доставка того же апдейта не выполняла действие дважды.
+    Старые строки периодически удаляются (см. bot/core/idempotency.py).
+    """
+
+    __tablename__ = "processed_updates"
+
+    update_id: Mapped[int] = mapped_column(
+        BigInteger,
+        primary_key=True,
+        autoincrement=False,
+    )
+    processed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        index=True,
+    )
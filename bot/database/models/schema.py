@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from sqlalchemy import Integer, String, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from bot.database.models.base import Base
+
+
+class SchemaVersion(Base):
+    """
+    Отпечаток (хеш) объявленной схемы БД.
+
+    Хранится одна строка: если отпечаток совпадает с текущими моделями,
+    при холодном старте DDL не выполняется вовсе.
+    """
+
+    __tablename__ = "schema_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    applied_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
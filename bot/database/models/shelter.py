@@ -7,6 +7,8 @@ from sqlalchemy import (
     Boolean,
     String,
     func,
+    Index,
+    text,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -15,6 +17,15 @@ from bot.database.models.base import Base
 
 class ShelterListing(Base):
     __tablename__ = "shelter_listings"
+    __table_args__ = (
+        # Витрина приюта: активные лоты, новые сверху.
+        Index(
+            "ix_shelter_listings_active_created",
+            text("created_at DESC"),
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     bet_id: Mapped[int] = mapped_column(
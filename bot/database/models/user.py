@@ -2,7 +2,7 @@ from sqlalchemy import BigInteger, String, Boolean, DateTime, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import expression
 
-from bot.database.models.base import Base, engine
+from bot.database.models.base import Base
 from bot.database.models.promo import PromoCode, PromoRedemption  # регистрируем модели промокодов
 from bot.database.models.shelter import ShelterListing, ShelterSellRequest  # регистрируем модели приюта
 
@@ -20,6 +20,8 @@ class User(Base):
     username: Mapped[str] = mapped_column(String(100), nullable=True)
     first_name: Mapped[str] = mapped_column(String(100), nullable=True)
     last_name: Mapped[str] = mapped_column(String(100), nullable=True)
+    # Хеш последнего записанного Telegram‑профиля (см. bot/database/request/profile_sync.py)
+    profile_hash: Mapped[str | None] = mapped_column(String(16), nullable=True)
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     player: Mapped['Player'] = relationship(back_populates='user', uselist=False)
@@ -28,8 +30,9 @@ async def async_main():
     """
     Инициализация схемы БД.
 
-    Используем общий engine из bot.database.models.base,
-    чтобы во всех местах были одинаковые настройки подключения (в том числе SSL).
+    Делегирует в bot.database.bootstrap.ensure_schema: DDL выполняется
+    только при изменении моделей и под advisory‑блокировкой.
     """
-    async with engine.begin() as eng:
-        await eng.run_sync(Base.metadata.create_all)
+    from bot.database.bootstrap import ensure_schema
+
+    await ensure_schema()
@@ -0,0 +1,82 @@
+from typing import NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.core.cache import LRUCache
+from bot.database.models.user import User
+from bot.database.models.players.player import Player
+from bot.database.sql_stats import track_sql
+
+# Связка tg_id -> (user_id, player_id) после создания не меняется,
+# TTL нужен только на случай ручных правок в БД.
+IDENTITY_CACHE_SIZE = 50_000
+IDENTITY_CACHE_TTL_SECONDS = 6 * 60 * 60
+
+
+class Identity(NamedTuple):
+    user_id: int
+    player_id: int | None
+
+
+_identity_cache = LRUCache(IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL_SECONDS)
+
+
+@track_sql()
+async def resolve_identity(session: AsyncSession, tg_id: int) -> Identity | None:
+    """
+    Найти user_id и player_id по tg_id.
+    При попадании в кэш — без запросов к БД, при промахе — один запрос с JOIN.
+    """
+    identity = _identity_cache.get(tg_id)
+    if identity is not None:
+        return identity
+
+    row = (
+        await session.execute(
+            select(User.id.label("user_id"), Player.id.label("player_id"))
+            .outerjoin(Player, Player.user_id == User.id)
+            .where(User.tg_id == tg_id)
+        )
+    ).first()
+    if row is None:
+        return None
+
+    identity = Identity(user_id=row.user_id, player_id=row.player_id)
+    # Пользователя без Player не кэшируем: Player вот‑вот будет создан.
+    if identity.player_id is not None:
+        _identity_cache.set(tg_id, identity)
+    return identity
+
+
+def remember_identity(tg_id: int, user_id: int, player_id: int) -> None:
+    _identity_cache.set(tg_id, Identity(user_id=user_id, player_id=player_id))
+
+
+def forget_identity(tg_id: int) -> None:
+    _identity_cache.pop(tg_id)
+
+
+async def get_player_by_tg(session: AsyncSession, tg_id: int) -> Player | None:
+    """
+    Player по tg_id. На горячем пути — один SELECT по первичному ключу
+    (или ноль, если Player уже есть в identity map этой сессии).
+    """
+    identity = await resolve_identity(session, tg_id)
+    if identity is None or identity.player_id is None:
+        return None
+
+    player = await session.get(Player, identity.player_id)
+    if player is None:
+        # Кэш устарел (строку удалили вручную) — забываем и ищем заново.
+        forget_identity(tg_id)
+        identity = await resolve_identity(session, tg_id)
+        if identity is None or identity.player_id is None:
+            return None
+        player = await session.get(Player, identity.player_id)
+    return player
+
+
+def identity_cache_stats() -> dict:
+    """Размер и счётчики попаданий/промахов кэша — для подбора IDENTITY_CACHE_SIZE."""
+    return _identity_cache.stats()
@@ -0,0 +1,52 @@
+"""
+Сверка денормализованных счётчиков инвентаря (Player.*_bets_count) с bets.
+
+Используется при старте (bot/database/bootstrap.py) и админской командой
+/recount_bets; сами счётчики меняет bot/service/inventory_service.py.
+"""
+from sqlalchemy import func, or_, select, update
+
+from bot.database.models.bets.bet import Bet
+from bot.database.models.players.player import Player
+
+
+def _count_bets(*conditions):
+    return (
+        select(func.count())
+        .select_from(Bet)
+        .where(Bet.owner_id == Player.id, Bet.is_active == True, *conditions)
+        .scalar_subquery()
+    )
+
+
+async def reconcile_inventory_counters(conn, player_ids: list[int] | None = None) -> int:
+    """
+    Пересчитать счётчики инвентаря по реальным строкам bets.
+    Обновляются только разошедшиеся игроки; возвращает их количество.
+    Принимает AsyncSession или AsyncConnection.
+    """
+    active = _count_bets()
+    lab = _count_bets(Bet.in_lab == True)
+    shelter = _count_bets(Bet.in_shelter == True)
+
+    stmt = (
+        update(Player)
+        .where(
+            or_(
+                Player.active_bets_count != active,
+                Player.lab_bets_count != lab,
+                Player.shelter_bets_count != shelter,
+            )
+        )
+        .values(
+            active_bets_count=active,
+            lab_bets_count=lab,
+            shelter_bets_count=shelter,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if player_ids is not None:
+        stmt = stmt.where(Player.id.in_(player_ids))
+
+    result = await conn.execute(stmt)
+    return result.rowcount or 0
@@ -0,0 +1,85 @@
+"""
+Очередь завершений лаборатории поверх частичного индекса ix_bets_lab_due.
+
+В индекс попадают только Беты в лаборатории, о которых игрок ещё не
+уведомлён, поэтому оба запроса читают короткий диапазон по lab_ends_at,
+а не все Беты игроков. Уведомлённые строки из индекса выпадают сразу
+после claim — и не мешают следующим проходам, даже если игрок долго
+не забирает награду.
+"""
+from datetime import datetime
+from typing import Dict, List, NamedTuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.database.dialect import skip_locked
+from bot.database.models.bets.bet import Bet
+from bot.database.models.players.player import Player
+from bot.database.models.user import User
+from bot.database.sql_stats import track_sql
+
+
+class ReadyBet(NamedTuple):
+    bet_id: int
+    name: str | None
+    rarity: str
+    level: int
+
+
+def _due_filter():
+    # Условия ровно как в WHERE индекса — иначе планировщик его не выберет.
+    return (
+        Bet.is_active == True,
+        Bet.in_lab == True,
+        Bet.lab_notified == False,
+    )
+
+
+@track_sql()
+async def upcoming_lab_deadlines(session: AsyncSession, limit: int) -> List[datetime]:
+    """Ближайшие limit сроков окончания, о которых ещё никто не уведомлён."""
+    result = await session.scalars(
+        select(Bet.lab_ends_at)
+        .where(*_due_filter(), Bet.lab_ends_at.is_not(None))
+        .order_by(Bet.lab_ends_at)
+        .limit(limit)
+    )
+    return list(result)
+
+
+@track_sql()
+async def claim_due_lab_bets(
+    session: AsyncSession,
+    now: datetime,
+    limit: int,
+) -> Dict[int, List[ReadyBet]]:
+    """
+    Забрать до limit готовых Бетов и пометить их уведомлёнными.
+    Возвращает {tg_id владельца: [Беты]}; строки, которые прямо сейчас
+    забирает другой инстанс, пропускаются (SKIP LOCKED), а не ждут.
+    Уведомления отправлять после коммита транзакции.
+    """
+    stmt = (
+        select(Bet.id, Bet.name, Bet.rarity, Bet.level, User.tg_id)
+        .join(Player, Player.id == Bet.owner_id)
+        .join(User, User.id == Player.user_id)
+        .where(*_due_filter(), Bet.lab_ends_at <= now)
+        .order_by(Bet.lab_ends_at)
+        .limit(limit)
+    )
+    rows = (await session.execute(skip_locked(stmt, session, of=Bet))).all()
+    if not rows:
+        return {}
+
+    await session.execute(
+        update(Bet)
+        .where(Bet.id.in_([row.id for row in rows]))
+        .values(lab_notified=True)
+        .execution_options(synchronize_session=False)
+    )
+
+    ready: Dict[int, List[ReadyBet]] = {}
+    for row in rows:
+        ready.setdefault(row.tg_id, []).append(ReadyBet(row.id, row.name, row.rarity, row.level))
+    return ready
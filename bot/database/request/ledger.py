@@ -0,0 +1,176 @@
+"""
+Журнал нейронов: append‑only записи и периодические снимки балансов.
+
+Кошелёк (wallet.py) складывает записи в `session.info` текущей сессии —
+без лишних запросов на каждое изменение баланса. Перед коммитом они
+пишутся в той же транзакции одним многострочным INSERT вместе с upsert'ом
+снимков за период: журнал фиксируется ровно вместе с балансом, а при
+откате выбрасывается вместе с ним. Буфера в памяти инстанса нет — падение
+инстанса не теряет уже закоммиченные записи.
+"""
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+from sqlalchemy import case, event, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from bot.database.dialect import dialect_name, insert_on_conflict
+from bot.database.models.base import async_session
+from bot.database.models.ledger import NeuronBalanceSnapshot, NeuronLedgerEntry
+from bot.database.models.players.player import Player
+
+# Длина периода снимка баланса.
+SNAPSHOT_PERIOD_SECONDS = 60 * 60
+
+_SESSION_KEY = "ledger_entries"
+
+
+def record_entry(
+    session: AsyncSession,
+    player_id: int,
+    delta: int,
+    balance_after: int,
+    reason: str,
+) -> None:
+    """Запомнить изменение баланса; в БД оно попадёт при коммите этой же сессии."""
+    session.info.setdefault(_SESSION_KEY, []).append(
+        {
+            "player_id": player_id,
+            "delta": delta,
+            "balance_after": balance_after,
+            "reason": reason,
+            "created_at": datetime.now(timezone.utc),
+        }
+    )
+
+
+@event.listens_for(Session, "before_commit")
+def _write_entries(session: Session) -> None:
+    # Синхронный хук: у AsyncSession он выполняется внутри greenlet'а коммита,
+    # поэтому запросы здесь идут в ту же транзакцию.
+    entries = session.info.pop(_SESSION_KEY, None)
+    if not entries:
+        return
+    session.execute(insert(NeuronLedgerEntry), entries)
+    session.execute(_snapshot_upsert(dialect_name(session)), _snapshot_rows(entries))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_rolled_back(session: Session, previous_transaction) -> None:
+    session.info.pop(_SESSION_KEY, None)
+
+
+def _period_start(moment: datetime) -> datetime:
+    timestamp = int(moment.timestamp())
+    return datetime.fromtimestamp(timestamp - timestamp % SNAPSHOT_PERIOD_SECONDS, timezone.utc)
+
+
+def _snapshot_rows(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Свернуть пачку записей в строки снимков (игрок, период)."""
+    rows: Dict[Tuple[int, datetime], Dict[str, Any]] = {}
+    for entry in sorted(entries, key=lambda item: item["created_at"]):
+        key = (entry["player_id"], _period_start(entry["created_at"]))
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = {
+                "player_id": key[0],
+                "period_start": key[1],
+                "balance": entry["balance_after"],
+                "delta_sum": 0,
+                "entries": 0,
+                "last_entry_at": entry["created_at"],
+            }
+        row["balance"] = entry["balance_after"]
+        row["delta_sum"] += entry["delta"]
+        row["entries"] += 1
+        row["last_entry_at"] = entry["created_at"]
+    # Один порядок строк у всех транзакций — параллельные upsert'ы
+    # снимков двух игроков (переводы) не взаимоблокируются.
+    return [rows[key] for key in sorted(rows)]
+
+
+def _snapshot_upsert(dialect_name: str):
+    stmt = insert_on_conflict(dialect_name, NeuronBalanceSnapshot)
+    table = NeuronBalanceSnapshot.__table__
+    # Параллельные транзакции могут закоммититься не по порядку — баланс
+    # берём из более поздней записи, суммы просто складываем.
+    newer = stmt.excluded.last_entry_at >= table.c.last_entry_at
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.player_id, table.c.period_start],
+        set_={
+            "balance": case((newer, stmt.excluded.balance), else_=table.c.balance),
+            "delta_sum": table.c.delta_sum + stmt.excluded.delta_sum,
+            "entries": table.c.entries + stmt.excluded.entries,
+            "last_entry_at": case((newer, stmt.excluded.last_entry_at), else_=table.c.last_entry_at),
+        },
+    )
+
+
+async def balance_at(session: AsyncSession, player_id: int, moment: datetime) -> int | None:
+    """
+    Баланс игрока на конец периода, в который попадает moment. Снимки есть
+    только за периоды с изменениями, поэтому берётся последний не позже
+    этого периода (обратный проход по PK, одна строка).
+    """
+    return await session.scalar(
+        select(NeuronBalanceSnapshot.balance)
+        .where(
+            NeuronBalanceSnapshot.player_id == player_id,
+            NeuronBalanceSnapshot.period_start <= _period_start(moment),
+        )
+        .order_by(NeuronBalanceSnapshot.period_start.desc())
+        .limit(1)
+    )
+
+
+async def iter_ledger_mismatches(
+    session: AsyncSession,
+    batch_size: int = 1000,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Потоково сверить Player.neurons с последним снимком журнала.
+    Игроки читаются курсором пачками по batch_size, без загрузки всей таблицы.
+    """
+    last_snapshot = (
+        select(NeuronBalanceSnapshot.balance)
+        .where(NeuronBalanceSnapshot.player_id == Player.id)
+        .order_by(NeuronBalanceSnapshot.period_start.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    result = await session.stream(
+        select(Player.id, Player.neurons, last_snapshot.label("ledger_balance"))
+        .order_by(Player.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async for partition in result.partitions():
+        for player_id, neurons, ledger_balance in partition:
+            if ledger_balance is not None and ledger_balance != neurons:
+                yield {
+                    "player_id": player_id,
+                    "neurons": neurons,
+                    "ledger_balance": ledger_balance,
+                }
+
+
+async def reconcile_ledger(fix: bool = False) -> List[Dict[str, Any]]:
+    """
+    Найти игроков, чей баланс не сходится с журналом.
+    С fix=True для каждого в той же транзакции добавляется
+    корректирующая запись `reconcile`.
+    """
+    async with async_session() as session:
+        mismatches = [item async for item in iter_ledger_mismatches(session)]
+        if fix and mismatches:
+            for item in mismatches:
+                record_entry(
+                    session,
+                    item["player_id"],
+                    item["neurons"] - item["ledger_balance"],
+                    item["neurons"],
+                    "reconcile",
+                )
+            await session.commit()
+
+    return mismatches
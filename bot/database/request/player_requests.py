@@ -1,35 +1,47 @@
-from sqlalchemy import select
-from bot.database.models.base import async_session
-from bot.database.models.user import User
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
 from bot.database.models.players.player import Player
+from bot.database.request.identity import forget_identity, remember_identity, resolve_identity
+from bot.database.sql_stats import track_sql
 
-async def get_or_create_player_for_user(tg_id: int) -> Player:
-    async with async_session() as session:
-        user = await session.scalar(
-            select(User).where(User.tg_id == tg_id)
-        )
 
-        if user is None:
-            raise RuntimeError(
-                f"User с tg_id={tg_id} не найден. "
-                f"Сначала должен вызываться set_user() в /start."
-            )
+@track_sql()
+async def get_or_create_player_for_user(
+    session: AsyncSession,
+    tg_id: int,
+    **new_player_values: Any,
+) -> Player:
+    """
+    Player по tg_id; если его ещё нет — создаётся со значениями new_player_values.
+    Связка tg_id -> player_id берётся из кэша identity; устаревшая запись
+    (строку удалили вручную) забывается и перечитывается из БД.
+    """
+    identity = await resolve_identity(session, tg_id)
+    if identity is not None and identity.player_id is not None:
+        player = await session.get(Player, identity.player_id)
+        if player is not None:
+            return player
+        forget_identity(tg_id)
+        identity = await resolve_identity(session, tg_id)
 
-        player = await session.scalar(
-            select(Player).where(Player.user_id == user.id)
+    if identity is None:
+        raise RuntimeError(
+            f"User с tg_id={tg_id} не найден. "
+            f"Сначала должен вызываться set_user() в /start."
         )
 
+    if identity.player_id is not None:
+        player = await session.get(Player, identity.player_id)
         if player is None:
-            player = Player(
-                user_id=user.id,
-                rank=0,
-                neurons=0,
-                count_bets=0,
-            )
-            session.add(player)
-            await session.commit()
-            await session.refresh(player)
-            print(f"> +Создан новый Player для user_id={user.id}")
-
+            raise RuntimeError(f"Player id={identity.player_id} для tg_id={tg_id} не найден")
         return player
-    
\ No newline at end of file
+
+    values = {"rank": 0, "neurons": 0, "count_bets": 0, **new_player_values}
+    player = Player(user_id=identity.user_id, **values)
+    session.add(player)
+    # Коммит делает DbSessionMiddleware в конце апдейта.
+    await session.flush()
+    remember_identity(tg_id, identity.user_id, player.id)
+    print(f"> +Создан новый Player для user_id={identity.user_id}")
+    return player
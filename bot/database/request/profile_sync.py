@@ -0,0 +1,127 @@
+import time
+from typing import Any, Dict
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from bot.core.cache import LRUCache
+from bot.database.models.base import async_session
+from bot.database.models.user import User
+from bot.database.requests import profile_fingerprint, profile_values, set_user
+from bot.database.sql_stats import track_sql
+
+# Сколько последних профилей (tg_id -> хеш) помнит инстанс.
+PROFILE_CACHE_SIZE = 50_000
+# Изменения профилей копятся и пишутся одной пачкой не чаще, чем раз в N секунд...
+PROFILE_FLUSH_INTERVAL_SECONDS = 30
+# ...или сразу, если их накопилось слишком много.
+PROFILE_FLUSH_MAX_PENDING = 200
+
+_profile_cache = LRUCache(PROFILE_CACHE_SIZE)
+_pending: Dict[int, Dict[str, Any]] = {}
+_last_flush_at = time.monotonic()
+
+
+@track_sql()
+async def sync_user(session: AsyncSession, tg_user) -> None:
+    """
+    Write‑behind синхронизация Telegram‑профиля с таблицей users.
+
+    - профиль не менялся с прошлого апдейта — ни одного запроса к БД;
+    - профиль изменился — изменение откладывается до пакетного UPDATE;
+    - пользователь ещё не встречался этому инстансу — set_user
+      (создание нового игрока или сверка с сохранённым хешем).
+    """
+    fingerprint = profile_fingerprint(tg_user)
+    cached = _profile_cache.get(tg_user.id)
+
+    if cached == fingerprint:
+        return
+
+    if cached is None:
+        # Отложенная запись могла устареть — set_user запишет актуальные данные сам.
+        _pending.pop(tg_user.id, None)
+        await set_user(session, tg_user)
+        _profile_cache.set(tg_user.id, fingerprint)
+        return
+
+    _pending[tg_user.id] = {**profile_values(tg_user), "profile_hash": fingerprint}
+    _profile_cache.set(tg_user.id, fingerprint)
+
+
+def forget_user(tg_id: int) -> None:
+    """
+    Забыть профиль пользователя — например, если транзакция апдейта,
+    в которой он создавался, откатилась.
+    """
+    _profile_cache.pop(tg_id)
+    _pending.pop(tg_id, None)
+
+
+def _flush_due() -> bool:
+    if not _pending:
+        return False
+    if len(_pending) >= PROFILE_FLUSH_MAX_PENDING:
+        return True
+    return time.monotonic() - _last_flush_at >= PROFILE_FLUSH_INTERVAL_SECONDS
+
+
+async def flush_profiles(force: bool = False) -> int:
+    """
+    Записать накопленные изменения профилей одним пакетным UPDATE.
+    Возвращает количество обновлённых пользователей.
+    """
+    global _last_flush_at
+
+    if not force and not _flush_due():
+        return 0
+    if not _pending:
+        return 0
+
+    batch = [
+        {
+            "b_tg_id": tg_id,
+            "b_is_premium": values["is_premium"],
+            "b_username": values["username"],
+            "b_first_name": values["first_name"],
+            "b_last_name": values["last_name"],
+            "b_profile_hash": values["profile_hash"],
+        }
+        for tg_id, values in _pending.items()
+    ]
+    _pending.clear()
+    _last_flush_at = time.monotonic()
+
+    stmt = (
+        update(User.__table__)
+        .where(User.__table__.c.tg_id == bindparam("b_tg_id"))
+        .values(
+            is_premium=bindparam("b_is_premium"),
+            username=bindparam("b_username"),
+            first_name=bindparam("b_first_name"),
+            last_name=bindparam("b_last_name"),
+            profile_hash=bindparam("b_profile_hash"),
+        )
+    )
+
+    try:
+        async with async_session() as session:
+            await session.execute(stmt, batch)
+            await session.commit()
+    except Exception as e:
+        # Профиль — косметика; не ломаем обработку апдейта, а пробуем позже.
+        for params in batch:
+            _pending.setdefault(
+                params["b_tg_id"],
+                {
+                    "is_premium": params["b_is_premium"],
+                    "username": params["b_username"],
+                    "first_name": params["b_first_name"],
+                    "last_name": params["b_last_name"],
+                    "profile_hash": params["b_profile_hash"],
+                },
+            )
+        print(f"> !Не удалось записать профили пользователей: {e!r}")
+        return 0
+
+    return len(batch)
@@ -0,0 +1,127 @@
+"""
+Кошелёк игрока: атомарные изменения баланса нейронов.
+
+Каждая операция — один `UPDATE players ... RETURNING neurons` с условием
+в WHERE, поэтому параллельные апдейты не теряют записи и баланс не уходит
+в минус. Если объект Player уже загружен в сессию, его `neurons`
+обновляется значением из RETURNING — без отдельного SELECT/refresh.
+На SQLite старше 3.35 (без UPDATE … RETURNING) новый баланс читается
+следующим запросом в той же транзакции.
+Каждое изменение попадает в журнал нейронов (ledger.py) с причиной `reason`.
+
+Остальные поля строки игрока, которые меняет та же операция (счётчики
+инвентаря, опыт, время ношения), можно передать в `values` — они уйдут
+тем же UPDATE, а не отдельным запросом и flush'ем ORM.
+"""
+from typing import Any, Dict, Mapping
+
+from sqlalchemy import inspect, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from bot.database.dialect import supports_update_returning
+from bot.database.models.players.player import Player
+from bot.database.request.ledger import record_entry
+
+
+def _sync_loaded_player(session: AsyncSession, player_id: int, values: Mapping[str, Any]) -> None:
+    sync_session = session.sync_session
+    player = sync_session.identity_map.get(sync_session.identity_key(Player, player_id))
+    if player is not None:
+        for name, value in values.items():
+            set_committed_value(player, name, value)
+
+
+def pending_player_values(player: Player) -> Dict[str, Any]:
+    """
+    Изменённые в памяти, но ещё не записанные колонки Player — чтобы
+    передать их в change_balance(values=...) вместо отдельного flush.
+    """
+    state = inspect(player)
+    values = {}
+    for attr in state.mapper.column_attrs:
+        added = state.attrs[attr.key].history.added
+        if added:
+            values[attr.key] = added[0]
+    return values
+
+
+async def change_balance(
+    session: AsyncSession,
+    player_id: int,
+    delta: int,
+    require_at_least: int | None = None,
+    *,
+    reason: str,
+    values: Mapping[str, Any] | None = None,
+) -> int | None:
+    """
+    Изменить баланс на delta одним запросом.
+    Если задан require_at_least, изменение применяется только при балансе
+    не меньше этого значения. values — другие колонки players (значения
+    или SQL‑выражения), которые меняются тем же UPDATE и только вместе
+    с балансом. Возвращает новый баланс или None, если условие
+    не выполнилось (или игрока нет).
+    """
+    values = dict(values or {})
+    stmt = (
+        update(Player)
+        .where(Player.id == player_id)
+        .values(neurons=Player.neurons + delta, **values)
+        .execution_options(synchronize_session=False)
+    )
+    if require_at_least is not None:
+        stmt = stmt.where(Player.neurons >= require_at_least)
+
+    columns = [Player.neurons, *(getattr(Player, name) for name in values)]
+    # Autoflush записал бы изменённый в памяти Player отдельным UPDATE.
+    with session.no_autoflush:
+        if supports_update_returning(session):
+            row = (await session.execute(stmt.returning(*columns))).one_or_none()
+        else:
+            result = await session.execute(stmt)
+            row = None
+            if result.rowcount:
+                row = (await session.execute(select(*columns).where(Player.id == player_id))).one()
+    if row is None:
+        return None
+
+    neurons = row[0]
+    _sync_loaded_player(session, player_id, dict(zip(["neurons", *values], row)))
+    record_entry(session, player_id, delta, neurons, reason)
+    return neurons
+
+
+async def credit(session: AsyncSession, player_id: int, amount: int, *, reason: str) -> int | None:
+    return await change_balance(session, player_id, amount, reason=reason)
+
+
+async def debit(session: AsyncSession, player_id: int, amount: int, *, reason: str) -> int | None:
+    """Списать amount, только если на балансе есть столько нейронов."""
+    return await change_balance(session, player_id, -amount, require_at_least=amount, reason=reason)
+
+
+async def transfer(
+    session: AsyncSession,
+    from_player_id: int,
+    to_player_id: int,
+    amount: int,
+    *,
+    reason: str,
+) -> tuple[int, int] | None:
+    """
+    Перевести amount нейронов от одного игрока другому.
+    Два условных UPDATE в транзакции апдейта; None — если у отправителя
+    не хватило нейронов (тогда ничего не изменено).
+    """
+    from_neurons = await debit(session, from_player_id, amount, reason=reason)
+    if from_neurons is None:
+        return None
+
+    to_neurons = await credit(session, to_player_id, amount, reason=reason)
+    if to_neurons is None:
+        # Получателя нет — возвращаем списанное.
+        await credit(session, from_player_id, amount, reason=f"{reason}_refund")
+        return None
+
+    return from_neurons, to_neurons
@@ -1,5 +1,8 @@
-from sqlalchemy import select, update
-from bot.database.models.base import async_session
+import hashlib
+from typing import Any, Dict
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from bot.database.models.user import User
 from bot.database.models.players.player import Player
 from bot.database.models.bets.bet import Bet
@@ -11,55 +14,78 @@ def extract_is_premium(tg_user):
         return False
     return bool(value)
 
-async def set_user(tg_user):
-    async with async_session() as session:
-        user = await session.scalar(
-            select(User).where(User.tg_id == tg_user.id)
-        )
+def profile_values(tg_user) -> Dict[str, Any]:
+    return {
+        "is_premium": extract_is_premium(tg_user),
+        "username": tg_user.username,
+        "first_name": tg_user.first_name,
+        "last_name": tg_user.last_name,
+    }
+
+def profile_fingerprint(tg_user) -> str:
+    """Короткий хеш полей профиля, которые мы храним в users."""
+    values = profile_values(tg_user)
+    raw = "\x1f".join(
+        [
+            "1" if values["is_premium"] else "0",
+            values["username"] or "",
+            values["first_name"] or "",
+            values["last_name"] or "",
+        ]
+    )
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
 
-        if not user:
-            user = User(
-                tg_id=tg_user.id,
-                is_premium=extract_is_premium(tg_user),
-                tel_number=None,
-                username=tg_user.username,
-                first_name=tg_user.first_name,
-                last_name=tg_user.last_name,
-            )
-            session.add(user)
-            await session.flush()
+def _stored_profile_matches(user: User, values: Dict[str, Any], fingerprint: str) -> bool:
+    if user.profile_hash is not None:
+        return user.profile_hash == fingerprint
+    # Старые строки без сохранённого хеша сравниваем по полям.
+    return all(getattr(user, key) == value for key, value in values.items())
 
-            player = Player(
-                user_id=user.id,
-                rank=0,
-                xp=0,
-                neurons=400,
-                count_bets=1,
-                noshenie_count=0,
-            )
-            session.add(player)
-            await session.flush()
+async def set_user(session: AsyncSession, tg_user):
+    values = profile_values(tg_user)
+    fingerprint = profile_fingerprint(tg_user)
 
-            base_bet = Bet(
-                owner_id=player.id,
-                rarity=RarityEnum.COMMON,
-                name="Зуппа",
-                level=5,
-            )
-            session.add(base_bet)
+    user = await session.scalar(
+        select(User).where(User.tg_id == tg_user.id)
+    )
+
+    if not user:
+        user = User(
+            tg_id=tg_user.id,
+            tel_number=None,
+            profile_hash=fingerprint,
+            **values,
+        )
+        session.add(user)
+        await session.flush()
+
+        player = Player(
+            user_id=user.id,
+            rank=0,
+            xp=0,
+            neurons=400,
+            count_bets=1,
+            noshenie_count=0,
+            active_bets_count=1,  # базовый Бет ниже
+        )
+        session.add(player)
+        await session.flush()
+
+        base_bet = Bet(
+            owner_id=player.id,
+            rarity=RarityEnum.COMMON,
+            name="Зуппа",
+            level=5,
+        )
+        session.add(base_bet)
 
-            await session.commit()
-            print(f'> +Новый пользователь создан: {tg_user.id}')
-        else:
-            await session.execute(
-                update(User)
-                .where(User.tg_id == tg_user.id)
-                .values(
-                    is_premium=extract_is_premium(tg_user),
-                    username=tg_user.username,
-                    first_name=tg_user.first_name,
-                    last_name=tg_user.last_name
-                )
-            )
-            await session.commit()
-            print(f'> ~Обновлена информация пользователя {tg_user.id}')
+        # Коммит делает DbSessionMiddleware вместе с остальной работой апдейта.
+        await session.flush()
+        print(f'> +Новый пользователь создан: {tg_user.id}')
+    elif not _stored_profile_matches(user, values, fingerprint):
+        # Пишем только если профиль в Telegram действительно изменился.
+        for key, value in values.items():
+            setattr(user, key, value)
+        user.profile_hash = fingerprint
+        await session.flush()
+        print(f'> ~Обновлена информация пользователя {tg_user.id}')
@@ -0,0 +1,199 @@
+"""
+Счётчики SQL: сколько стейтментов, round trip'ов и времени в БД уходит
+на апдейт, хендлер и сервисную функцию.
+
+- statements  — Core‑стейтменты (`Connection.execute`: запросы, flush ORM).
+- round_trips — реальные обращения к серверу: каждый execute курсора
+                (executemany пачками считается по пачкам) плюс BEGIN/COMMIT/ROLLBACK.
+- db_time_ms  — время выполнения курсора.
+
+Подсчёт включается только внутри `collect_sql()` / `sql_budget()`, вне их
+события движка сразу возвращаются. Области (`sql_scope`, `track_sql`)
+вкладываются друг в друга, и каждая считает всё, что было внутри неё.
+Каждая область — ещё и спан трассировки (см. bot/core/tracing.py).
+"""
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Tuple, TypeVar
+
+from sqlalchemy import event
+
+from bot.core.tracing import trace_span
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+_collectors: ContextVar[Tuple["SqlStats", ...]] = ContextVar("sql_collectors", default=())
+_scopes: ContextVar[Tuple[str, ...]] = ContextVar("sql_scopes", default=())
+
+
+class SqlCounter:
+    __slots__ = ("statements", "round_trips", "db_time_ms")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.round_trips = 0
+        self.db_time_ms = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "statements": self.statements,
+            "round_trips": self.round_trips,
+            "db_time_ms": round(self.db_time_ms, 3),
+        }
+
+
+class SqlStats(SqlCounter):
+    """Итоги апдейта (или блока кода) с разбивкой по областям."""
+
+    __slots__ = ("scopes",)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.scopes: Dict[str, SqlCounter] = {}
+
+    def _scope_counters(self, scopes: Tuple[str, ...]) -> Iterator[SqlCounter]:
+        yield self
+        for name in set(scopes):
+            counter = self.scopes.get(name)
+            if counter is None:
+                counter = self.scopes[name] = SqlCounter()
+            yield counter
+
+    def as_dict(self) -> Dict[str, Any]:
+        result = super().as_dict()
+        result["scopes"] = {name: counter.as_dict() for name, counter in self.scopes.items()}
+        return result
+
+    def summary(self) -> str:
+        return (
+            f"{self.statements} SQL, {self.round_trips} round trip, "
+            f"{self.db_time_ms:.1f} мс в БД"
+        )
+
+
+def current_stats() -> SqlStats | None:
+    """Счётчики ближайшего `collect_sql()` (обычно — текущего апдейта)."""
+    collectors = _collectors.get()
+    return collectors[-1] if collectors else None
+
+
+def current_scopes() -> Tuple[str, ...]:
+    """Открытые области, от внешней к внутренней."""
+    return _scopes.get()
+
+
+class SqlBudgetExceeded(AssertionError):
+    """Блок кода сделал больше запросов, чем ему разрешено."""
+
+
+def _record(statements: int = 0, round_trips: int = 0, db_time_ms: float = 0.0) -> None:
+    collectors = _collectors.get()
+    if not collectors:
+        return
+    scopes = _scopes.get()
+    for stats in collectors:
+        for counter in stats._scope_counters(scopes):
+            counter.statements += statements
+            counter.round_trips += round_trips
+            counter.db_time_ms += db_time_ms
+
+
+@contextmanager
+def collect_sql() -> Iterator[SqlStats]:
+    """Считать все запросы внутри блока (включая дочерние задачи asyncio)."""
+    stats = SqlStats()
+    token = _collectors.set(_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+
+
+@contextmanager
+def sql_scope(name: str) -> Iterator[None]:
+    """Отдельная строка в разбивке для запросов внутри блока."""
+    kind = "handler" if name.startswith("handler:") else "service"
+    # Область видна в разбивке, даже если запросов в ней не было.
+    for stats in _collectors.get():
+        stats.scopes.setdefault(name, SqlCounter())
+    token = _scopes.set(_scopes.get() + (name,))
+    try:
+        with trace_span(name, kind):
+            yield
+    finally:
+        _scopes.reset(token)
+
+
+def track_sql(name: str | None = None) -> Callable[[F], F]:
+    """Декоратор асинхронной функции: её запросы попадают в область `name`."""
+
+    def decorator(func: F) -> F:
+        scope_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with sql_scope(scope_name):
+                return await func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+@contextmanager
+def sql_budget(
+    max_statements: int,
+    max_round_trips: int | None = None,
+) -> Iterator[SqlStats]:
+    """
+    Проверка бюджета запросов, например в тестах хендлеров:
+
+        with sql_budget(6):
+            await dispathcer.feed_update(bot, update)
+
+    При превышении бросает SqlBudgetExceeded с разбивкой по областям.
+    """
+    with collect_sql() as stats:
+        yield stats
+
+    problems = []
+    if stats.statements > max_statements:
+        problems.append(f"{stats.statements} SQL > {max_statements}")
+    if max_round_trips is not None and stats.round_trips > max_round_trips:
+        problems.append(f"{stats.round_trips} round trip > {max_round_trips}")
+    if problems:
+        raise SqlBudgetExceeded(f"{'; '.join(problems)}: {stats.as_dict()}")
+
+
+def install_sql_events(sync_engine) -> None:
+    """Подписать счётчики на события движка."""
+
+    @event.listens_for(sync_engine, "before_execute")
+    def _on_execute(conn, clauseelement, multiparams, params, execution_options):
+        _record(statements=1)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _on_cursor_start(conn, cursor, statement, parameters, context, executemany):
+        if _collectors.get():
+            # Запросы одного соединения идут строго по очереди.
+            conn.info["sql_started_at"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _on_cursor_end(conn, cursor, statement, parameters, context, executemany):
+        started_at = conn.info.pop("sql_started_at", None)
+        if started_at is not None:
+            _record(round_trips=1, db_time_ms=(time.perf_counter() - started_at) * 1000)
+
+    @event.listens_for(sync_engine, "begin")
+    def _on_begin(conn):
+        _record(round_trips=1)
+
+    @event.listens_for(sync_engine, "commit")
+    def _on_commit(conn):
+        _record(round_trips=1)
+
+    @event.listens_for(sync_engine, "rollback")
+    def _on_rollback(conn):
+        _record(round_trips=1)
@@ -1,15 +1,23 @@
 from datetime import datetime, timedelta, timezone
 
-from aiogram import Router
+from aiogram import F, Router
+from bot.core.config import ADMIN_IDS
+from bot.core.webhook_reply import skip_webhook_reply
 from bot.handlers.client.commands.start import Command, bot, Message
 from bot.keyboards.keyborad import main_keyboard
-from bot.database.models.base import async_session
 from bot.database.models.promo import PromoCode
+from bot.database.request.ledger import reconcile_ledger
+from bot.database.request.wallet import credit
+from bot.database.request.inventory import reconcile_inventory_counters
 from bot.service.noshenie_service import get_or_create_player
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = Router()
 
+# Служебные команды — только для tg_id из ADMIN_IDS; остальным они не отвечают.
+admin_only = F.from_user.id.in_(ADMIN_IDS)
+
 # Максимальный возраст команды /clear, при котором мы действительно чистим чат.
 # Это защита от повторных доставок одного и того же апдейта Telegram
 # (особенно важна при работе через вебхуки и облачные функции).
@@ -30,6 +38,8 @@ async def __(message: Message):
         return
 
     chat_id = message.chat.id
+    # Сообщение статуса потом редактируется — нужен настоящий message_id.
+    skip_webhook_reply()
     info = await message.answer(
         "🧹Очистка чата... \n\n<i>Подождите, может занять несколько минут</i>",
         parse_mode="HTML",
@@ -63,22 +73,50 @@ async def __(message: Message):
 
 
 @router.message(Command('09124467_neurons'))
-async def give_neurons_bonus(message: Message):
+async def give_neurons_bonus(message: Message, session: AsyncSession):
     tg_id = message.from_user.id
 
-    async with async_session() as session:
-        player = await get_or_create_player(session, tg_id)
-        player.neurons += 1000
-        await session.commit()
+    player = await get_or_create_player(session, tg_id)
+    await credit(session, player.id, 1000, reason="admin_bonus")
 
     await message.answer('Тебе начислено <b>1000 нейронов</b> 🎁', parse_mode='HTML')
 
 
+@router.message(Command("recount_bets"), admin_only)
+async def recount_bets_command(message: Message, session: AsyncSession):
+    """Сверить счётчики инвентаря игроков с реальными Бетами."""
+    repaired = await reconcile_inventory_counters(session)
+    await message.answer(f"Счётчики инвентаря исправлены у <b>{repaired}</b> игроков.", parse_mode="HTML")
+
+
+@router.message(Command("reconcile_ledger"), admin_only)
+async def reconcile_ledger_command(message: Message):
+    """
+    Сверить балансы игроков с журналом нейронов.
+    /reconcile_ledger fix — ещё и записать корректирующие записи.
+    """
+    fix = (message.text or "").split()[1:2] == ["fix"]
+    mismatches = await reconcile_ledger(fix=fix)
+    if not mismatches:
+        await message.answer("Балансы сходятся с журналом нейронов.")
+        return
+
+    lines = [
+        f"id {item['player_id']}: {item['neurons']} (журнал: {item['ledger_balance']})"
+        for item in mismatches[:20]
+    ]
+    suffix = " Добавлены корректирующие записи." if fix else ""
+    await message.answer(
+        f"Расхождений: <b>{len(mismatches)}</b>.{suffix}\n" + "\n".join(lines),
+        parse_mode="HTML",
+    )
+
+
 DEFAULT_PROMO_REWARD_NEURONS = 500
 
 
 @router.message(Command("promocreate"))
-async def promo_create_command(message: Message):
+async def promo_create_command(message: Message, session: AsyncSession):
     """
     Админская команда для создания промокодов.
     Формат:
@@ -129,30 +167,27 @@ async def promo_create_command(message: Message):
     now = datetime.now(timezone.utc)
     expires_at = now + timedelta(days=days)
 
-    async with async_session() as session:
-        existing = await session.scalar(
-            select(PromoCode).where(PromoCode.code == code)
-        )
-
-        if existing:
-            existing.reward_neurons = DEFAULT_PROMO_REWARD_NEURONS
-            existing.max_uses = max_uses
-            existing.is_active = True
-            existing.expires_at = expires_at
-            # счётчик использований не трогаем
-            promo = existing
-        else:
-            promo = PromoCode(
-                code=code,
-                reward_neurons=DEFAULT_PROMO_REWARD_NEURONS,
-                max_uses=max_uses,
-                used_count=0,
-                is_active=True,
-                expires_at=expires_at,
-            )
-            session.add(promo)
+    existing = await session.scalar(
+        select(PromoCode).where(PromoCode.code == code)
+    )
 
-        await session.commit()
+    if existing:
+        existing.reward_neurons = DEFAULT_PROMO_REWARD_NEURONS
+        existing.max_uses = max_uses
+        existing.is_active = True
+        existing.expires_at = expires_at
+        # счётчик использований не трогаем
+        promo = existing
+    else:
+        promo = PromoCode(
+            code=code,
+            reward_neurons=DEFAULT_PROMO_REWARD_NEURONS,
+            max_uses=max_uses,
+            used_count=0,
+            is_active=True,
+            expires_at=expires_at,
+        )
+        session.add(promo)
 
     limit_text = (
         f"до <b>{max_uses}</b> использований"
@@ -5,14 +5,15 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.exceptions import TelegramBadRequest
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.database.models.base import async_session
 from bot.database.models.bets.bet import Bet
 from bot.database.request.player_requests import get_or_create_player_for_user
 from bot.service.lab_service import (
     LAB_DURATION_MINUTES,
     start_lab_for_bet,
     collect_lab_reward,
+    collect_all_lab_rewards,
     calc_lab_total_reward,
 )
 
@@ -34,28 +35,27 @@ def format_bet_with_rarity(bet: Bet) -> str:
 
 
 @router.message(F.text == "🧪Лаборатория")
-async def lab_overview_handler(message: Message):
+async def lab_overview_handler(message: Message, session: AsyncSession):
     tg_id = message.from_user.id
-    player = await get_or_create_player_for_user(tg_id)
-
-    async with async_session() as session:
-        lab_bets_result = await session.scalars(
-            select(Bet).where(
-                Bet.owner_id == player.id,
-                Bet.is_active == True,
-                Bet.in_lab == True,
-            )
+    player = await get_or_create_player_for_user(session, tg_id)
+
+    lab_bets_result = await session.scalars(
+        select(Bet).where(
+            Bet.owner_id == player.id,
+            Bet.is_active == True,
+            Bet.in_lab == True,
         )
-        lab_bets = lab_bets_result.all()
+    )
+    lab_bets = lab_bets_result.all()
 
-        available_result = await session.scalars(
-            select(Bet).where(
-                Bet.owner_id == player.id,
-                Bet.is_active == True,
-                Bet.in_lab == False,
-            )
+    available_result = await session.scalars(
+        select(Bet).where(
+            Bet.owner_id == player.id,
+            Bet.is_active == True,
+            Bet.in_lab == False,
         )
-        available_bets = available_result.all()
+    )
+    available_bets = available_result.all()
 
     now = datetime.now(timezone.utc)
 
@@ -135,21 +135,20 @@ async def lab_overview_handler(message: Message):
 
 
 @router.message(F.text == "🐾Мои беты")
-async def my_bets_handler(message: Message):
+async def my_bets_handler(message: Message, session: AsyncSession):
     tg_id = message.from_user.id
-    player = await get_or_create_player_for_user(tg_id)
-
-    async with async_session() as session:
-        result = await session.scalars(
-            select(Bet)
-            .where(
-                Bet.owner_id == player.id,
-                Bet.is_active == True,
-                Bet.in_shelter == False,
-            )
-            .order_by(Bet.rarity, Bet.level.desc(), Bet.created_at)
+    player = await get_or_create_player_for_user(session, tg_id)
+
+    result = await session.scalars(
+        select(Bet)
+        .where(
+            Bet.owner_id == player.id,
+            Bet.is_active == True,
+            Bet.in_shelter == False,
         )
-        bets = result.all()
+        .order_by(Bet.rarity, Bet.level.desc(), Bet.created_at)
+    )
+    bets = result.all()
 
     if not bets:
         await message.answer(
@@ -172,9 +171,9 @@ async def my_bets_handler(message: Message):
 
 
 @router.callback_query(F.data.startswith("bet:"))
-async def bet_details_callback(callback: CallbackQuery):
+async def bet_details_callback(callback: CallbackQuery, session: AsyncSession):
     tg_id = callback.from_user.id
-    player = await get_or_create_player_for_user(tg_id)
+    player = await get_or_create_player_for_user(session, tg_id)
 
     try:
         bet_id = int(callback.data.split(":", 1)[1])
@@ -182,15 +181,14 @@ async def bet_details_callback(callback: CallbackQuery):
         await callback.answer("Некорректный выбор Бета.", show_alert=True)
         return
 
-    async with async_session() as session:
-        bet = await session.scalar(
-            select(Bet).where(
-                Bet.id == bet_id,
-                Bet.owner_id == player.id,
-                Bet.is_active == True,
-                Bet.in_shelter == False,
-            )
+    bet = await session.scalar(
+        select(Bet).where(
+            Bet.id == bet_id,
+            Bet.owner_id == player.id,
+            Bet.is_active == True,
+            Bet.in_shelter == False,
         )
+    )
 
     if not bet:
         await callback.answer(
@@ -284,7 +282,7 @@ async def lab_start_choose_duration(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("lab:duration:"))
-async def lab_start_callback(callback: CallbackQuery):
+async def lab_start_callback(callback: CallbackQuery, session: AsyncSession):
     tg_id = callback.from_user.id
 
     parts = callback.data.split(":")
@@ -301,8 +299,7 @@ async def lab_start_callback(callback: CallbackQuery):
         await callback.answer("Некорректные данные лаборатории.", show_alert=True)
         return
 
-    async with async_session() as session:
-        result = await start_lab_for_bet(session, tg_id, bet_id, minutes)
+    result = await start_lab_for_bet(session, tg_id, bet_id, minutes)
 
     if not result.get("ok"):
         await callback.answer(result.get("message", "Не удалось отправить в лабораторию."), show_alert=True)
@@ -323,7 +320,7 @@ async def lab_start_callback(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("lab:collect:"))
-async def lab_collect_callback(callback: CallbackQuery):
+async def lab_collect_callback(callback: CallbackQuery, session: AsyncSession):
     tg_id = callback.from_user.id
 
     try:
@@ -332,8 +329,7 @@ async def lab_collect_callback(callback: CallbackQuery):
         await callback.answer("Некорректные данные лаборатории.", show_alert=True)
         return
 
-    async with async_session() as session:
-        result = await collect_lab_reward(session, tg_id, bet_id)
+    result = await collect_lab_reward(session, tg_id, bet_id)
 
     if not result.get("ok"):
         await callback.answer(result.get("message", "Не удалось забрать награду."), show_alert=True)
@@ -362,3 +358,34 @@ async def lab_collect_callback(callback: CallbackQuery):
         await callback.answer("🌟Награда получена")
     except TelegramBadRequest:
         pass
+
+
+@router.callback_query(F.data == "lab:collect_all")
+async def lab_collect_all_callback(callback: CallbackQuery, session: AsyncSession):
+    tg_id = callback.from_user.id
+
+    result = await collect_all_lab_rewards(session, tg_id)
+
+    if not result.get("ok"):
+        await callback.answer(result.get("message", "Не удалось забрать награды."), show_alert=True)
+        return
+
+    bets_text = ", ".join(f"<b>{name}</b>" for name in result["bet_names"])
+    await callback.message.answer(
+        "Беты вернулись из лаборатории!\n\n"
+        f"Беты: {bets_text}\n"
+        f"Ты получил: <b>{result['reward']}</b> нейронов\n"
+        f"Опыт: +{result['xp_gained']}\n\n"
+        f"Всего нейронов теперь: <b>{result['player_neurons']}</b>",
+        parse_mode="HTML",
+    )
+
+    if result["rank_ups"]:
+        await callback.message.answer(
+            f"ВАШ РАНГ ПОВЫШЕН: {result['rank_before']} -> {result['rank_after']}👏🏻"
+        )
+
+    try:
+        await callback.answer("🌟Награды получены")
+    except TelegramBadRequest:
+        pass
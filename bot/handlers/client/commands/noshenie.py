@@ -1,9 +1,12 @@
+import html
+
 from aiogram import Router, F
 from aiogram.types import Message
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.database.models.base import async_session
-from bot.service.noshenie_service import do_noshenie
-from bot.service.quote_service import fetch_random_quote
+from bot.keyboards.keyborad import NOSHENIE_MULTI_TEXT
+from bot.service.noshenie_service import NOSHENIE_MULTI_PULLS, do_noshenie, do_noshenie_multi
+from bot.service.quote_service import get_quote
 
 router = Router()
 
@@ -17,11 +20,10 @@ RARITY_EMOJI = {
 
 
 @router.message(F.text == "🤲🏻Ношение")
-async def noshenie_handler(message: Message):
+async def noshenie_handler(message: Message, session: AsyncSession):
     tg_id = message.from_user.id
 
-    async with async_session() as session:
-        result = await do_noshenie(session, tg_id)
+    result = await do_noshenie(session, tg_id)
 
     if not result["ok"] and result["reason"] == "cooldown":
         await message.answer(
@@ -52,9 +54,9 @@ async def noshenie_handler(message: Message):
     rank_ups = result.get("rank_ups", 0)
     is_free = result.get("is_free", False)
 
-    quote = await fetch_random_quote()
+    quote = get_quote()
     if quote:
-        quote_block = f'\n\n🗨 Цитата Бета:\n"<i>{quote}</i>"'
+        quote_block = f'\n\n🗨 Цитата Бета:\n"<i>{html.escape(quote)}</i>"'
     else:
         quote_block = ""
 
@@ -84,3 +86,58 @@ async def noshenie_handler(message: Message):
         await message.answer(
             f"🐦‍🔥ВАШ РАНГ ПОВЫШЕН: {rank_before} -> {rank}🐦‍🔥"
         )
+
+
+@router.message(F.text == NOSHENIE_MULTI_TEXT)
+async def noshenie_multi_handler(message: Message, session: AsyncSession):
+    tg_id = message.from_user.id
+
+    result = await do_noshenie_multi(session, tg_id)
+
+    if not result["ok"] and result["reason"] == "cooldown":
+        await message.answer(
+            "Ты уже делал ношение недавно.\n"
+            f"Попробуй снова через {result['remaining_minutes']} минут."
+        )
+        return
+
+    if not result["ok"] and result["reason"] == "not_enough_neurons":
+        await message.answer(
+            f"Недостаточно нейронов для {NOSHENIE_MULTI_PULLS} ношений.\n"
+            f"Нужно {result['required_neurons']} нейронов, "
+            f"у тебя сейчас {result['current_neurons']}."
+        )
+        return
+
+    pull_lines = []
+    for pull in result["pulls"]:
+        rarity = pull["rarity"].value
+        rarity_emoji = RARITY_EMOJI.get(rarity, "⭐️")
+        mark = "🎉" if pull["is_new_bet"] else "🔼"
+        pull_lines.append(
+            f"{mark} {rarity_emoji}<b>{pull['bet_name']}</b> — ур. {pull['bet_level']}"
+        )
+
+    if result["free_pulls"]:
+        cost_line = f"Бесплатное ношение на сегодня ✅, -{result['neurons_spent']} нейронов за остальные"
+    else:
+        cost_line = f"-{result['neurons_spent']} нейронов за ношения"
+
+    await message.answer(
+        f"✨ {len(result['pulls'])} ношений завершено!\n\n"
+        f"{cost_line}\n\n"
+        + "\n".join(pull_lines)
+        + "\n\n"
+        f"+{result['neurons_reward']} нейронов награда\n"
+        f"+{result['xp_gained']} опыта\n\n"
+        f"Всего нейронов: <b>{result['total_neurons']}</b>\n"
+        f"Всего Бетов: <b>{result['bets_count']}</b>",
+        parse_mode="HTML",
+    )
+
+    rank = result["rank"]
+    rank_before = result["rank_before"]
+    if result["rank_ups"]:
+        await message.answer(
+            f"🐦‍🔥ВАШ РАНГ ПОВЫШЕН: {rank_before} -> {rank}🐦‍🔥"
+        )
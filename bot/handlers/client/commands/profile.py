@@ -3,8 +3,8 @@ from datetime import datetime, timezone, timedelta
 from aiogram import Router, F
 from aiogram.types import Message
 from sqlalchemy import select, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.database.models.base import async_session
 from bot.database.models.merge import MergeSession
 from bot.database.models.bets.bet import Bet
 from bot.database.request.player_requests import get_or_create_player_for_user
@@ -15,29 +15,26 @@ router = Router()
 
 
 @router.message(F.text == "👤Профиль")
-async def __(message: Message):
+async def __(message: Message, session: AsyncSession):
     tg_id = message.from_user.id
-    player = await get_or_create_player_for_user(tg_id)
-
-    async with async_session() as session:
-        merges_count = await session.scalar(
-            select(func.count())
-            .select_from(MergeSession)
-            .where(
-                MergeSession.status == "completed",
-                or_(
-                    MergeSession.player1_id == player.id,
-                    MergeSession.player2_id == player.id,
-                ),
-            )
-        )
-
-        active_bets_count = await session.scalar(
-            select(func.count())
-            .select_from(Bet)
-            .where(Bet.owner_id == player.id, Bet.is_active == True)
+    player = await get_or_create_player_for_user(session, tg_id)
+
+    merges_count = await session.scalar(
+        select(func.count())
+        .select_from(MergeSession)
+        .where(
+            MergeSession.status == "completed",
+            or_(
+                MergeSession.player1_id == player.id,
+                MergeSession.player2_id == player.id,
+            ),
         )
+    )
 
+    # Счётчики инвентаря хранятся на игроке, Бетов из лаборатории
+    # загружаем только если они есть — нужны для расчёта награды.
+    lab_bets = []
+    if player.lab_bets_count:
         lab_bets_result = await session.scalars(
             select(Bet).where(
                 Bet.owner_id == player.id,
@@ -74,7 +71,7 @@ async def __(message: Message):
 
     lab_count = len(lab_bets)
     total_lab_reward = sum(calc_lab_total_reward(player, bet) for bet in lab_bets)
-    active_bets_count = int(active_bets_count or 0)
+    active_bets_count = player.active_bets_count or 0
 
     current_rank = player.rank
     current_xp = getattr(player, "xp", 0) or 0
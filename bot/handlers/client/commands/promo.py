@@ -1,15 +1,15 @@
 from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.database.models.base import async_session
 from bot.service.promo_service import redeem_promo
 
 router = Router()
 
 
 @router.message(Command("promo"))
-async def promo_command(message: Message):
+async def promo_command(message: Message, session: AsyncSession):
     text = message.text or ""
     parts = text.split(maxsplit=1)
 
@@ -24,8 +24,7 @@ async def promo_command(message: Message):
 
     code = parts[1].strip()
 
-    async with async_session() as session:
-        result = await redeem_promo(session, message.from_user.id, code)
+    result = await redeem_promo(session, message.from_user.id, code)
 
     if not result.get("ok"):
         reason = result.get("reason")
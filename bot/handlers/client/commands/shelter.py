@@ -6,9 +6,9 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from aiogram.exceptions import TelegramBadRequest
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot.core.loader import bot
-from bot.database.models.base import async_session
+from bot.core.delivery import Outbox
 from bot.database.models.bets.bet import Bet
 from bot.database.models.players.player import Player
 from bot.database.models.user import User
@@ -87,23 +87,24 @@ def _build_shelter_view(listings: list[dict], page: int) -> tuple[str, InlineKey
     return "\n".join(lines), kb
 
 
-async def _send_shelter_overview(message: Message, tg_id: int, page: int = 0):
-    async with async_session() as session:
-        listings = await get_market_listings(session)
-        text, kb = _build_shelter_view(listings, page)
+async def _send_shelter_overview(
+    message: Message, session: AsyncSession, tg_id: int, page: int = 0
+):
+    listings = await get_market_listings(session)
+    text, kb = _build_shelter_view(listings, page)
 
     await message.answer(text, parse_mode="HTML", reply_markup=kb.as_markup())
 
 
 @router.message(Command("shelter"))
 @router.message(F.text == "🏯Приют")
-async def shelter_entry(message: Message):
+async def shelter_entry(message: Message, session: AsyncSession):
     tg_id = message.from_user.id
-    await _send_shelter_overview(message, tg_id)
+    await _send_shelter_overview(message, session, tg_id)
 
 
 @router.callback_query(F.data.startswith("shelter:page:"))
-async def shelter_page_callback(callback: CallbackQuery):
+async def shelter_page_callback(callback: CallbackQuery, session: AsyncSession):
     parts = callback.data.split(":")
     if len(parts) != 3:
         await callback.answer("Некорректные данные приюта.", show_alert=True)
@@ -116,9 +117,8 @@ async def shelter_page_callback(callback: CallbackQuery):
         await callback.answer("Некорректные данные приюта.", show_alert=True)
         return
 
-    async with async_session() as session:
-        listings = await get_market_listings(session)
-        text, kb = _build_shelter_view(listings, page)
+    listings = await get_market_listings(session)
+    text, kb = _build_shelter_view(listings, page)
 
     await callback.message.edit_text(
         text,
@@ -132,15 +132,14 @@ async def shelter_page_callback(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "shelter:buy")
-async def shelter_buy_callback(callback: CallbackQuery):
+async def shelter_buy_callback(callback: CallbackQuery, session: AsyncSession):
     tg_id = callback.from_user.id
 
-    async with async_session() as session:
-        listings = await get_market_listings(session)
+    listings = await get_market_listings(session)
 
-        if not listings:
-            await callback.answer("Сейчас нет Бетов на продажу.", show_alert=True)
-            return
+    if not listings:
+        await callback.answer("Сейчас нет Бетов на продажу.", show_alert=True)
+        return
 
     await callback.message.answer(
         "Введите номер Бета, которого вы хотите купить👇🏼\n"
@@ -153,7 +152,7 @@ async def shelter_buy_callback(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("shelter:buy_confirm:"))
-async def shelter_buy_confirm_callback(callback: CallbackQuery):
+async def shelter_buy_confirm_callback(callback: CallbackQuery, session: AsyncSession, outbox: Outbox):
     parts = callback.data.split(":")
     if len(parts) != 3:
         await callback.answer("Некорректные данные приюта.", show_alert=True)
@@ -168,8 +167,7 @@ async def shelter_buy_confirm_callback(callback: CallbackQuery):
 
     tg_id = callback.from_user.id
 
-    async with async_session() as session:
-        result = await buy_listing(session, tg_id, listing_id)
+    result = await buy_listing(session, tg_id, listing_id)
 
     if not result.get("ok"):
         await callback.answer(result.get("message", "Покупка не удалась."), show_alert=True)
@@ -190,18 +188,14 @@ async def shelter_buy_confirm_callback(callback: CallbackQuery):
     )
 
     if seller_tg_id:
-        try:
-            await bot.send_message(
-                chat_id=seller_tg_id,
-                text=(
-                    "Твоего Бета купили в приюте!\n\n"
-                    f"Бет: <b>{bet_text}</b>\n"
-                    f"Ты получил: <b>{price}</b> нейронов"
-                ),
-                parse_mode="HTML",
-            )
-        except Exception:
-            pass
+        # Продавцу — после коммита покупки, ошибки отправки глушит outbox.
+        outbox.send(
+            seller_tg_id,
+            "Твоего Бета купили в приюте!\n\n"
+            f"Бет: <b>{bet_text}</b>\n"
+            f"Ты получил: <b>{price}</b> нейронов",
+            parse_mode="HTML",
+        )
 
     try:
         await callback.answer()
@@ -218,20 +212,19 @@ async def shelter_cancel_callback(callback: CallbackQuery):
 
 
 @router.callback_query(F.data == "shelter:sell")
-async def shelter_sell_callback(callback: CallbackQuery):
+async def shelter_sell_callback(callback: CallbackQuery, session: AsyncSession):
     tg_id = callback.from_user.id
 
-    async with async_session() as session:
-        player = await get_or_create_player(session, tg_id)
-        bets_result = await session.scalars(
-            select(Bet).where(
-                Bet.owner_id == player.id,
-                Bet.is_active == True,
-                Bet.in_lab == False,
-                Bet.in_shelter == False,
-            )
+    player = await get_or_create_player(session, tg_id)
+    bets_result = await session.scalars(
+        select(Bet).where(
+            Bet.owner_id == player.id,
+            Bet.is_active == True,
+            Bet.in_lab == False,
+            Bet.in_shelter == False,
         )
-        bets = bets_result.all()
+    )
+    bets = bets_result.all()
 
     if not bets:
         await callback.answer(
@@ -259,7 +252,7 @@ async def shelter_sell_callback(callback: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("shelter:sell_pick:"))
-async def shelter_sell_pick_callback(callback: CallbackQuery):
+async def shelter_sell_pick_callback(callback: CallbackQuery, session: AsyncSession):
     parts = callback.data.split(":")
     if len(parts) != 3:
         await callback.answer("Некорректные данные приюта.", show_alert=True)
@@ -274,8 +267,7 @@ async def shelter_sell_pick_callback(callback: CallbackQuery):
 
     tg_id = callback.from_user.id
 
-    async with async_session() as session:
-        result = await start_sell_request(session, tg_id, bet_id)
+    result = await start_sell_request(session, tg_id, bet_id)
 
     if not result.get("ok"):
         await callback.answer(result.get("message", "Не удалось начать продажу."), show_alert=True)
@@ -300,14 +292,13 @@ async def shelter_sell_pick_callback(callback: CallbackQuery):
 
 
 @router.message(F.text.regexp(r"^\d+$"))
-async def shelter_price_input_handler(message: Message):
+async def shelter_price_input_handler(message: Message, session: AsyncSession):
     tg_id = message.from_user.id
 
     number = int(message.text)
 
     # Сначала пытаемся интерпретировать число как цену продажи
-    async with async_session() as session:
-        sell_result = await finish_sell_request(session, tg_id, number)
+    sell_result = await finish_sell_request(session, tg_id, number)
 
     if sell_result.get("ok"):
         bet = sell_result["bet"]
@@ -331,8 +322,7 @@ async def shelter_price_input_handler(message: Message):
 
     index = number
 
-    async with async_session() as session:
-        listings = await get_market_listings(session)
+    listings = await get_market_listings(session)
 
     if not listings:
         await message.answer("Сейчас нет Бетов на продажу.")
@@ -2,6 +2,7 @@ import aiogram
 from aiogram import F, Router
 from aiogram.types import Message
 from aiogram.filters import Command
+from sqlalchemy.ext.asyncio import AsyncSession
 from bot.keyboards.keyborad import main_keyboard
 from bot.core.loader import bot
 from bot.database.requests import set_user
@@ -9,8 +10,8 @@ from bot.database.requests import set_user
 router = Router()
 
 @router.message(Command('start'))
-async def __(message: Message):
-    await set_user(message.from_user)
+async def __(message: Message, session: AsyncSession):
+    await set_user(session, message.from_user)
     text = (
         f"Добро пожаловать, {message.from_user.first_name}!\n\n"
         "Я BETH — игровой бот с Бетами.\n\n"
@@ -1,10 +1,16 @@
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import ReplyKeyboardBuilder, InlineKeyboardBuilder
 
+from bot.service.noshenie_service import NOSHENIE_MULTI_PULLS
+
+# Текст кнопки мульти‑ношения — по нему же его ловит хендлер.
+NOSHENIE_MULTI_TEXT = f'🤲🏻Ношение x{NOSHENIE_MULTI_PULLS}'
+
 main_keyboard = ReplyKeyboardMarkup(
     keyboard=[
         [KeyboardButton(text='👤Профиль')],
-        [KeyboardButton(text='🤲🏻Ношение'), KeyboardButton(text='🐾Мои беты')],
+        [KeyboardButton(text='🤲🏻Ношение'), KeyboardButton(text=NOSHENIE_MULTI_TEXT)],
+        [KeyboardButton(text='🐾Мои беты')],
         [KeyboardButton(text='🧬Слияние'), KeyboardButton(text='🧪Лаборатория')],
         [KeyboardButton(text='🏯Приют')],
     ],
@@ -1,11 +1,18 @@
 import asyncio
 import json
-from typing import Any, Dict
+import weakref
+from typing import Any, Dict, List
 
 from aiogram import types
 
+from bot.core import config
+from bot.core.idempotency import claim_update, release_update
 from bot.core.loader import bot, dispathcer, Bot
-from bot.database.requests import set_user
+from bot.core.metrics import dump_metrics_if_due
+from bot.core.tracing import start_trace
+from bot.core.webhook_reply import close_reply_slot, open_reply_slot
+from bot.database.request.profile_sync import flush_profiles
+from bot.database.sql_stats import SqlStats, collect_sql
 from bot.handlers.client.commands import (
     start,
     my_bet,
@@ -17,12 +24,20 @@ from bot.handlers.client.commands import (
     shelter,
 )
 from bot.handlers.admin.commands import clear
-from bot.database.models.base import Base, engine
-from bot.database.models.user import async_main
+from bot.database.bootstrap import ensure_schema
+from bot.middlewares.db_session import DbSessionMiddleware
+from bot.middlewares.metrics import HandlerMetricsMiddleware
+from bot.middlewares.outbox import OutboxMiddleware
+from bot.middlewares.profiler import SlowHandlerMiddleware
+from bot.middlewares.sql_scope import SqlScopeMiddleware
+from bot.middlewares.tracing import TracedMiddleware
+from bot.service.lab_scheduler import sweep_labs_on_timer
 
 
 BOT_INITIALIZED = False
 
+_user_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+
 # Создаём один общий event loop для всего жизненного цикла функции.
 # Это важно для asyncpg/SQLAlchemy, чтобы соединения не прыгали между циклами.
 _loop = asyncio.new_event_loop()
@@ -41,6 +56,22 @@ async def tip_command(bot: Bot) -> None:
 
 
 def setup_routers() -> None:
+    # Каждый middleware обёрнут в спан трассировки (bot/core/tracing.py).
+    # Исходящие уведомления отправляются после коммита транзакции апдейта.
+    dispathcer.update.outer_middleware(TracedMiddleware(OutboxMiddleware()))
+    # Одна сессия и одна транзакция на апдейт, регистрация пользователя — там же.
+    dispathcer.update.outer_middleware(TracedMiddleware(DbSessionMiddleware()))
+    # Гистограммы длительности хендлеров (bot/core/metrics.py).
+    dispathcer.message.middleware(TracedMiddleware(HandlerMetricsMiddleware()))
+    dispathcer.callback_query.middleware(TracedMiddleware(HandlerMetricsMiddleware()))
+    # Медленные хендлеры — в журнал профилировщика (bot/core/profiler.py).
+    dispathcer.message.middleware(TracedMiddleware(SlowHandlerMiddleware()))
+    dispathcer.callback_query.middleware(TracedMiddleware(SlowHandlerMiddleware()))
+    # Запросы каждого хендлера — отдельной строкой в счётчиках SQL апдейта
+    # и спан хендлера; регистрируется последним, чтобы спан был самым внутренним.
+    dispathcer.message.middleware(TracedMiddleware(SqlScopeMiddleware()))
+    dispathcer.callback_query.middleware(TracedMiddleware(SqlScopeMiddleware()))
+
     dispathcer.include_router(start.router)
     dispathcer.include_router(clear.router)
     dispathcer.include_router(my_bet.router)
@@ -61,35 +92,177 @@ async def _ensure_initialized() -> None:
     if BOT_INITIALIZED:
         return
 
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-    await async_main()
+    # Один SELECT отпечатка схемы; DDL — только если модели изменились.
+    await ensure_schema()
     setup_routers()
     await tip_command(bot)
 
     BOT_INITIALIZED = True
 
 
+def _extract_tg_user(update: types.Update) -> types.User | None:
+    if update.message and update.message.from_user:
+        return update.message.from_user
+    if update.callback_query and update.callback_query.from_user:
+        return update.callback_query.from_user
+    if update.inline_query and update.inline_query.from_user:
+        return update.inline_query.from_user
+    return None
+
+
+def _user_lock(tg_id: int) -> asyncio.Lock:
+    """
+    Блокировка на пользователя: апдейты одного игрока обрабатываются строго
+    по очереди, апдейты разных игроков — параллельно.
+    Словарь слабый, поэтому блокировки исчезают вместе с последним ожидающим.
+    """
+    lock = _user_locks.get(tg_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _user_locks[tg_id] = lock
+    return lock
+
+
+async def _dispatch_update(update: types.Update) -> None:
+    # Telegram повторно доставляет апдейт при таймауте/ошибке ответа —
+    # такие дубликаты отбрасываем до любых обращений к игровым таблицам.
+    if not await claim_update(update.update_id):
+        return
+
+    try:
+        # Регистрация пользователя и сессия БД — в DbSessionMiddleware.
+        await dispathcer.feed_update(bot, update)
+    except Exception:
+        await release_update(update.update_id)
+        raise
+
+
+def _log_sql_stats(update: types.Update, stats: SqlStats) -> None:
+    """Итоги SQL апдейта — по SQL_STATS_LOG или при превышении бюджета."""
+    over_budget = (
+        config.SQL_STATEMENT_BUDGET is not None
+        and stats.statements > config.SQL_STATEMENT_BUDGET
+    )
+    if not (config.SQL_STATS_LOG or over_budget):
+        return
+
+    handlers = [name for name in stats.scopes if name.startswith("handler:")]
+    line = f"> SQL апдейта {update.update_id} [{', '.join(handlers) or update.event_type}]: {stats.summary()}"
+    if over_budget:
+        breakdown = ", ".join(
+            f"{name}={counter.statements}" for name, counter in stats.scopes.items()
+        )
+        line = f"{line} — больше бюджета {config.SQL_STATEMENT_BUDGET} ({breakdown})"
+    print(line)
+
+
 async def _process_update(update_data: Dict[str, Any]) -> None:
     await _ensure_initialized()
 
     update = types.Update.model_validate(update_data)
 
-    # Глобально следим, чтобы пользователь был зарегистрирован в БД.
-    # Это примерно то же самое, что /start: создаёт User/Player при первом заходе.
-    tg_user = None
-    if update.message and update.message.from_user:
-        tg_user = update.message.from_user
-    elif update.callback_query and update.callback_query.from_user:
-        tg_user = update.callback_query.from_user
-    elif update.inline_query and update.inline_query.from_user:
-        tg_user = update.inline_query.from_user
+    tg_user = _extract_tg_user(update)
+    with start_trace(
+        "update",
+        update_id=update.update_id,
+        event_type=update.event_type,
+        user_id=tg_user.id if tg_user else None,
+    ), collect_sql() as stats:
+        try:
+            if tg_user is None:
+                await _dispatch_update(update)
+                return
 
-    if tg_user is not None:
-        await set_user(tg_user)
+            # Блокировку берём до первого await, чтобы сохранить порядок апдейтов из пачки.
+            async with _user_lock(tg_user.id):
+                await _dispatch_update(update)
+        finally:
+            _log_sql_stats(update, stats)
 
-    await dispathcer.feed_update(bot, update)
+
+async def _process_single_update(update_data: Dict[str, Any]) -> Dict[str, Any] | None:
+    """
+    Обработать одиночный апдейт вебхука.
+    Возвращает вызов Bot API для тела HTTP‑ответа, если он есть.
+    """
+    slot = open_reply_slot()
+    try:
+        await _process_update(update_data)
+    except Exception:
+        # Апдейт откатился — его ответ не отправляем, как и outbox.
+        slot.take()
+        raise
+    finally:
+        close_reply_slot()
+    return slot.payload(bot)
+
+
+async def _process_updates(updates: List[Dict[str, Any]]) -> Dict[str, Any] | None:
+    """
+    Обработать пачку апдейтов (от проксирующего фронта или моста getUpdates).
+    Разные пользователи обрабатываются конкурентно, один пользователь — по порядку.
+    Для одиночного апдейта возвращает ответ для тела вебхука (см. webhook_reply).
+    """
+    await _ensure_initialized()
+
+    try:
+        if len(updates) == 1:
+            return await _process_single_update(updates[0])
+
+        results = await asyncio.gather(
+            *(_process_update(update_data) for update_data in updates),
+            return_exceptions=True,
+        )
+        for update_data, result in zip(updates, results):
+            if isinstance(result, Exception):
+                # Одна сломанная запись не должна заставлять Telegram ретраить всю пачку.
+                print(f"> !Ошибка обработки апдейта {update_data.get('update_id')}: {result!r}")
+    finally:
+        # Накопленные изменения профилей пишем пачкой, когда подошёл срок.
+        await flush_profiles()
+
+
+def _is_timer_event(event: Any) -> bool:
+    """Вызов от таймер‑триггера Yandex Cloud Functions, а не от Telegram."""
+    messages = event.get("messages") if isinstance(event, dict) else None
+    if not messages or not isinstance(messages, list):
+        return False
+    return all(
+        isinstance(message, dict)
+        and str(message.get("event_metadata", {}).get("event_type", "")).endswith("TimerMessage")
+        for message in messages
+    )
+
+
+async def _process_timer() -> None:
+    await _ensure_initialized()
+    notified = await sweep_labs_on_timer(bot)
+    if notified:
+        print(f"> Уведомлений о лаборатории: {notified}")
+
+
+def _parse_updates(body: Any) -> List[Dict[str, Any]]:
+    """
+    Привести тело запроса к списку апдейтов.
+    Поддерживается одиночный апдейт и JSON‑массив апдейтов.
+    """
+    if isinstance(body, (bytes, bytearray)):
+        body = body.decode("utf-8")
+
+    if isinstance(body, str):
+        body = body.strip()
+        if not body:
+            return []
+        body = json.loads(body)
+
+    if isinstance(body, dict):
+        # В некоторых случаях апдейт может прилететь сразу как dict
+        return [body] if "update_id" in body else []
+
+    if isinstance(body, list):
+        return [item for item in body if isinstance(item, dict) and "update_id" in item]
+
+    return []
 
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
@@ -101,33 +274,45 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         "body": "<raw JSON update from Telegram>",
         ...
     }
+
+    В `body` также может лежать JSON‑массив апдейтов — тогда они
+    обрабатываются одной пачкой в рамках одного вызова функции.
+    Вызов таймер‑триггера (`{"messages": [...TimerMessage...]}`) запускает
+    проход по готовым Бетам лаборатории.
     """
+    if _is_timer_event(event):
+        # Периодический проход по готовым Бетам лаборатории.
+        _loop.run_until_complete(_process_timer())
+        dump_metrics_if_due()
+        return {"statusCode": 200, "body": ""}
+
     # Достаём тело запроса
     body = event.get("body", event)
 
     try:
-        if isinstance(body, (bytes, bytearray)):
-            body = body.decode("utf-8")
-
-        if isinstance(body, str):
-            body = body.strip()
-            if not body:
-                return {"statusCode": 200, "body": ""}
-            update_data = json.loads(body)
-        elif isinstance(body, dict) and "update_id" in body:
-            # В некоторых случаях апдейт может прилететь сразу как dict
-            update_data = body
-        else:
-            # Непонятный формат — просто отвечаем 200, чтобы Telegram не ретраил
-            return {"statusCode": 200, "body": ""}
+        updates = _parse_updates(body)
     except Exception:
         # Не смогли распарсить апдейт — игнорируем
         return {"statusCode": 200, "body": ""}
 
-    # Запускаем асинхронную обработку апдейта в глобальном event loop.
+    if not updates:
+        # Непонятный формат — просто отвечаем 200, чтобы Telegram не ретраил
+        return {"statusCode": 200, "body": ""}
+
+    # Запускаем асинхронную обработку апдейтов в глобальном event loop.
     # НЕЛЬЗЯ использовать asyncio.run(), т.к. он создаёт новый цикл на каждый запрос,
     # а asyncpg/SQLAlchemy ожидают один и тот же цикл для пула соединений.
-    _loop.run_until_complete(_process_update(update_data))
+    reply = _loop.run_until_complete(_process_updates(updates))
+    # Сервера метрик у функции нет — время от времени печатаем снимок в лог.
+    dump_metrics_if_due()
+
+    if reply is not None:
+        # Telegram выполнит этот вызов сам — на один исходящий запрос меньше.
+        return {
+            "statusCode": 200,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps(reply, ensure_ascii=False),
+        }
 
     # Фиктивный HTTP‑ответ, которого достаточно для Telegram / Яндекса
     return {"statusCode": 200, "body": ""}
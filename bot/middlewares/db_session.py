@@ -0,0 +1,46 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.database.models.base import async_session
+from bot.database.request.identity import forget_identity
+from bot.database.request.profile_sync import forget_user, sync_user
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Unit of work на апдейт: одна AsyncSession и одна транзакция.
+
+    Сессия попадает в хендлеры аргументом `session`, сервисы получают её
+    от хендлеров и делают только flush. Коммит — один раз в конце апдейта,
+    при исключении транзакция откатывается.
+    Соединение из пула берётся лениво, при первом запросе к БД.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        tg_user = data.get("event_from_user")
+
+        async with async_session() as session:
+            data["session"] = session
+            try:
+                if tg_user is not None and not tg_user.is_bot:
+                    # Глобально следим, чтобы пользователь был зарегистрирован в БД.
+                    # Это примерно то же самое, что /start: создаёт User/Player при первом заходе.
+                    await sync_user(session, tg_user)
+
+                result = await handler(event, data)
+                await session.commit()
+            except Exception:
+                if tg_user is not None:
+                    # Пользователь мог создаваться в откатившейся транзакции.
+                    forget_user(tg_user.id)
+                    forget_identity(tg_user.id)
+                raise
+
+        return result
@@ -0,0 +1,33 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.core.metrics import handler_duration, handler_errors
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware: длительность и ошибки хендлеров.
+    Роутер — модуль хендлера (noshenie, merge, shelter, ...), хендлер — имя функции.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        callback = getattr(data.get("handler"), "callback", None)
+        router = getattr(callback, "__module__", "?").rsplit(".", 1)[-1]
+        name = getattr(callback, "__name__", "?")
+
+        started_at = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            handler_errors.inc(router, name)
+            raise
+        finally:
+            handler_duration.observe(time.perf_counter() - started_at, router, name)
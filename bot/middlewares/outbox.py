@@ -0,0 +1,29 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.core.delivery import Outbox
+
+
+class OutboxMiddleware(BaseMiddleware):
+    """
+    Очередь исходящих сообщений на апдейт.
+
+    Хендлеры получают аргумент `outbox` и складывают в него уведомления.
+    Регистрируется снаружи DbSessionMiddleware, поэтому сообщения уходят
+    только после успешного коммита; если апдейт упал — они отбрасываются.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        outbox = Outbox()
+        data["outbox"] = outbox
+
+        result = await handler(event, data)
+        await outbox.flush(data["bot"])
+        return result
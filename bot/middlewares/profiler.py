@@ -0,0 +1,43 @@
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.core import config
+from bot.core.profiler import emit
+from bot.database.sql_stats import current_stats
+from bot.middlewares.sql_scope import handler_scope_name
+
+
+class SlowHandlerMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware: хендлеры дольше SLOW_HANDLER_MS попадают
+    в журнал медленных (bot/core/profiler.py) вместе со своими счётчиками SQL
+    (их собирает SqlScopeMiddleware в области хендлера).
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        started_at = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            elapsed_ms = (time.perf_counter() - started_at) * 1000
+            if elapsed_ms >= config.SLOW_HANDLER_MS:
+                name = handler_scope_name(data.get("handler"))
+                stats = current_stats()
+                sql = stats.scopes.get(name) if stats is not None and name else None
+                update = data.get("event_update")
+                emit(
+                    "slow_handler",
+                    ms=round(elapsed_ms, 3),
+                    handler=name,
+                    update_id=getattr(update, "update_id", None),
+                    event_type=getattr(update, "event_type", None),
+                    sql=sql.as_dict() if sql is not None else None,
+                )
@@ -0,0 +1,35 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.database.sql_stats import sql_scope
+
+
+def handler_scope_name(handler_object: Any) -> str | None:
+    """Имя области хендлера: `handler:<модуль>.<функция>`."""
+    callback = getattr(handler_object, "callback", None)
+    if callback is None:
+        return None
+    module = getattr(callback, "__module__", "").rsplit(".", 1)[-1]
+    return f"handler:{module}.{getattr(callback, '__name__', '?')}"
+
+
+class SqlScopeMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware: запросы хендлера попадают в отдельную область
+    счётчиков SQL (`handler:<модуль>.<функция>`), см. bot/database/sql_stats.py.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        scope_name = handler_scope_name(data.get("handler"))
+        if scope_name is None:
+            return await handler(event, data)
+
+        with sql_scope(scope_name):
+            return await handler(event, data)
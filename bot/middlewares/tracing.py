@@ -0,0 +1,26 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from bot.core.tracing import trace_span
+
+
+class TracedMiddleware(BaseMiddleware):
+    """
+    Обёртка над middleware: спан трассировки на время его работы
+    (вместе со всем, что он вызывает дальше по цепочке).
+    """
+
+    def __init__(self, inner: BaseMiddleware) -> None:
+        self.inner = inner
+        self.name = type(inner).__name__
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        with trace_span(self.name, "middleware"):
+            return await self.inner(handler, event, data)
@@ -0,0 +1,101 @@
+"""
+Долгоживущий режим: aiohttp‑сервер вебхука.
+
+В отличие от облачной функции, процесс живёт постоянно, поэтому пул
+соединений SQLAlchemy и HTTP‑сессия Bot остаются «тёплыми» между апдейтами.
+Запуск: `python -m bot.server`.
+"""
+from aiohttp import web
+
+from bot.core.config import (
+    METRICS_PATH,
+    WEBHOOK_URL,
+    WEBHOOK_PATH,
+    WEBAPP_HOST,
+    WEBAPP_PORT,
+    WEBHOOK_SECRET,
+)
+from bot.core.loader import bot
+from bot.core.metrics import registry
+from bot.core.profiler import wait_for_explains
+from bot.database.engine_profiles import pool_stats
+from bot.database.models.base import engine
+from bot.database.request.profile_sync import flush_profiles
+from bot.main import _loop, _ensure_initialized, _parse_updates, _process_updates
+from bot.service.lab_scheduler import start_lab_scheduler, stop_lab_scheduler
+from bot.service.quote_service import close_quote_session
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+async def webhook_handler(request: web.Request) -> web.Response:
+    if WEBHOOK_SECRET and request.headers.get(SECRET_HEADER) != WEBHOOK_SECRET:
+        return web.Response(status=401)
+
+    try:
+        updates = _parse_updates(await request.read())
+    except Exception:
+        # Не смогли распарсить апдейт — отвечаем 200, чтобы Telegram не ретраил
+        return web.Response(status=200)
+
+    if not updates:
+        return web.Response(status=200)
+
+    # aiohttp обслуживает каждый запрос в своей задаче,
+    # поэтому апдейты разных пользователей идут параллельно.
+    reply = await _process_updates(updates)
+    if reply is not None:
+        # Первый ответ апдейта Telegram выполнит сам, из тела ответа.
+        return web.json_response(reply)
+
+    return web.Response(status=200)
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(
+        body=registry.render().encode("utf-8"),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+async def on_startup(app: web.Application) -> None:
+    await _ensure_initialized()
+    # Процесс живёт постоянно — уведомления лаборатории приходят точно к сроку.
+    start_lab_scheduler(bot)
+
+    if WEBHOOK_URL:
+        await bot.set_webhook(
+            WEBHOOK_URL,
+            secret_token=WEBHOOK_SECRET,
+            drop_pending_updates=False,
+        )
+        print(f"> Вебхук установлен: {WEBHOOK_URL}")
+
+
+async def on_shutdown(app: web.Application) -> None:
+    await stop_lab_scheduler()
+    await flush_profiles(force=True)
+    await wait_for_explains()
+    print(f"> Пул соединений БД: {pool_stats.as_dict()}")
+    await close_quote_session()
+    await bot.session.close()
+    await engine.dispose()
+
+
+def create_app() -> web.Application:
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, webhook_handler)
+    if METRICS_PATH:
+        app.router.add_get(METRICS_PATH, metrics_handler)
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    return app
+
+
+def main() -> None:
+    # Используем тот же общий event loop, что и entry‑point функции.
+    web.run_app(create_app(), host=WEBAPP_HOST, port=WEBAPP_PORT, loop=_loop)
+
+
+if __name__ == "__main__":
+    main()
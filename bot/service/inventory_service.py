@@ -0,0 +1,77 @@
+"""
+Денормализованные счётчики инвентаря игрока.
+
+Player.active_bets_count / lab_bets_count / shelter_bets_count меняются
+в тех же транзакциях, что и сами Беты, — вместо count(*) по bets на каждый
+запрос. Как и баланс в wallet.py, счётчики меняются одним
+`UPDATE players SET x = x + :n ... RETURNING`, а не чтением‑записью в Python:
+строку продавца или проигравшего в слиянии параллельно может менять
+апдейт другого игрока (или другой инстанс), и изменения не должны теряться.
+Если счётчики разошлись со строками (ручные правки, старые данные),
+их чинит reconcile_inventory_counters() (bot/database/request/inventory.py).
+"""
+from typing import Any, Dict
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from bot.database.dialect import supports_update_returning
+from bot.database.models.bets.bet import Bet
+from bot.database.models.players.player import Player
+from bot.database.request.inventory import reconcile_inventory_counters  # noqa: F401 — реэкспорт
+
+_COUNTERS = ("active_bets_count", "lab_bets_count", "shelter_bets_count")
+
+
+def inventory_values(active: int = 0, lab: int = 0, shelter: int = 0) -> Dict[str, Any]:
+    """
+    SQL‑выражения сдвига счётчиков — для UPDATE players. Операции, которые
+    заодно меняют баланс, передают их в change_balance(values=...).
+    """
+    deltas = dict(zip(_COUNTERS, (active, lab, shelter)))
+    return {name: getattr(Player, name) + delta for name, delta in deltas.items() if delta}
+
+
+async def adjust_inventory(
+    session: AsyncSession,
+    player: Player,
+    active: int = 0,
+    lab: int = 0,
+    shelter: int = 0,
+) -> None:
+    """
+    Атомарно сдвинуть счётчики игрока. Загруженный объект Player получает
+    значения из RETURNING как «закоммиченные», поэтому flush их не перезапишет.
+    """
+    values = inventory_values(active, lab, shelter)
+    if not values:
+        return
+
+    stmt = (
+        update(Player)
+        .where(Player.id == player.id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    columns = [getattr(Player, name) for name in _COUNTERS]
+    if supports_update_returning(session):
+        row = (await session.execute(stmt.returning(*columns))).one_or_none()
+    else:
+        await session.execute(stmt)
+        row = (await session.execute(select(*columns).where(Player.id == player.id))).one_or_none()
+
+    if row is not None:
+        for name, value in zip(_COUNTERS, row):
+            set_committed_value(player, name, value)
+
+
+async def remove_bet_from_inventory(session: AsyncSession, player: Player, bet: Bet) -> None:
+    """Бет перестаёт принадлежать игроку (проиграл слияние или продан)."""
+    await adjust_inventory(
+        session,
+        player,
+        active=-1,
+        lab=-1 if bet.in_lab else 0,
+        shelter=-1 if bet.in_shelter else 0,
+    )
@@ -0,0 +1,172 @@
+"""
+Уведомления «Бет вернулся из лаборатории».
+
+Источник правды — частичный индекс ix_bets_lab_due (bot/database/request/lab_queue.py):
+проход `sweep_due_labs` забирает готовые Беты через SKIP LOCKED, помечает
+их уведомлёнными и после коммита шлёт каждому игроку одно сообщение
+на все его Беты с кнопкой «забрать».
+
+Когда проходить, зависит от режима:
+
+- сервер (bot.server) — фоновая задача держит в памяти кучу ближайших
+  сроков окончания и просыпается точно к ним; новые сроки кладёт
+  start_lab_for_bet, а раз в LAB_REFILL_SECONDS куча перечитывается из
+  индекса (сроки других инстансов, упущенные откаты);
+- облачная функция — фоновых задач нет, поэтому проход делается только
+  на вызов таймер‑триггера (`sweep_labs_on_timer`), а не в обработке
+  апдейтов: вебхук не ждёт чужих уведомлений. Точность уведомлений
+  задаёт расписание триггера (например, раз в минуту).
+"""
+import asyncio
+import heapq
+import time
+from datetime import datetime, timezone
+from typing import List
+
+from aiogram import Bot
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from bot.core.delivery import Outbox
+from bot.database.models.base import async_session
+from bot.database.request.lab_queue import ReadyBet, claim_due_lab_bets, upcoming_lab_deadlines
+
+# Сколько Бетов забирать одним запросом.
+LAB_SWEEP_BATCH = 500
+# Сколько ближайших сроков держать в куче.
+LAB_HEAP_LIMIT = 10_000
+# Проход запускается через столько секунд после ближайшего срока —
+# Беты одного игрока, закончившие почти одновременно, попадут в одно сообщение.
+LAB_BATCH_WINDOW_SECONDS = 1.0
+# Как часто перечитывать кучу из БД в режиме сервера.
+LAB_REFILL_SECONDS = 300
+
+_heap: List[float] = []
+_wakeup: asyncio.Event | None = None
+_task: asyncio.Task | None = None
+
+
+def _ready_message(bets: List[ReadyBet]) -> tuple[str, InlineKeyboardBuilder]:
+    kb = InlineKeyboardBuilder()
+    if len(bets) == 1:
+        bet = bets[0]
+        text = (
+            "🧪 Бет вернулся из лаборатории!\n\n"
+            f"<b>{bet.name}</b> (ур.{bet.level}) закончил работу — награда ждёт."
+        )
+        kb.button(text="Забрать награду", callback_data=f"lab:collect:{bet.bet_id}")
+    else:
+        lines = [f"🧪 Из лаборатории вернулись Беты ({len(bets)}):\n"]
+        lines += [f"• <b>{bet.name}</b> (ур.{bet.level})" for bet in bets]
+        lines.append("\nНаграды ждут.")
+        text = "\n".join(lines)
+        kb.button(text="Забрать все награды", callback_data="lab:collect_all")
+    return text, kb
+
+
+async def sweep_due_labs(bot: Bot) -> int:
+    """
+    Уведомить владельцев всех готовых Бетов. Возвращает число уведомлённых игроков.
+    Строки помечаются в транзакции, сообщения уходят после коммита: при сбое
+    отправки уведомление теряется, но игрок всё равно увидит Бета в лаборатории.
+    """
+    notified = 0
+    while True:
+        async with async_session() as session:
+            ready = await claim_due_lab_bets(session, datetime.now(timezone.utc), LAB_SWEEP_BATCH)
+            await session.commit()
+        if not ready:
+            return notified
+
+        outbox = Outbox()
+        for tg_id, bets in ready.items():
+            text, kb = _ready_message(bets)
+            outbox.send(tg_id, text, parse_mode="HTML", reply_markup=kb.as_markup())
+        await outbox.flush(bot)
+        notified += len(ready)
+
+        if sum(len(bets) for bets in ready.values()) < LAB_SWEEP_BATCH:
+            return notified
+
+
+async def sweep_labs_on_timer(bot: Bot) -> int:
+    """Проход по вызову таймер‑триггера облачной функции."""
+    if _task is not None:
+        # В режиме сервера проходами управляет фоновая задача.
+        return 0
+    try:
+        return await sweep_due_labs(bot)
+    except Exception as e:
+        print(f"> !Ошибка прохода по лаборатории: {e!r}")
+        return 0
+
+
+def schedule_lab_deadline(ends_at: datetime | None) -> None:
+    """Добавить срок окончания в кучу фоновой задачи (вне режима сервера — ничего)."""
+    if _task is None or ends_at is None:
+        return
+    deadline = ends_at.timestamp()
+    is_earliest = not _heap or deadline < _heap[0]
+    heapq.heappush(_heap, deadline)
+    if is_earliest:
+        _wakeup.set()
+
+
+async def _refill() -> None:
+    async with async_session() as session:
+        deadlines = await upcoming_lab_deadlines(session, LAB_HEAP_LIMIT)
+    _heap[:] = [ends_at.timestamp() for ends_at in deadlines]
+    heapq.heapify(_heap)
+
+
+async def _run(bot: Bot) -> None:
+    refill_at = 0.0
+    while True:
+        try:
+            if time.monotonic() >= refill_at:
+                # Срок следующего перечитывания — до попытки, чтобы при недоступной БД не крутиться.
+                refill_at = time.monotonic() + LAB_REFILL_SECONDS
+                # Заодно забираем всё, что стало готовым, пока нас не было.
+                await sweep_due_labs(bot)
+                await _refill()
+
+            now = time.time()
+            if _heap and _heap[0] + LAB_BATCH_WINDOW_SECONDS <= now:
+                while _heap and _heap[0] <= now:
+                    heapq.heappop(_heap)
+                await sweep_due_labs(bot)
+                continue
+        except Exception as e:
+            print(f"> !Ошибка планировщика лаборатории: {e!r}")
+
+        timeout = refill_at - time.monotonic()
+        if _heap:
+            timeout = min(timeout, _heap[0] + LAB_BATCH_WINDOW_SECONDS - time.time())
+        _wakeup.clear()
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=max(timeout, 0.0))
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_lab_scheduler(bot: Bot) -> None:
+    """Запустить фоновую задачу (режим сервера)."""
+    global _task, _wakeup
+
+    if _task is not None:
+        return
+    _wakeup = asyncio.Event()
+    _task = asyncio.get_running_loop().create_task(_run(bot))
+
+
+async def stop_lab_scheduler() -> None:
+    global _task
+
+    if _task is None:
+        return
+    task, _task = _task, None
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    _heap.clear()
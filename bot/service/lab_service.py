@@ -7,8 +7,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from bot.database.models.bets.bet import Bet
 from bot.database.models.bets.enums import RarityEnum
 from bot.database.models.players.player import Player
-from bot.database.models.user import User
+from bot.database.request.identity import get_player_by_tg
+from bot.database.request.wallet import credit
+from bot.service.inventory_service import adjust_inventory
+from bot.service.lab_scheduler import schedule_lab_deadline
 from bot.service.xp_service import add_xp, LAB_XP_REWARD
+from bot.core.metrics import count_outcomes
+from bot.database.sql_stats import track_sql
 
 
 LAB_DURATION_MINUTES = {
@@ -60,12 +65,11 @@ def calc_lab_total_reward(player: Player, bet: Bet) -> int:
 
 
 async def _get_player_by_tg(session: AsyncSession, tg_id: int) -> Player | None:
-    user = await session.scalar(select(User).where(User.tg_id == tg_id))
-    if not user:
-        return None
-    return await session.scalar(select(Player).where(Player.user_id == user.id))
+    return await get_player_by_tg(session, tg_id)
 
 
+@count_outcomes("lab_start")
+@track_sql()
 async def start_lab_for_bet(
     session: AsyncSession, tg_id: int, bet_id: int, duration_minutes: int
 ) -> Dict[str, Any]:
@@ -104,13 +108,16 @@ async def start_lab_for_bet(
 
     now = datetime.now(timezone.utc)
     bet.in_lab = True
+    await adjust_inventory(session, player, lab=1)
     bet.lab_started_at = now
     bet.lab_ends_at = now + timedelta(minutes=duration_minutes)
+    bet.lab_notified = False
 
     reward = _calc_lab_reward(player, bet, duration_minutes)
 
-    await session.commit()
-    await session.refresh(bet)
+    await session.flush()
+    # Разбудить планировщик к сроку окончания (если апдейт откатится — проход будет пустым).
+    schedule_lab_deadline(bet.lab_ends_at)
 
     return {
         "ok": True,
@@ -125,6 +132,8 @@ async def start_lab_for_bet(
     }
 
 
+@count_outcomes("lab_collect")
+@track_sql()
 async def collect_lab_reward(
     session: AsyncSession, tg_id: int, bet_id: int
 ) -> Dict[str, Any]:
@@ -171,19 +180,19 @@ async def collect_lab_reward(
     duration_minutes = int((bet.lab_ends_at - bet.lab_started_at).total_seconds() // 60)
     reward = _calc_lab_reward(player, bet, duration_minutes)
 
-    player.neurons += reward
+    await credit(session, player.id, reward, reason="lab")
 
     # Опыт за завершение работы Бета в лаборатории
     rank_before = player.rank
     rank_ups = add_xp(player, LAB_XP_REWARD)
 
     bet.in_lab = False
+    await adjust_inventory(session, player, lab=-1)
     bet.lab_started_at = None
     bet.lab_ends_at = None
+    bet.lab_notified = False
 
-    await session.commit()
-    await session.refresh(player)
-    await session.refresh(bet)
+    await session.flush()
 
     return {
         "ok": True,
@@ -198,3 +207,68 @@ async def collect_lab_reward(
         "rank_after": player.rank,
         "rank_ups": rank_ups,
     }
+
+
+@count_outcomes("lab_collect_all")
+@track_sql()
+async def collect_all_lab_rewards(session: AsyncSession, tg_id: int) -> Dict[str, Any]:
+    """Забрать награды всех Бетов игрока, уже закончивших работу (кнопка из уведомления)."""
+    player = await _get_player_by_tg(session, tg_id)
+    if not player:
+        return {
+            "ok": False,
+            "reason": "player_not_found",
+            "message": "Игровой профиль не найден. Сначала используй /start.",
+        }
+
+    now = datetime.now(timezone.utc)
+    ready_bets = (
+        await session.scalars(
+            select(Bet).where(
+                Bet.owner_id == player.id,
+                Bet.is_active == True,
+                Bet.in_lab == True,
+                Bet.in_shelter == False,
+                Bet.lab_started_at.is_not(None),
+                Bet.lab_ends_at <= now,
+            )
+        )
+    ).all()
+    if not ready_bets:
+        return {
+            "ok": False,
+            "reason": "nothing_ready",
+            "message": "В лаборатории нет Бетов, готовых отдать награду.",
+        }
+
+    # Награды считаем в Python, а баланс, опыт и счётчик меняем один раз на всю пачку.
+    reward = 0
+    for bet in ready_bets:
+        duration_minutes = int((bet.lab_ends_at - bet.lab_started_at).total_seconds() // 60)
+        reward += _calc_lab_reward(player, bet, duration_minutes)
+        bet.in_lab = False
+        bet.lab_started_at = None
+        bet.lab_ends_at = None
+        bet.lab_notified = False
+
+    await credit(session, player.id, reward, reason="lab")
+
+    rank_before = player.rank
+    xp_gained = LAB_XP_REWARD * len(ready_bets)
+    rank_ups = add_xp(player, xp_gained)
+
+    await adjust_inventory(session, player, lab=-len(ready_bets))
+
+    await session.flush()
+
+    return {
+        "ok": True,
+        "reason": None,
+        "reward": reward,
+        "bet_names": [bet.name for bet in ready_bets],
+        "player_neurons": player.neurons,
+        "xp_gained": xp_gained,
+        "rank_before": rank_before,
+        "rank_after": player.rank,
+        "rank_ups": rank_ups,
+    }
@@ -1,14 +1,18 @@
 import random
 from typing import Dict, Any
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.database.models.bets.bet import Bet
 from bot.database.models.bets.enums import RarityEnum
 from bot.database.models.players.player import Player
+from bot.database.request.wallet import change_balance
+from bot.service.inventory_service import remove_bet_from_inventory
 from bot.service.noshenie_service import get_or_create_player, MAX_BET_LEVEL
 from bot.service.xp_service import add_xp, MERGE_XP_REWARD
+from bot.core.metrics import count_outcomes
+from bot.database.sql_stats import track_sql
 
 MERGE_COST_NEURONS = 80
 MERGE_REWARD_MIN = 40
@@ -54,6 +58,38 @@ def roll_merge_reward() -> int:
     return random.randint(MERGE_REWARD_MIN, MERGE_REWARD_MAX)
 
 
+async def _claim_bet(session: AsyncSession, bet: Bet, owner_id: int, **values) -> bool:
+    """
+    Условный UPDATE Бета: проходит, только если он всё ещё активен,
+    не в лаборатории и у того же владельца. Заодно блокирует строку
+    до конца транзакции, так что параллельное слияние его не заберёт.
+    """
+    result = await session.execute(
+        update(Bet)
+        .where(
+            Bet.id == bet.id,
+            Bet.owner_id == owner_id,
+            Bet.is_active == True,
+            Bet.in_lab == False,
+        )
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+async def _release_bet(session: AsyncSession, bet: Bet) -> None:
+    """Вернуть проигравшего, если слияние сорвалось уже после _claim_bet."""
+    await session.execute(
+        update(Bet)
+        .where(Bet.id == bet.id)
+        .values(is_active=True)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@count_outcomes("merge")
+@track_sql()
 async def perform_merge(
     session: AsyncSession,
     initiator_tg_id: int,
@@ -140,6 +176,8 @@ async def perform_merge(
     initiator_wins = roll < initiator_chance
 
     if initiator_wins:
+        winner_tg_id = initiator_tg_id
+        loser_tg_id = partner_tg_id
         winner_player = initiator_player
         winner_bet = initiator_bet
         winner_rarity = initiator_rarity
@@ -147,6 +185,8 @@ async def perform_merge(
         loser_bet = partner_bet
         loser_rarity = partner_rarity
     else:
+        winner_tg_id = partner_tg_id
+        loser_tg_id = initiator_tg_id
         winner_player = partner_player
         winner_bet = partner_bet
         winner_rarity = partner_rarity
@@ -154,6 +194,68 @@ async def perform_merge(
         loser_bet = initiator_bet
         loser_rarity = initiator_rarity
 
+    # Оба Бета закрепляем за слиянием до движения нейронов (в порядке id —
+    # встречные слияния не взаимоблокируются): проигравший сразу выбывает,
+    # строка победителя просто блокируется.
+    claims = sorted(
+        [
+            (loser_bet, loser_player.id, {"is_active": False}),
+            (winner_bet, winner_player.id, {"level": Bet.level}),
+        ],
+        key=lambda claim: claim[0].id,
+    )
+    loser_claimed = False
+    for bet, owner_id, values in claims:
+        if not await _claim_bet(session, bet, owner_id, **values):
+            if loser_claimed:
+                await _release_bet(session, loser_bet)
+            return {
+                "ok": False,
+                "reason": "bet_not_found",
+                "message": "Один из выбранных Бетов не найден или больше недоступен.",
+            }
+        loser_claimed = loser_claimed or bet is loser_bet
+
+    reward = roll_merge_reward()
+    winner_neurons_gain = reward
+    loser_neurons_gain = reward * 2
+
+    # Стоимость и награда — по одному условному UPDATE на игрока:
+    # если кто‑то успел потратить нейроны параллельно, слияние не проводим.
+    winner_neurons = await change_balance(
+        session,
+        winner_player.id,
+        winner_neurons_gain - MERGE_COST_NEURONS,
+        require_at_least=MERGE_COST_NEURONS,
+        reason="merge",
+    )
+    loser_neurons = None
+    if winner_neurons is not None:
+        loser_neurons = await change_balance(
+            session,
+            loser_player.id,
+            loser_neurons_gain - MERGE_COST_NEURONS,
+            require_at_least=MERGE_COST_NEURONS,
+            reason="merge",
+        )
+        if loser_neurons is None:
+            await change_balance(
+                session,
+                winner_player.id,
+                MERGE_COST_NEURONS - winner_neurons_gain,
+                reason="merge_refund",
+            )
+    if loser_neurons is None:
+        await _release_bet(session, loser_bet)
+        return {
+            "ok": False,
+            "reason": "not_enough_neurons",
+            "message": (
+                f"У обоих игроков должно быть минимум {MERGE_COST_NEURONS} нейронов "
+                "для слияния."
+            ),
+        }
+
     # Считаем, на сколько уровней вырастет Бет-победитель.
     loser_level = loser_bet.level or 0
     rarity_factor = RARITY_LEVEL_FACTOR.get(loser_rarity, 0.1)
@@ -167,17 +269,8 @@ async def perform_merge(
     winner_old_level = winner_bet.level or 0
     winner_new_level = min(winner_old_level + level_gain, MAX_BET_LEVEL)
 
-    winner_player.neurons -= MERGE_COST_NEURONS
-    loser_player.neurons -= MERGE_COST_NEURONS
-
-    reward = roll_merge_reward()
-    winner_neurons_gain = reward
-    loser_neurons_gain = reward * 2
-
-    winner_player.neurons += winner_neurons_gain
-    loser_player.neurons += loser_neurons_gain
-
     winner_bet.level = winner_new_level
+    await remove_bet_from_inventory(session, loser_player, loser_bet)
     loser_bet.is_active = False
 
     # Опыт за участие в слиянии — обоим игрокам
@@ -187,16 +280,13 @@ async def perform_merge(
     winner_rank_ups = add_xp(winner_player, MERGE_XP_REWARD)
     loser_rank_ups = add_xp(loser_player, MERGE_XP_REWARD)
 
-    await session.commit()
-    await session.refresh(winner_player)
-    await session.refresh(loser_player)
-    await session.refresh(winner_bet)
+    await session.flush()
 
     return {
         "ok": True,
         "reason": None,
-        "winner_tg_id": winner_player.user.tg_id,
-        "loser_tg_id": loser_player.user.tg_id,
+        "winner_tg_id": winner_tg_id,
+        "loser_tg_id": loser_tg_id,
         "winner_bet_id": winner_bet.id,
         "loser_bet_id": loser_bet.id,
         "winner_bet_name": winner_bet.name,
@@ -210,8 +300,8 @@ async def perform_merge(
         "merge_cost": MERGE_COST_NEURONS,
         "winner_neurons_gain": winner_neurons_gain,
         "loser_neurons_gain": loser_neurons_gain,
-        "winner_total_neurons": winner_player.neurons,
-        "loser_total_neurons": loser_player.neurons,
+        "winner_total_neurons": winner_neurons,
+        "loser_total_neurons": loser_neurons,
         "winner_xp_gained": MERGE_XP_REWARD,
         "loser_xp_gained": MERGE_XP_REWARD,
         "winner_rank_before": winner_rank_before,
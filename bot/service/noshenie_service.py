@@ -1,16 +1,20 @@
 # bot/service/noshenie_service.py
 import random
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any
+from typing import Dict, Any, List
 
-from sqlalchemy import select, func
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.database.models.players.player import Player
 from bot.database.models.bets.bet import Bet
 from bot.database.models.bets.enums import RarityEnum
-from bot.database.models.user import User
+from bot.database.request.player_requests import get_or_create_player_for_user
+from bot.database.request.wallet import change_balance, pending_player_values
+from bot.service.inventory_service import inventory_values
 from bot.service.xp_service import add_xp, NOSHENIE_XP_REWARD
+from bot.core.metrics import count_outcomes
+from bot.database.sql_stats import track_sql
 
 NOSHENIE_COOLDOWN = timedelta(hours=0.0)
 NOSHENIE_COST_NEURONS = 140
@@ -19,6 +23,19 @@ NEURON_REWARD_MAX = 25
 LEGENDARY_PITY_THRESHOLD = 60
 BET_LEVEL_STEP = 5
 MAX_BET_LEVEL = 60
+# Стартовый баланс нового игрока.
+STARTING_NEURONS = 400
+# Сколько ношений выполняет кнопка мульти‑ношения.
+NOSHENIE_MULTI_PULLS = 10
+
+# Накопленные вероятности редкостей для roll_rarity:
+# 80% обычный, 10% редкий, 8% эпический, 2% легендарный.
+RARITY_CUMULATIVE_CHANCES = (
+    (RarityEnum.COMMON, 0.80),
+    (RarityEnum.RARE, 0.90),
+    (RarityEnum.EPIC, 0.98),
+    (RarityEnum.LEGENDARY, 1.0),
+)
 
 BET_NAMES_BY_RARITY = {
     RarityEnum.COMMON: ["Маршал", "Тоша", "Эмма", "Георг", "Тула", "Зоня", "Тути"],
@@ -28,59 +45,23 @@ BET_NAMES_BY_RARITY = {
 }
 
 
-async def _get_active_bets_count(session: AsyncSession, player_id: int) -> int:
-    """
-    Подсчитать текущее количество Бетов, которые реально принадлежат игроку.
-    Учитываем только активных Бетов (проигранные в слиянии не считаем).
-    """
-    value = await session.scalar(
-        select(func.count())
-        .select_from(Bet)
-        .where(Bet.owner_id == player_id, Bet.is_active == True)
-    )
-    return int(value or 0)
-
 async def get_or_create_player(session, tg_id: int) -> Player:
-    user = await session.scalar(
-        select(User).where(User.tg_id == tg_id)
+    return await get_or_create_player_for_user(
+        session,
+        tg_id,
+        xp=0,
+        neurons=STARTING_NEURONS,
+        noshenie_count=0,
     )
 
-    if not user:
-        raise RuntimeError(f"User с tg_id={tg_id} не найден, сначала дерни /start")
-
-
-    player = await session.scalar(
-        select(Player).where(Player.user_id == user.id)
-    )
-
-    if not player:
-        player = Player(
-            user_id=user.id,
-            rank=0,
-            xp=0,
-            neurons=400,
-            count_bets=0,
-            noshenie_count=0,
-        )
-        session.add(player)
-        await session.commit()
-        await session.refresh(player)
-        print(f"> +Создан новый Player для user_id={user.id}")
-
-    return player
-
 
 def roll_rarity() -> RarityEnum:
     x = random.random()
 
-    if x < 0.80:
-        return RarityEnum.COMMON
-    elif x < 0.90:
-        return RarityEnum.RARE
-    elif x < 0.98:
-        return RarityEnum.EPIC
-    else:
-        return RarityEnum.LEGENDARY
+    for rarity, bound in RARITY_CUMULATIVE_CHANCES:
+        if x < bound:
+            return rarity
+    return RarityEnum.LEGENDARY
 
 
 def roll_neuron_reward() -> int:
@@ -92,6 +73,23 @@ def roll_bet_name_for_rarity(rarity: RarityEnum) -> str:
     return random.choice(names)
 
 
+def _roll_rarity_with_pity(player: Player) -> RarityEnum:
+    """Редкость очередного ношения с учётом гаранта; обновляет счётчик гаранта."""
+    if player.noshenie_count >= LEGENDARY_PITY_THRESHOLD - 1:
+        rarity = RarityEnum.LEGENDARY
+    else:
+        rarity = roll_rarity()
+
+    if rarity == RarityEnum.LEGENDARY:
+        player.noshenie_count = 0
+    else:
+        player.noshenie_count += 1
+
+    return rarity
+
+
+@count_outcomes("noshenie")
+@track_sql()
 async def do_noshenie(session: AsyncSession, tg_id: int) -> Dict[str, Any]:
     player = await get_or_create_player(session, tg_id)
     now = datetime.now(timezone.utc)
@@ -101,7 +99,7 @@ async def do_noshenie(session: AsyncSession, tg_id: int) -> Dict[str, Any]:
         if delta < NOSHENIE_COOLDOWN:
             remaining = NOSHENIE_COOLDOWN - delta
             minutes_left = int(remaining.total_seconds() // 60) + 1
-            bets_count = await _get_active_bets_count(session, player.id)
+            bets_count = player.active_bets_count
             return {
                 "ok": False,
                 "reason": "cooldown",
@@ -126,10 +124,53 @@ async def do_noshenie(session: AsyncSession, tg_id: int) -> Dict[str, Any]:
         or player.last_free_noshenie_at.date() < now.date()
     )
     use_free = is_free_available
+    neurons_spent = 0 if use_free else NOSHENIE_COST_NEURONS
+    neurons_reward = roll_neuron_reward()
 
-    # Если бесплатное уже использовано и нейронов не хватает — не даём ношение
-    if not use_free and player.neurons < NOSHENIE_COST_NEURONS:
-        bets_count = await _get_active_bets_count(session, player.id)
+    # Если бесплатное уже использовано и нейронов не хватает — не даём ношение.
+    # Списание, награда и все остальные поля игрока (гарант, счётчики,
+    # опыт) — один условный UPDATE: параллельные ношения не уведут баланс
+    # в минус, а строка игрока пишется один раз.
+    total_neurons = None
+    if use_free or player.neurons >= NOSHENIE_COST_NEURONS:
+        with session.no_autoflush:
+            rarity = _roll_rarity_with_pity(player)
+            bet_name = roll_bet_name_for_rarity(rarity)
+
+            existing_bet = await session.scalar(
+                select(Bet).where(
+                    Bet.owner_id == player.id,
+                    Bet.name == bet_name,
+                    Bet.is_active == True,  # используем только активных Бетов
+                )
+            )
+
+            player.count_bets += 1
+            player.last_noshenie_at = now
+            if use_free:
+                player.last_free_noshenie_at = now
+
+            # Опыт за ношение
+            xp_gained = NOSHENIE_XP_REWARD
+            rank_before = player.rank
+            rank_ups = add_xp(player, xp_gained)
+
+            total_neurons = await change_balance(
+                session,
+                player.id,
+                neurons_reward - neurons_spent,
+                require_at_least=neurons_spent or None,
+                reason="noshenie",
+                values={
+                    **pending_player_values(player),
+                    **inventory_values(active=1 if existing_bet is None else 0),
+                },
+            )
+        if total_neurons is None:
+            # Баланс успели потратить параллельно — отменяем изменения в памяти.
+            await session.refresh(player)
+    if total_neurons is None:
+        bets_count = player.active_bets_count
         return {
             "ok": False,
             "reason": "not_enough_neurons",
@@ -149,26 +190,6 @@ async def do_noshenie(session: AsyncSession, tg_id: int) -> Dict[str, Any]:
             "rank": player.rank,
         }
 
-    if player.noshenie_count >= LEGENDARY_PITY_THRESHOLD - 1:
-        rarity = RarityEnum.LEGENDARY
-    else:
-        rarity = roll_rarity()
-
-    if rarity == RarityEnum.LEGENDARY:
-        player.noshenie_count = 0
-    else:
-        player.noshenie_count += 1
-
-    bet_name = roll_bet_name_for_rarity(rarity)
-
-    existing_bet = await session.scalar(
-        select(Bet).where(
-            Bet.owner_id == player.id,
-            Bet.name == bet_name,
-            Bet.is_active == True,  # используем только активных Бетов
-        )
-    )
-
     if existing_bet is None:
         bet_level = BET_LEVEL_STEP
         bet = Bet(owner_id=player.id, rarity=rarity, name=bet_name, level=bet_level)
@@ -182,26 +203,10 @@ async def do_noshenie(session: AsyncSession, tg_id: int) -> Dict[str, Any]:
         bet_level = new_level
         is_new_bet = False
 
-    neurons_reward = roll_neuron_reward()
-    neurons_spent = 0 if use_free else NOSHENIE_COST_NEURONS
-
-    player.neurons = player.neurons - neurons_spent + neurons_reward
-    player.count_bets += 1
-    player.last_noshenie_at = now
-
-    if use_free:
-        player.last_free_noshenie_at = now
-
-    # Опыт за ношение
-    xp_gained = NOSHENIE_XP_REWARD
-    rank_before = player.rank
-    rank_ups = add_xp(player, xp_gained)
+    # Коммит делает DbSessionMiddleware один раз в конце апдейта.
+    await session.flush()
 
-    await session.commit()
-    await session.refresh(player)
-    await session.refresh(bet)
-
-    bets_count = await _get_active_bets_count(session, player.id)
+    bets_count = player.active_bets_count
 
     return {
         "ok": True,
@@ -223,3 +228,152 @@ async def do_noshenie(session: AsyncSession, tg_id: int) -> Dict[str, Any]:
         "rank_before": rank_before,
         "rank_ups": rank_ups,
     }
+
+
+@count_outcomes("noshenie_multi")
+@track_sql()
+async def do_noshenie_multi(
+    session: AsyncSession,
+    tg_id: int,
+    pulls: int = NOSHENIE_MULTI_PULLS,
+) -> Dict[str, Any]:
+    """
+    Несколько ношений за одно нажатие.
+
+    Все активные Беты игрока загружаются одним запросом, дубликаты
+    разрешаются по этой карте, а повышения уровней и новые Беты уходят
+    в БД одним flush. Гарант и бесплатное ношение работают так же,
+    как при одиночных ношениях подряд: бесплатным может быть только первое.
+    """
+    player = await get_or_create_player(session, tg_id)
+    now = datetime.now(timezone.utc)
+
+    if player.last_noshenie_at is not None:
+        delta = now - player.last_noshenie_at
+        if delta < NOSHENIE_COOLDOWN:
+            remaining = NOSHENIE_COOLDOWN - delta
+            return {
+                "ok": False,
+                "reason": "cooldown",
+                "remaining_minutes": int(remaining.total_seconds() // 60) + 1,
+                "required_neurons": None,
+                "current_neurons": player.neurons,
+                "pulls": [],
+            }
+
+    is_free_available = (
+        player.last_free_noshenie_at is None
+        or player.last_free_noshenie_at.date() < now.date()
+    )
+    paid_pulls = pulls - 1 if is_free_available else pulls
+    # Как при одиночных ношениях подряд: каждое ношение, кроме последнего,
+    # приносит минимум NEURON_REWARD_MIN, которые идут в оплату следующих.
+    required_neurons = paid_pulls * NOSHENIE_COST_NEURONS - (pulls - 1) * NEURON_REWARD_MIN
+
+    if player.neurons < required_neurons:
+        return {
+            "ok": False,
+            "reason": "not_enough_neurons",
+            "remaining_minutes": None,
+            "required_neurons": required_neurons,
+            "current_neurons": player.neurons,
+            "pulls": [],
+        }
+
+    active_bets = await session.scalars(
+        select(Bet).where(Bet.owner_id == player.id, Bet.is_active == True)
+    )
+    bets_by_name: Dict[str, Bet] = {}
+    for bet in active_bets:
+        bets_by_name.setdefault(bet.name, bet)
+
+    # Сначала разыгрываем всю пачку в памяти: уровни Бетов и новые Беты
+    # применяются только после успешного списания.
+    levels = {name: bet.level or 0 for name, bet in bets_by_name.items()}
+    new_bets: Dict[str, RarityEnum] = {}
+    results: List[Dict[str, Any]] = []
+    with session.no_autoflush:
+        for _ in range(pulls):
+            rarity = _roll_rarity_with_pity(player)
+            bet_name = roll_bet_name_for_rarity(rarity)
+
+            if bet_name in levels:
+                levels[bet_name] = min(levels[bet_name] + BET_LEVEL_STEP, MAX_BET_LEVEL)
+                is_new_bet = False
+            else:
+                levels[bet_name] = BET_LEVEL_STEP
+                new_bets[bet_name] = rarity
+                is_new_bet = True
+
+            results.append(
+                {
+                    "rarity": rarity,
+                    "bet_name": bet_name,
+                    "bet_level": levels[bet_name],
+                    "is_new_bet": is_new_bet,
+                }
+            )
+
+        player.count_bets += pulls
+        player.last_noshenie_at = now
+        if is_free_available:
+            player.last_free_noshenie_at = now
+
+        xp_gained = NOSHENIE_XP_REWARD * pulls
+        rank_before = player.rank
+        rank_ups = add_xp(player, xp_gained)
+
+        # Списание за все ношения, суммарная награда, счётчик новых Бетов
+        # и остальные поля игрока — одним условным UPDATE.
+        neurons_reward = sum(roll_neuron_reward() for _ in range(pulls))
+        neurons_spent = paid_pulls * NOSHENIE_COST_NEURONS
+        total_neurons = await change_balance(
+            session,
+            player.id,
+            neurons_reward - neurons_spent,
+            require_at_least=required_neurons,
+            reason="noshenie_multi",
+            values={
+                **pending_player_values(player),
+                **inventory_values(active=len(new_bets)),
+            },
+        )
+    if total_neurons is None:
+        # Баланс успели потратить параллельно — отменяем изменения в памяти.
+        await session.refresh(player)
+        return {
+            "ok": False,
+            "reason": "not_enough_neurons",
+            "remaining_minutes": None,
+            "required_neurons": required_neurons,
+            "current_neurons": player.neurons,
+            "pulls": [],
+        }
+
+    for bet_name, level in levels.items():
+        bet = bets_by_name.get(bet_name)
+        if bet is None:
+            session.add(Bet(owner_id=player.id, rarity=new_bets[bet_name], name=bet_name, level=level))
+        elif level != (bet.level or 0):
+            bet.level = level
+
+    # Коммит делает DbSessionMiddleware один раз в конце апдейта.
+    await session.flush()
+
+    return {
+        "ok": True,
+        "reason": None,
+        "remaining_minutes": None,
+        "required_neurons": None,
+        "current_neurons": player.neurons,
+        "pulls": results,
+        "free_pulls": 1 if is_free_available else 0,
+        "neurons_spent": neurons_spent,
+        "neurons_reward": neurons_reward,
+        "total_neurons": player.neurons,
+        "bets_count": player.active_bets_count,
+        "xp_gained": xp_gained,
+        "rank": player.rank,
+        "rank_before": rank_before,
+        "rank_ups": rank_ups,
+    }
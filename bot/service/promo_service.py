@@ -5,9 +5,14 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.database.models.promo import PromoCode, PromoRedemption
+from bot.database.request.wallet import credit
 from bot.service.noshenie_service import get_or_create_player
+from bot.core.metrics import count_outcomes
+from bot.database.sql_stats import track_sql
 
 
+@count_outcomes("promo")
+@track_sql()
 async def redeem_promo(
     session: AsyncSession,
     tg_id: int,
@@ -66,7 +71,7 @@ async def redeem_promo(
             "message": "Ты уже использовал этот промокод.",
         }
 
-    player.neurons += promo.reward_neurons
+    total_neurons = await credit(session, player.id, promo.reward_neurons, reason="promo")
     promo.used_count += 1
 
     redemption = PromoRedemption(
@@ -75,15 +80,13 @@ async def redeem_promo(
     )
     session.add(redemption)
 
-    await session.commit()
-    await session.refresh(player)
-    await session.refresh(promo)
+    await session.flush()
 
     return {
         "ok": True,
         "reason": None,
         "code": promo.code,
         "reward": promo.reward_neurons,
-        "total_neurons": player.neurons,
+        "total_neurons": total_neurons,
     }
 
@@ -1,8 +1,25 @@
+import asyncio
 import random
+import time
+from collections import deque
+from pathlib import Path
+from typing import List
 
 import aiohttp
 
-QUOTE_API_URL = "https://api.quotable.io/random"
+from bot.core.config import QUOTE_API_URL, QUOTES_FILE, QUOTES_OFFLINE
+
+# Сколько цитат держим наготове и с какого остатка начинаем докачивать.
+QUOTE_BUFFER_SIZE = 32
+QUOTE_REFILL_THRESHOLD = 8
+# Сколько цитат просить у API за один запрос.
+QUOTE_FETCH_BATCH = 10
+# Жёсткий дедлайн на один запрос к API (секунды).
+QUOTE_FETCH_DEADLINE = 2.0
+# После неудачи не ходим в сеть столько секунд.
+QUOTE_RETRY_BACKOFF_SECONDS = 300
+
+DEFAULT_QUOTES_FILE = Path(__file__).resolve().parent.parent / "data" / "quotes.txt"
 
 FALLBACK_QUOTES = [
     "Даже самый маленький Бет оставляет след в большом мире.",
@@ -11,23 +28,118 @@ FALLBACK_QUOTES = [
     "Проигрыш — всего лишь подготовка к легендарной победе.",
 ]
 
+_buffer: "deque[str]" = deque(maxlen=QUOTE_BUFFER_SIZE)
+_corpus: List[str] | None = None
+_http_session: aiohttp.ClientSession | None = None
+_refill_task: asyncio.Task | None = None
+_retry_after = 0.0
+
+
+def _load_corpus() -> List[str]:
+    """Цитаты из локального файла (QUOTES_FILE или bot/data/quotes.txt)."""
+    global _corpus
+
+    if _corpus is not None:
+        return _corpus
+
+    path = Path(QUOTES_FILE) if QUOTES_FILE else DEFAULT_QUOTES_FILE
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+        quotes = [line.strip() for line in lines if line.strip() and not line.startswith("#")]
+    except OSError as e:
+        print(f"> !Не удалось прочитать файл цитат {path}: {e!r}")
+        quotes = []
+
+    _corpus = quotes or list(FALLBACK_QUOTES)
+    return _corpus
+
+
+def get_quote() -> str:
+    """
+    Случайная цитата без ожидания сети.
+
+    Берём из буфера цитат, заранее скачанных с API, а если он пуст —
+    из локального корпуса. Докачка идёт в фоне.
+    """
+    _schedule_refill()
+    if _buffer:
+        return _buffer.popleft()
+    return random.choice(_load_corpus())
+
+
+def _network_enabled() -> bool:
+    return bool(QUOTE_API_URL) and not QUOTES_OFFLINE
+
+
+def _schedule_refill() -> None:
+    global _refill_task
+
+    if not _network_enabled() or len(_buffer) >= QUOTE_REFILL_THRESHOLD:
+        return
+    if _refill_task is not None and not _refill_task.done():
+        return
+    if time.monotonic() < _retry_after:
+        return
 
-async def fetch_random_quote() -> str:
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(QUOTE_API_URL, timeout=5) as resp:
-                if resp.status != 200:
-                    raise RuntimeError(f"Bad status: {resp.status}")
-
-                data = await resp.json()
-                text = data.get("content")
-                author = data.get("author")
-
-                if not text:
-                    raise RuntimeError("Empty quote")
-
-                if author:
-                    return f"{text} — {author}"
-                return text
-    except Exception:
-        return random.choice(FALLBACK_QUOTES)
+        _refill_task = asyncio.get_running_loop().create_task(_refill())
+    except RuntimeError:
+        # Нет запущенного event loop — докачаем при следующем вызове.
+        _refill_task = None
+
+
+def _get_http_session() -> aiohttp.ClientSession:
+    """Одна сессия с общим коннектором на весь процесс."""
+    global _http_session
+
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=2, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=QUOTE_FETCH_DEADLINE),
+        )
+    return _http_session
+
+
+def _format_quote(item: dict) -> str | None:
+    text = item.get("content")
+    author = item.get("author")
+    if not text:
+        return None
+    if author:
+        return f"{text} — {author}"
+    return text
+
+
+async def _refill() -> None:
+    global _retry_after
+
+    try:
+        async with _get_http_session().get(
+            QUOTE_API_URL,
+            params={"limit": QUOTE_FETCH_BATCH},
+        ) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"Bad status: {resp.status}")
+            data = await resp.json(content_type=None)
+    except Exception as e:
+        _retry_after = time.monotonic() + QUOTE_RETRY_BACKOFF_SECONDS
+        print(f"> Цитаты из API недоступны ({e!r}), используем локальный корпус")
+        return
+
+    items = data if isinstance(data, list) else [data]
+    for item in items:
+        quote = _format_quote(item) if isinstance(item, dict) else None
+        if quote:
+            _buffer.append(quote)
+
+
+async def close_quote_session() -> None:
+    global _http_session, _refill_task
+
+    if _refill_task is not None and not _refill_task.done():
+        _refill_task.cancel()
+    _refill_task = None
+
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
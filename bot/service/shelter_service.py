@@ -1,6 +1,6 @@
 from typing import Dict, Any, List
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.database.models.bets.bet import Bet
@@ -8,7 +8,11 @@ from bot.database.models.bets.enums import RarityEnum
 from bot.database.models.players.player import Player
 from bot.database.models.shelter import ShelterListing, ShelterSellRequest
 from bot.database.models.user import User
+from bot.database.request.wallet import transfer
+from bot.service.inventory_service import adjust_inventory, remove_bet_from_inventory
 from bot.service.noshenie_service import get_or_create_player
+from bot.core.metrics import count_outcomes
+from bot.database.sql_stats import track_sql
 
 
 RARITY_PRICE_LIMITS: Dict[str, tuple[int, int]] = {
@@ -33,6 +37,7 @@ def format_bet_short(bet: Bet) -> str:
     return f"{emoji}{bet.name} ур.{bet.level}"
 
 
+@track_sql()
 async def get_market_listings(session: AsyncSession) -> List[Dict[str, Any]]:
     """
     Получить список активных лотов приюта в виде простых словарей,
@@ -74,6 +79,8 @@ async def get_market_listings(session: AsyncSession) -> List[Dict[str, Any]]:
     return listings
 
 
+@count_outcomes("shelter_sell_start")
+@track_sql()
 async def start_sell_request(session: AsyncSession, tg_id: int, bet_id: int) -> Dict[str, Any]:
     player = await get_or_create_player(session, tg_id)
 
@@ -111,7 +118,7 @@ async def start_sell_request(session: AsyncSession, tg_id: int, bet_id: int) ->
 
     request = ShelterSellRequest(player_id=player.id, bet_id=bet.id)
     session.add(request)
-    await session.commit()
+    await session.flush()
 
     return {
         "ok": True,
@@ -122,6 +129,8 @@ async def start_sell_request(session: AsyncSession, tg_id: int, bet_id: int) ->
     }
 
 
+@count_outcomes("shelter_sell_finish")
+@track_sql()
 async def finish_sell_request(session: AsyncSession, tg_id: int, price: int) -> Dict[str, Any]:
     player = await get_or_create_player(session, tg_id)
 
@@ -146,7 +155,7 @@ async def finish_sell_request(session: AsyncSession, tg_id: int, price: int) ->
     )
     if not bet:
         await session.delete(request)
-        await session.commit()
+        await session.flush()
         return {
             "ok": False,
             "reason": "bet_not_available",
@@ -156,7 +165,7 @@ async def finish_sell_request(session: AsyncSession, tg_id: int, price: int) ->
     limits = RARITY_PRICE_LIMITS.get(bet.rarity)
     if not limits:
         await session.delete(request)
-        await session.commit()
+        await session.flush()
         return {
             "ok": False,
             "reason": "no_limits",
@@ -194,10 +203,9 @@ async def finish_sell_request(session: AsyncSession, tg_id: int, price: int) ->
         session.add(listing)
 
     bet.in_shelter = True
+    await adjust_inventory(session, player, shelter=1)
     await session.delete(request)
-    await session.commit()
-    await session.refresh(bet)
-    await session.refresh(listing)
+    await session.flush()
 
     return {
         "ok": True,
@@ -207,6 +215,19 @@ async def finish_sell_request(session: AsyncSession, tg_id: int, price: int) ->
     }
 
 
+async def _set_listing_active(session: AsyncSession, listing_id: int, active: bool) -> bool:
+    """Переключить is_active объявления, только если оно ещё в обратном состоянии."""
+    result = await session.execute(
+        update(ShelterListing)
+        .where(ShelterListing.id == listing_id, ShelterListing.is_active == (not active))
+        .values(is_active=active)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+@count_outcomes("shelter_buy")
+@track_sql()
 async def buy_listing(
     session: AsyncSession,
     buyer_tg_id: int,
@@ -233,7 +254,7 @@ async def buy_listing(
     )
     if not bet:
         listing.is_active = False
-        await session.commit()
+        await session.flush()
         return {
             "ok": False,
             "reason": "bet_missing",
@@ -245,7 +266,7 @@ async def buy_listing(
     )
     if not seller:
         listing.is_active = False
-        await session.commit()
+        await session.flush()
         return {
             "ok": False,
             "reason": "seller_missing",
@@ -259,8 +280,23 @@ async def buy_listing(
             "message": "Нельзя покупать собственного Бета.",
         }
 
+    # Снимаем объявление условным UPDATE: из параллельных покупок одного
+    # Бета проходит только одна, остальные видят «уже не продаётся».
+    if not await _set_listing_active(session, listing.id, False):
+        return {
+            "ok": False,
+            "reason": "not_found",
+            "message": "Этот Бет больше не продаётся.",
+        }
+
     price = listing.price
-    if buyer.neurons < price:
+    # Условное списание у покупателя и зачисление продавцу — без гонок
+    # с параллельными покупками того же игрока.
+    balances = None
+    if buyer.neurons >= price:
+        balances = await transfer(session, buyer.id, seller.id, price, reason="shelter_sale")
+    if balances is None:
+        await _set_listing_active(session, listing.id, True)
         return {
             "ok": False,
             "reason": "not_enough_neurons",
@@ -270,17 +306,13 @@ async def buy_listing(
             ),
         }
 
-    buyer.neurons -= price
-    seller.neurons += price
-
+    await remove_bet_from_inventory(session, seller, bet)
+    await adjust_inventory(session, buyer, active=1)
     bet.owner_id = buyer.id
     bet.in_shelter = False
     listing.is_active = False
 
-    await session.commit()
-    await session.refresh(buyer)
-    await session.refresh(seller)
-    await session.refresh(bet)
+    await session.flush()
 
     seller_user = await session.scalar(
         select(User).where(User.id == seller.user_id)
@@ -0,0 +1,376 @@
+"""
+Монте‑Карло симулятор экономики BETH.
+
+Прогоняет сотни тысяч синтетических игроков по дням: ношения с гарантом
+и бесплатным ношением, лаборатория, слияния и продажи в приюте.
+Все константы баланса импортируются из сервисов, поэтому симулятор
+не может разойтись с игрой; формулы наград перед запуском сверяются
+с функциями сервисов на случайных примерах.
+
+Запуск: `python -m bot.simulation.economy --players 100000 --days 30`.
+Нужен numpy (`pip install numpy`), в зависимости бота он не входит.
+Сервисы импортируют модели БД, поэтому TOKEN и DATABASE_URL должны быть
+в окружении или .env — к самой БД симулятор не подключается.
+"""
+import argparse
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+import numpy as np
+
+from bot.database.models.bets.enums import RarityEnum
+from bot.service.lab_service import (
+    BASE_REWARD_PER_MINUTE,
+    LAB_DURATION_MINUTES,
+    LEVEL_FACTOR,
+    RANK_FACTOR,
+    RARITY_MULTIPLIER,
+    _calc_lab_reward,
+)
+from bot.service.merge_service import (
+    MERGE_COST_NEURONS,
+    MERGE_REWARD_MAX,
+    MERGE_REWARD_MIN,
+    RARITY_LEVEL_FACTOR,
+    UNDERDOG_MULTIPLIER_VS_LEGENDARY,
+    compute_weight,
+)
+from bot.service.noshenie_service import (
+    BET_LEVEL_STEP,
+    BET_NAMES_BY_RARITY,
+    LEGENDARY_PITY_THRESHOLD,
+    MAX_BET_LEVEL,
+    NEURON_REWARD_MAX,
+    NEURON_REWARD_MIN,
+    NOSHENIE_COST_NEURONS,
+    RARITY_CUMULATIVE_CHANCES,
+    STARTING_NEURONS,
+)
+from bot.service.shelter_service import RARITY_PRICE_LIMITS
+from bot.service.xp_service import (
+    LAB_XP_REWARD,
+    MAX_RANK,
+    MERGE_XP_REWARD,
+    NOSHENIE_XP_REWARD,
+    XP_NEXT_PER_RANK,
+    add_xp,
+)
+
+# Редкости в порядке RARITY_CUMULATIVE_CHANCES, дальше везде — их индексы.
+RARITIES = [rarity for rarity, _ in RARITY_CUMULATIVE_CHANCES]
+RARITY_BOUNDS = np.array([bound for _, bound in RARITY_CUMULATIVE_CHANCES])
+LEGENDARY = RARITIES.index(RarityEnum.LEGENDARY)
+
+# Все имена Бетов подряд; у игрока не больше одного активного Бета на имя.
+NAME_COUNT = np.array([len(BET_NAMES_BY_RARITY[rarity]) for rarity in RARITIES])
+NAME_OFFSET = np.concatenate(([0], np.cumsum(NAME_COUNT)[:-1]))
+NAME_RARITY = np.repeat(np.arange(len(RARITIES)), NAME_COUNT)
+
+# Опыт до следующего ранга; на MAX_RANK повышать некуда.
+XP_TABLE = np.array(
+    [XP_NEXT_PER_RANK.get(rank) or np.iinfo(np.int64).max for rank in range(MAX_RANK + 1)],
+    dtype=np.int64,
+)
+
+LAB_DURATIONS = np.array(sorted(LAB_DURATION_MINUTES))
+LAB_RARITY_MULT = np.array([RARITY_MULTIPLIER[rarity.value] for rarity in RARITIES])
+MERGE_LEVEL_FACTOR = np.array([RARITY_LEVEL_FACTOR[rarity] for rarity in RARITIES])
+MERGE_UNDERDOG = np.array([UNDERDOG_MULTIPLIER_VS_LEGENDARY[rarity] for rarity in RARITIES])
+PRICE_MIN = np.array([RARITY_PRICE_LIMITS[rarity.value][0] for rarity in RARITIES])
+PRICE_MAX = np.array([RARITY_PRICE_LIMITS[rarity.value][1] for rarity in RARITIES])
+
+
+@dataclass
+class SimParams:
+    players: int = 100_000
+    days: int = 30
+    # Среднее число ношений в день (распределение Пуассона).
+    pulls_per_day: float = 4.0
+    # Вероятности за день: сессия лаборатории, слияние, продажа в приюте.
+    lab_prob: float = 0.6
+    merge_prob: float = 0.2
+    sell_prob: float = 0.05
+    report_every: int = 5
+    seed: int | None = None
+
+
+class SimState:
+    def __init__(self, players: int) -> None:
+        self.neurons = np.full(players, STARTING_NEURONS, dtype=np.int64)
+        self.rank = np.zeros(players, dtype=np.int64)
+        self.xp = np.zeros(players, dtype=np.int64)
+        self.pity = np.zeros(players, dtype=np.int64)
+        # Уровень Бета каждого имени у игрока, 0 — Бета нет.
+        self.level = np.zeros((players, NAME_RARITY.size), dtype=np.int64)
+
+        self.pulls = 0
+        self.legendaries = 0
+        self.pity_legendaries = 0
+        self.faucet = 0
+        self.sink = 0
+        self.merges = 0
+        self.sales = 0
+        self.sales_volume = 0
+
+
+def _grant_xp(state: SimState, idx: np.ndarray, amount: int) -> None:
+    """Векторный аналог xp_service.add_xp."""
+    idx = idx[state.rank[idx] < MAX_RANK]
+    state.xp[idx] += amount
+    while idx.size:
+        needed = XP_TABLE[state.rank[idx]]
+        up = state.xp[idx] >= needed
+        idx, needed = idx[up], needed[up]
+        state.xp[idx] -= needed
+        state.rank[idx] += 1
+
+
+def _lab_reward(rank: np.ndarray, rarity: np.ndarray, level: np.ndarray, minutes: np.ndarray) -> np.ndarray:
+    """Векторный аналог lab_service._calc_lab_reward."""
+    base = BASE_REWARD_PER_MINUTE * minutes
+    value = np.floor(
+        base * LAB_RARITY_MULT[rarity] * (1.0 + rank * RANK_FACTOR) * (1.0 + level * LEVEL_FACTOR)
+    ).astype(np.int64)
+    value = np.maximum(value, np.floor(base).astype(np.int64))
+    return np.maximum(value, 1)
+
+
+def _random_owned_bet(rng: np.random.Generator, level: np.ndarray) -> np.ndarray:
+    """Случайный активный Бет для каждой строки (строки должны быть непустыми)."""
+    scores = rng.random(level.shape)
+    scores[level == 0] = -1.0
+    return scores.argmax(axis=1)
+
+
+def _pull_day(rng: np.random.Generator, params: SimParams, state: SimState) -> None:
+    pulls = rng.poisson(params.pulls_per_day, params.players)
+
+    for k in range(int(pulls.max(initial=0))):
+        # Первое ношение дня — бесплатное, остальные за нейроны.
+        free = k == 0
+        active = pulls > k
+        if not free:
+            active &= state.neurons >= NOSHENIE_COST_NEURONS
+        idx = np.flatnonzero(active)
+        if not idx.size:
+            break
+
+        rarity = np.searchsorted(RARITY_BOUNDS, rng.random(idx.size), side="right")
+        rarity = np.minimum(rarity, LEGENDARY)
+        forced = state.pity[idx] >= LEGENDARY_PITY_THRESHOLD - 1
+        rarity[forced] = LEGENDARY
+        is_legendary = rarity == LEGENDARY
+        state.pity[idx] = np.where(is_legendary, 0, state.pity[idx] + 1)
+
+        name = NAME_OFFSET[rarity] + (rng.random(idx.size) * NAME_COUNT[rarity]).astype(np.int64)
+        current = state.level[idx, name]
+        state.level[idx, name] = np.where(
+            current == 0, BET_LEVEL_STEP, np.minimum(current + BET_LEVEL_STEP, MAX_BET_LEVEL)
+        )
+
+        reward = rng.integers(NEURON_REWARD_MIN, NEURON_REWARD_MAX + 1, idx.size)
+        cost = 0 if free else NOSHENIE_COST_NEURONS
+        state.neurons[idx] += reward - cost
+        _grant_xp(state, idx, NOSHENIE_XP_REWARD)
+
+        state.pulls += idx.size
+        state.legendaries += int(is_legendary.sum())
+        state.pity_legendaries += int(forced.sum())
+        state.faucet += int(reward.sum())
+        state.sink += cost * idx.size
+
+
+def _lab_day(rng: np.random.Generator, params: SimParams, state: SimState) -> None:
+    has_bet = state.level.any(axis=1)
+    idx = np.flatnonzero(has_bet & (rng.random(params.players) < params.lab_prob))
+    if not idx.size:
+        return
+
+    # В лабораторию отправляют самого доходного Бета.
+    level = state.level[idx]
+    score = np.where(level > 0, LAB_RARITY_MULT[NAME_RARITY] * (1.0 + level * LEVEL_FACTOR), -1.0)
+    name = score.argmax(axis=1)
+    minutes = rng.choice(LAB_DURATIONS, idx.size)
+
+    reward = _lab_reward(state.rank[idx], NAME_RARITY[name], level[np.arange(idx.size), name], minutes)
+    state.neurons[idx] += reward
+    state.faucet += int(reward.sum())
+    _grant_xp(state, idx, LAB_XP_REWARD)
+
+
+def _pairs(rng: np.random.Generator, players: int) -> tuple[np.ndarray, np.ndarray]:
+    order = rng.permutation(players)
+    half = players // 2
+    return order[:half], order[half : 2 * half]
+
+
+def _merge_day(rng: np.random.Generator, params: SimParams, state: SimState) -> None:
+    a, b = _pairs(rng, params.players)
+    ok = (
+        (rng.random(a.size) < params.merge_prob)
+        & (state.neurons[a] >= MERGE_COST_NEURONS)
+        & (state.neurons[b] >= MERGE_COST_NEURONS)
+        & state.level[a].any(axis=1)
+        & state.level[b].any(axis=1)
+    )
+    a, b = a[ok], b[ok]
+    if not a.size:
+        return
+
+    name_a = _random_owned_bet(rng, state.level[a])
+    name_b = _random_owned_bet(rng, state.level[b])
+    level_a = state.level[a, name_a]
+    level_b = state.level[b, name_b]
+
+    weight_a = compute_weight(state.rank[a], level_a)
+    weight_b = compute_weight(state.rank[b], level_b)
+    a_wins = rng.random(a.size) < weight_a / (weight_a + weight_b)
+
+    winner = np.where(a_wins, a, b)
+    loser = np.where(a_wins, b, a)
+    winner_name = np.where(a_wins, name_a, name_b)
+    loser_name = np.where(a_wins, name_b, name_a)
+    winner_rarity = NAME_RARITY[winner_name]
+    loser_rarity = NAME_RARITY[loser_name]
+    loser_level = state.level[loser, loser_name]
+
+    base_gain = np.maximum(1, np.round(loser_level * MERGE_LEVEL_FACTOR[loser_rarity]))
+    multiplier = np.where(loser_rarity == LEGENDARY, MERGE_UNDERDOG[winner_rarity], 1.0)
+    gain = np.maximum(1, np.round(base_gain * multiplier)).astype(np.int64)
+    state.level[winner, winner_name] = np.minimum(state.level[winner, winner_name] + gain, MAX_BET_LEVEL)
+    state.level[loser, loser_name] = 0
+
+    reward = rng.integers(MERGE_REWARD_MIN, MERGE_REWARD_MAX + 1, a.size)
+    state.neurons[winner] += reward - MERGE_COST_NEURONS
+    state.neurons[loser] += reward * 2 - MERGE_COST_NEURONS
+    _grant_xp(state, winner, MERGE_XP_REWARD)
+    _grant_xp(state, loser, MERGE_XP_REWARD)
+
+    state.merges += a.size
+    state.faucet += int(reward.sum()) * 3
+    state.sink += MERGE_COST_NEURONS * 2 * a.size
+
+
+def _shelter_day(rng: np.random.Generator, params: SimParams, state: SimState) -> None:
+    seller, buyer = _pairs(rng, params.players)
+    ok = (rng.random(seller.size) < params.sell_prob) & state.level[seller].any(axis=1)
+    seller, buyer = seller[ok], buyer[ok]
+    if not seller.size:
+        return
+
+    name = _random_owned_bet(rng, state.level[seller])
+    rarity = NAME_RARITY[name]
+    price = rng.integers(PRICE_MIN[rarity], PRICE_MAX[rarity] + 1)
+
+    # Покупатель берёт Бета, если хватает нейронов и такого имени у него ещё нет.
+    ok = (state.neurons[buyer] >= price) & (state.level[buyer, name] == 0)
+    seller, buyer, name, price = seller[ok], buyer[ok], name[ok], price[ok]
+
+    state.neurons[buyer] -= price
+    state.neurons[seller] += price
+    state.level[buyer, name] = state.level[seller, name]
+    state.level[seller, name] = 0
+
+    state.sales += seller.size
+    state.sales_volume += int(price.sum())
+
+
+def check_against_services(rng: np.random.Generator, samples: int = 500) -> None:
+    """Сверить векторные формулы с функциями сервисов на случайных примерах."""
+    rank = rng.integers(0, MAX_RANK + 1, samples)
+    rarity = rng.integers(0, len(RARITIES), samples)
+    level = rng.integers(0, MAX_BET_LEVEL + 1, samples)
+    minutes = rng.choice(LAB_DURATIONS, samples)
+
+    vectorized = _lab_reward(rank, rarity, level, minutes)
+    for i in range(samples):
+        player = SimpleNamespace(rank=int(rank[i]))
+        bet = SimpleNamespace(rarity=RARITIES[rarity[i]].value, level=int(level[i]))
+        expected = _calc_lab_reward(player, bet, int(minutes[i]))
+        if expected != vectorized[i]:
+            raise RuntimeError(f"Награда лаборатории разошлась с lab_service: {expected} != {vectorized[i]}")
+
+    state = SimState(samples)
+    state.rank[:] = rng.integers(0, MAX_RANK + 1, samples)
+    amount = int(rng.integers(1, 5_000))
+    players = [SimpleNamespace(rank=int(r), xp=0) for r in state.rank]
+    _grant_xp(state, np.arange(samples), amount)
+    for i, player in enumerate(players):
+        add_xp(player, amount)
+        if (player.rank, player.xp) != (state.rank[i], state.xp[i]):
+            raise RuntimeError("Начисление опыта разошлось с xp_service.add_xp")
+
+
+def _report_line(day: int, state: SimState) -> str:
+    p50, p90, p99 = np.percentile(state.neurons, [50, 90, 99])
+    rank_p50, rank_p90 = np.percentile(state.rank, [50, 90])
+    return (
+        f"день {day:>4} | нейроны: ср {state.neurons.mean():>9.1f}  p50 {p50:>8.0f}  "
+        f"p90 {p90:>8.0f}  p99 {p99:>8.0f} | ранг: ср {state.rank.mean():>5.2f}  "
+        f"p50 {rank_p50:>3.0f}  p90 {rank_p90:>3.0f}"
+    )
+
+
+def simulate(params: SimParams) -> SimState:
+    rng = np.random.default_rng(params.seed)
+    check_against_services(rng)
+
+    state = SimState(params.players)
+    start_supply = int(state.neurons.sum())
+    started = time.perf_counter()
+
+    for day in range(1, params.days + 1):
+        _pull_day(rng, params, state)
+        _lab_day(rng, params, state)
+        _merge_day(rng, params, state)
+        _shelter_day(rng, params, state)
+
+        if day % params.report_every == 0 or day == params.days:
+            print(_report_line(day, state))
+
+    elapsed = time.perf_counter() - started
+    player_days = params.players * params.days
+    supply = int(state.neurons.sum())
+    daily_inflation = (supply / start_supply) ** (1 / params.days) - 1 if start_supply else 0.0
+
+    print()
+    print(f"Игроко‑дней: {player_days:,} за {elapsed:.1f} с")
+    print(
+        f"Ношений: {state.pulls:,} | легендарных: {state.legendaries / max(state.pulls, 1):.4%} "
+        f"(из них по гаранту {state.pity_legendaries / max(state.legendaries, 1):.1%})"
+    )
+    print(
+        f"Эмиссия: {state.faucet / player_days:.1f} нейронов/игроко‑день, "
+        f"сжигание: {state.sink / player_days:.1f}, "
+        f"рост денежной массы: {daily_inflation:.2%} в день"
+    )
+    print(f"Слияний: {state.merges:,} | продаж в приюте: {state.sales:,} на {state.sales_volume:,} нейронов")
+    print(
+        "Беты на игрока: "
+        + ", ".join(
+            f"{rarity.value} {(state.level[:, NAME_RARITY == i] > 0).sum(axis=1).mean():.2f}"
+            for i, rarity in enumerate(RARITIES)
+        )
+    )
+    return state
+
+
+def main() -> None:
+    defaults = SimParams()
+    parser = argparse.ArgumentParser(description="Монте‑Карло симулятор экономики BETH")
+    parser.add_argument("--players", type=int, default=defaults.players)
+    parser.add_argument("--days", type=int, default=defaults.days)
+    parser.add_argument("--pulls-per-day", type=float, default=defaults.pulls_per_day)
+    parser.add_argument("--lab-prob", type=float, default=defaults.lab_prob)
+    parser.add_argument("--merge-prob", type=float, default=defaults.merge_prob)
+    parser.add_argument("--sell-prob", type=float, default=defaults.sell_prob)
+    parser.add_argument("--report-every", type=int, default=defaults.report_every)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args()
+
+    simulate(SimParams(**{key.replace("-", "_"): value for key, value in vars(args).items()}))
+
+
+if __name__ == "__main__":
+    main()
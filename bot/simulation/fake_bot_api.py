@@ -0,0 +1,164 @@
+"""
+Локальный фейковый Bot API для бенчмарков и нагрузочных прогонов.
+
+aiohttp‑сервер в том же процессе: принимает запросы `/bot<token>/<method>`
+так же, как api.telegram.org, записывает каждый вызов и отвечает
+правдоподобным результатом (Message для send*/edit*, True для остальных).
+Последние текст и inline‑клавиатура каждого чата сохраняются — по ним
+виртуальные игроки «нажимают кнопки» (см. replay.py).
+"""
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from aiohttp import web
+
+
+@dataclass
+class ApiCall:
+    method: str
+    params: Dict[str, Any]
+    at: float
+
+
+@dataclass
+class ChatView:
+    """Что игрок видит в чате: последнее сообщение и последняя клавиатура."""
+
+    last_text: str = ""
+    # Последнее сообщение с inline‑клавиатурой и callback_data её кнопок.
+    keyboard_message_id: int | None = None
+    buttons: List[str] = field(default_factory=list)
+    messages: int = 0
+
+
+def _decode(value: str) -> Any:
+    if value[:1] in ("{", "["):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+
+class FakeBotApi:
+    def __init__(self, latency_ms: float = 0.0, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.latency_ms = latency_ms
+        self.host = host
+        self.port = port
+        self.calls: List[ApiCall] = []
+        self.chats: Dict[int, ChatView] = {}
+        self._message_id = 0
+        self._runner: web.AppRunner | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # При port=0 порт выбирает ОС — узнаём, какой достался.
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def chat(self, chat_id: int) -> ChatView:
+        view = self.chats.get(chat_id)
+        if view is None:
+            view = self.chats[chat_id] = ChatView()
+        return view
+
+    def calls_by_method(self) -> Dict[str, int]:
+        result: Dict[str, int] = {}
+        for call in self.calls:
+            result[call.method] = result.get(call.method, 0) + 1
+        return result
+
+    async def _read_params(self, request: web.Request) -> Dict[str, Any]:
+        if request.content_type == "application/json":
+            return await request.json()
+        form = await request.post()
+        return {key: _decode(value) for key, value in form.items() if isinstance(value, str)}
+
+    def _message(self, chat_id: int, params: Dict[str, Any], message_id: int | None = None) -> Dict[str, Any]:
+        if message_id is None:
+            self._message_id += 1
+            message_id = self._message_id
+        text = params.get("text") or params.get("caption") or ""
+
+        view = self.chat(chat_id)
+        view.last_text = text
+        view.messages += 1
+        markup = params.get("reply_markup")
+        if markup is None and message_id == view.keyboard_message_id:
+            # Отредактированное сообщение без reply_markup теряет клавиатуру.
+            view.buttons = []
+        if isinstance(markup, dict) and "inline_keyboard" in markup:
+            view.keyboard_message_id = message_id
+            view.buttons = [
+                button["callback_data"]
+                for row in markup["inline_keyboard"]
+                for button in row
+                if button.get("callback_data")
+            ]
+
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": 1, "is_bot": True, "first_name": "BETH"},
+            "text": text,
+        }
+
+    def _result(self, method: str, params: Dict[str, Any]) -> Any:
+        name = method.lower()
+        chat_id = params.get("chat_id")
+        if name == "getme":
+            return {"id": 1, "is_bot": True, "first_name": "BETH", "username": "beth_bench_bot"}
+        if chat_id is None:
+            return True
+        chat_id = int(chat_id)
+        if name == "copymessage":
+            self._message_id += 1
+            return {"message_id": self._message_id}
+        if name == "sendmediagroup":
+            return [self._message(chat_id, params)]
+        if name.startswith("send") or name == "forwardmessage":
+            return self._message(chat_id, params)
+        if name.startswith("edit"):
+            message_id = params.get("message_id")
+            return self._message(chat_id, params, int(message_id) if message_id is not None else None)
+        return True
+
+    def record(self, method: str, params: Dict[str, Any]) -> Any:
+        """Записать вызов, обновить вид чата и вернуть результат, как Bot API."""
+        self.calls.append(ApiCall(method=method, params=params, at=time.perf_counter()))
+        return self._result(method, params)
+
+    def apply_webhook_reply(self, payload: Dict[str, Any]) -> None:
+        """Вызов из тела ответа вебхука Telegram выполнил бы сам — учитываем его так же."""
+        # Вложенные объекты в ответе вебхука сериализованы в строки, как в форме.
+        params = {key: _decode(value) if isinstance(value, str) else value for key, value in payload.items()}
+        method = params.pop("method", None)
+        if method:
+            self.record(method, params)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await self._read_params(request)
+        result = self.record(method, params)
+
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        return web.json_response({"ok": True, "result": result})
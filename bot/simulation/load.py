@@ -0,0 +1,389 @@
+"""
+Нагрузочный генератор: тысячи виртуальных игроков через вебхук.
+
+Поднимает aiohttp‑приложение `bot.server` в этом же процессе и шлёт ему
+апдейты обычными HTTP‑запросами на WEBHOOK_PATH — так же, как Telegram.
+Исходящие вызовы бота уходят в фейковый Bot API (fake_bot_api.py), ответы
+из тела вебхука учитываются там же, поэтому игроки видят все сообщения
+и кнопки. Игроки регистрируются через /start, встают в очередь слияний,
+торгуют в приюте, ходят в лабораторию и вводят промокоды — с паузами
+на «подумать» (экспоненциальное распределение со средним --think-ms).
+
+Прогон идёт ступенями по числу игроков (--players 50,200,1000): на каждой
+ступени — задержки запросов, ошибки, ожидание пула БД и исходы сервисов
+(слияния, гонки покупок в приюте). По таблице видно, с какого уровня
+конкуренции начинаются исчерпание пула, блокировки и гонки матчмейкинга.
+
+Запуск:
+    BENCH_DATABASE_URL=postgresql+asyncpg://localhost/beth_bench \\
+        python -m bot.simulation.load --players 50,200,1000 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import aiohttp
+
+from bot.simulation.fake_bot_api import FakeBotApi
+from bot.simulation.replay import (
+    LAB_TEXT,
+    MERGE_TEXT,
+    NOSHENIE_TEXT,
+    SHELTER_TEXT,
+    Harness,
+    Sample,
+    VirtualUser,
+    _PRICE_RANGE,
+    _percentile,
+)
+
+PROFILE_TEXT = "👤Профиль"
+MY_BETS_TEXT = "🐾Мои беты"
+
+# Доли поведенческих профилей среди игроков.
+PERSONA_WEIGHTS = {
+    "grinder": 0.40,
+    "merger": 0.25,
+    "trader": 0.20,
+    "casual": 0.15,
+}
+DEFAULT_THINK_MS = 1500
+# Сколько игрок ждёт партнёра в очереди слияний, прежде чем выйти из неё.
+MERGE_QUEUE_PATIENCE_SECONDS = 20.0
+HTTP_TIMEOUT_SECONDS = 60
+
+_CALLBACK_ID = re.compile(r":[-\d].*$")
+
+
+def _action_label(update: Dict[str, Any]) -> str:
+    """Имя действия для отчёта: текст кнопки/команды или callback_data без id."""
+    callback = update.get("callback_query")
+    if callback:
+        return _CALLBACK_ID.sub("", callback.get("data") or "")
+    text = (update.get("message") or {}).get("text") or ""
+    if text.isdigit():
+        return "<число>"
+    return text.split()[0] if text.startswith("/") else text
+
+
+class WebhookHarness(Harness):
+    """Подаёт апдейты HTTP‑запросами на вебхук вместо прямого вызова."""
+
+    def __init__(self, api: FakeBotApi, http: aiohttp.ClientSession, url: str, secret: str | None) -> None:
+        super().__init__(api, process_update=None)
+        self.http = http
+        self.url = url
+        self.headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+
+    async def feed(self, update: Dict[str, Any]) -> Sample:
+        error = None
+        started_at = time.perf_counter()
+        try:
+            async with self.http.post(self.url, json=update, headers=self.headers) as response:
+                body = await response.read()
+                if response.status != 200:
+                    error = f"HTTP {response.status}"
+                elif body:
+                    self.api.apply_webhook_reply(json.loads(body))
+        except Exception as e:
+            error = repr(e)
+        elapsed_ms = (time.perf_counter() - started_at) * 1000
+
+        sample = Sample(_action_label(update), elapsed_ms, 0, 0, error)
+        self.samples.append(sample)
+        return sample
+
+
+class LoadPlayer(VirtualUser):
+    """Виртуальный игрок с паузами между действиями."""
+
+    def __init__(self, harness: Harness, index: int, rng: random.Random, think_ms: float, deadline: float) -> None:
+        super().__init__(harness, index)
+        self.rng = rng
+        self.think_seconds = think_ms / 1000
+        self.deadline = deadline
+
+    @property
+    def active(self) -> bool:
+        return time.monotonic() < self.deadline
+
+    async def _think(self) -> None:
+        if self.think_seconds > 0:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think_seconds))
+
+    async def send(self, text: str) -> Sample:
+        await self._think()
+        return await super().send(text)
+
+    async def click(self, prefix: str, suffix: str = "") -> bool:
+        await self._think()
+        return await super().click(prefix, suffix)
+
+
+async def _lab_run(player: LoadPlayer) -> None:
+    await player.send(LAB_TEXT)
+    if not await player.click("lab:start:") or not await player.click("lab:duration:"):
+        return
+    # Ждать реальные 30+ минут нагрузочный прогон не может — перематываем время.
+    await player.harness.finish_lab(player.tg_id)
+    await player.send(LAB_TEXT)
+    await player.click("lab:collect:")
+
+
+async def grinder(player: LoadPlayer, args: argparse.Namespace) -> None:
+    """Ношения, иногда мульти‑ношение, лаборатория и профиль."""
+    # Текст кнопки — из клавиатуры бота; импорт здесь, после настройки окружения.
+    from bot.keyboards.keyborad import NOSHENIE_MULTI_TEXT
+
+    while player.active:
+        roll = player.rng.random()
+        if roll < 0.15:
+            await player.send(NOSHENIE_MULTI_TEXT)
+        elif roll < 0.75:
+            await player.send(NOSHENIE_TEXT)
+        elif roll < 0.90:
+            await _lab_run(player)
+        else:
+            await player.send(PROFILE_TEXT)
+
+
+async def merger(player: LoadPlayer, args: argparse.Namespace) -> None:
+    """Очередь слияний: найти партнёра, подтвердить, выбрать Бета."""
+    await player.send(NOSHENIE_TEXT)
+    while player.active:
+        await player.send(MERGE_TEXT)
+        if player.find_button("merge_cancel:"):
+            # Висим в старой сессии — выходим из неё и пробуем снова.
+            await player.click("merge_cancel:", ":yes")
+            continue
+        if not await player.wait_for_button("merge_confirm:", timeout=MERGE_QUEUE_PATIENCE_SECONDS):
+            player.harness.stuck_steps += 1
+            await player.send(MERGE_TEXT)
+            await player.click("merge_cancel:", ":yes")
+            continue
+        await player.click("merge_confirm:", ":yes")
+        if await player.wait_for_button("merge_pick:"):
+            await player.click("merge_pick:")
+        await player.send(NOSHENIE_TEXT)
+
+
+async def trader(player: LoadPlayer, args: argparse.Namespace) -> None:
+    """Выставляет Бетов в приют и покупает чужих."""
+    while player.active:
+        await player.send(SHELTER_TEXT)
+        if player.rng.random() < 0.5:
+            if not await player.click("shelter:sell"):
+                continue
+            if not player.find_button("shelter:sell_pick:"):
+                # Продавать нечего — добываем Бета.
+                await player.send(NOSHENIE_TEXT)
+                continue
+            await player.click("shelter:sell_pick:")
+            match = _PRICE_RANGE.search(player.last_text())
+            await player.send(match.group(1) if match else "100")
+        else:
+            if not await player.click("shelter:buy"):
+                continue
+            # Покупаем случайный из первых лотов — так покупатели чаще сталкиваются.
+            await player.send(str(player.rng.randint(1, 3)))
+            if player.find_button("shelter:buy_confirm:"):
+                await player.click("shelter:buy_confirm:")
+
+
+async def casual(player: LoadPlayer, args: argparse.Namespace) -> None:
+    """Заходит посмотреть: профиль, Беты, карточка Бета, промокод."""
+    while player.active:
+        roll = player.rng.random()
+        if roll < 0.35:
+            await player.send(PROFILE_TEXT)
+        elif roll < 0.70:
+            await player.send(MY_BETS_TEXT)
+            if player.find_button("bet:"):
+                await player.click("bet:")
+        elif roll < 0.85:
+            await player.send(f"/promo {args.promo_code}")
+        else:
+            await player.send(NOSHENIE_TEXT)
+
+
+PERSONAS = {
+    "grinder": grinder,
+    "merger": merger,
+    "trader": trader,
+    "casual": casual,
+}
+
+
+def _outcomes() -> Dict[Tuple[str, str], float]:
+    from bot.core.metrics import service_outcomes
+
+    return {
+        (sample["labels"]["service"], sample["labels"]["outcome"]): sample["value"]
+        for sample in service_outcomes.snapshot()
+    }
+
+
+async def run_level(
+    api: FakeBotApi,
+    http: aiohttp.ClientSession,
+    url: str,
+    players: int,
+    args: argparse.Namespace,
+) -> Dict[str, Any]:
+    from bot.core.config import WEBHOOK_SECRET
+    from bot.database.engine_profiles import pool_stats
+
+    harness = WebhookHarness(api, http, url, WEBHOOK_SECRET)
+    rng = random.Random(args.seed + players)
+    names = list(PERSONA_WEIGHTS)
+    weights = [PERSONA_WEIGHTS[name] for name in names]
+
+    pool_stats.reset()
+    api.calls.clear()
+    outcomes_before = _outcomes()
+    started_at = time.monotonic()
+    deadline = started_at + args.ramp + args.duration
+
+    async def run_player(index: int) -> None:
+        # Игроки подключаются равномерно за время разгона.
+        await asyncio.sleep(args.ramp * index / players)
+        player = LoadPlayer(harness, index, random.Random(rng.random()), args.think_ms, deadline)
+        await player.send("/start")
+        persona = rng.choices(names, weights)[0]
+        await PERSONAS[persona](player, args)
+
+    await asyncio.gather(*(run_player(index) for index in range(players)))
+    wall_seconds = time.monotonic() - started_at
+
+    outcomes = {
+        f"{service}:{outcome}": value - outcomes_before.get((service, outcome), 0.0)
+        for (service, outcome), value in _outcomes().items()
+        if value - outcomes_before.get((service, outcome), 0.0) > 0
+    }
+    latencies = [sample.ms for sample in harness.samples]
+    actions: Dict[str, List[float]] = {}
+    for sample in harness.samples:
+        actions.setdefault(sample.handler, []).append(sample.ms)
+
+    return {
+        "players": players,
+        "requests": len(harness.samples),
+        "wall_seconds": round(wall_seconds, 1),
+        "requests_per_second": round(len(harness.samples) / wall_seconds, 1) if wall_seconds else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50), 1),
+        "p95_ms": round(_percentile(latencies, 0.95), 1),
+        "p99_ms": round(_percentile(latencies, 0.99), 1),
+        "errors": sum(1 for sample in harness.samples if sample.error),
+        "first_errors": sorted({sample.error for sample in harness.samples if sample.error})[:5],
+        "stuck_steps": harness.stuck_steps,
+        "pool": pool_stats.as_dict(),
+        "outcomes": outcomes,
+        "bot_api_calls": len(api.calls),
+        "actions": {
+            name: {
+                "count": len(values),
+                "p95_ms": round(_percentile(values, 0.95), 1),
+            }
+            for name, values in sorted(actions.items())
+        },
+    }
+
+
+def _print_level(report: Dict[str, Any]) -> None:
+    pool = report["pool"]
+    print(
+        f"{report['players']:>8}{report['requests_per_second']:>10}{report['p50_ms']:>10}"
+        f"{report['p95_ms']:>10}{report['p99_ms']:>10}{report['errors']:>8}"
+        f"{pool['wait_max_ms']:>12}{pool['connects']:>8}{report['stuck_steps']:>10}"
+    )
+    interesting = {
+        key: value
+        for key, value in report["outcomes"].items()
+        if key.startswith(("merge", "shelter_buy")) or key.endswith("error")
+    }
+    if interesting:
+        print(f"{'':>8}исходы: {interesting}")
+    for error in report["first_errors"]:
+        print(f"{'':>8}! {error}")
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    from aiohttp import web
+    from aiogram.client.telegram import TelegramAPIServer
+
+    from bot.core.config import WEBHOOK_PATH
+    from bot.core.loader import bot
+    from bot.server import create_app
+
+    api = FakeBotApi(latency_ms=args.api_latency_ms)
+    await api.start()
+    bot.session.api = TelegramAPIServer.from_base(api.url)
+
+    runner = web.AppRunner(create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}{WEBHOOK_PATH}"
+
+    reports = []
+    connector = aiohttp.TCPConnector(limit=0)
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT_SECONDS)
+    try:
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http:
+            print(
+                f"{'игроков':>8}{'зап/с':>10}{'p50 мс':>10}{'p95 мс':>10}{'p99 мс':>10}"
+                f"{'ошибок':>8}{'пул, мс':>12}{'соедин.':>8}{'застряло':>10}"
+            )
+            for players in args.players:
+                report = await run_level(api, http, url, players, args)
+                reports.append(report)
+                _print_level(report)
+    finally:
+        # on_shutdown сервера сбросит буферы, закроет сессию бота и пул БД.
+        await runner.cleanup()
+        await api.stop()
+    return reports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочный генератор BETH через вебхук")
+    parser.add_argument("--url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument(
+        "--players",
+        type=lambda value: [int(item) for item in value.split(",")],
+        default=[50, 200, 1000],
+        help="Ступени по числу игроков через запятую",
+    )
+    parser.add_argument("--duration", type=float, default=60.0, help="Секунд на ступень после разгона")
+    parser.add_argument("--ramp", type=float, default=10.0, help="Секунд на подключение всех игроков")
+    parser.add_argument("--think-ms", type=float, default=DEFAULT_THINK_MS)
+    parser.add_argument("--api-latency-ms", type=float, default=30.0)
+    parser.add_argument("--promo-code", default="BENCH")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Куда сохранить отчёт в JSON")
+    args = parser.parse_args()
+
+    if not args.url:
+        sys.exit("Укажи отдельную базу для нагрузки через --url или BENCH_DATABASE_URL")
+
+    # Бот читает настройки при импорте — подменяем базу и токен до него.
+    os.environ["DATABASE_URL"] = args.url
+    os.environ.setdefault("BOT_TOKEN", "123456:bench")
+    # Вебхук в Telegram не регистрируем: апдейты шлёт сам генератор.
+    os.environ["WEBHOOK_URL"] = ""
+    from bot.main import _loop
+
+    reports = _loop.run_until_complete(run(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as target:
+            json.dump(reports, target, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""
+Бенчмарк пропускной способности: прогон потоков апдейтов через
+`bot.main._process_update` на локальном Postgres.
+
+Исходящие вызовы бота уходят в фейковый Bot API (fake_bot_api.py) в том же
+процессе. Виртуальные игроки пишут боту и нажимают кнопки из клавиатур,
+которые он им прислал, поэтому id Бетов, слияний и лотов берутся настоящие.
+Игроки идут параллельно, апдейты одного игрока — по очереди.
+
+Сценарии: pull_spam, lab_cycle, merge_matchmaking, shelter_trading;
+или записанный поток (`--updates updates.jsonl`, по апдейту Telegram на строку).
+Отчёт: апдейты в секунду, p50/p95/p99 по хендлерам, SQL на апдейт, вызовы Bot API.
+
+Запуск:
+    BENCH_DATABASE_URL=postgresql+asyncpg://localhost/beth_bench \\
+        python -m bot.simulation.replay --scenario pull_spam --users 200
+
+База должна быть отдельной: бенчмарк создаёт игроков и меняет их данные.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List
+
+from bot.simulation.fake_bot_api import FakeBotApi
+
+NOSHENIE_TEXT = "🤲🏻Ношение"
+LAB_TEXT = "🧪Лаборатория"
+MERGE_TEXT = "🧬Слияние"
+SHELTER_TEXT = "🏯Приют"
+
+# Сколько ждать кнопку, которую должен прислать ход другого игрока.
+WAIT_FOR_BUTTON_SECONDS = 10.0
+WAIT_POLL_SECONDS = 0.01
+
+_PRICE_RANGE = re.compile(r"от <b>(\d+)</b>")
+
+
+@dataclass
+class Sample:
+    handler: str
+    ms: float
+    statements: int
+    round_trips: int
+    error: str | None
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class Harness:
+    """Общая часть прогона: подача апдейтов, замеры, фейковый Bot API."""
+
+    def __init__(self, api: FakeBotApi, process_update: Callable[[Dict[str, Any]], Awaitable[None]]) -> None:
+        self.api = api
+        self.process_update = process_update
+        self.samples: List[Sample] = []
+        self.stuck_steps = 0
+        # Новые update_id и tg_id на каждый прогон, чтобы не упереться
+        # в processed_updates и в игроков прошлых запусков.
+        self._update_id = int(time.time() * 1000)
+        self.tg_id_base = 7_000_000_000 + random.randrange(1_000_000) * 1000
+
+    def next_update_id(self) -> int:
+        self._update_id += 1
+        return self._update_id
+
+    async def feed(self, update: Dict[str, Any]) -> Sample:
+        from bot.database.sql_stats import collect_sql
+
+        error = None
+        with collect_sql() as stats:
+            started_at = time.perf_counter()
+            try:
+                await self.process_update(update)
+            except Exception as e:
+                error = repr(e)
+            elapsed_ms = (time.perf_counter() - started_at) * 1000
+
+        handler = next((name for name in stats.scopes if name.startswith("handler:")), "unhandled")
+        sample = Sample(handler, elapsed_ms, stats.statements, stats.round_trips, error)
+        self.samples.append(sample)
+        return sample
+
+    async def finish_lab(self, tg_id: int) -> None:
+        """Перемотать время: все Беты игрока в лаборатории уже готовы."""
+        from sqlalchemy import select, update
+
+        from bot.database.models.base import async_session
+        from bot.database.models.bets.bet import Bet
+        from bot.database.models.players.player import Player
+        from bot.database.models.user import User
+
+        player_id = (
+            select(Player.id)
+            .join(User, User.id == Player.user_id)
+            .where(User.tg_id == tg_id)
+            .scalar_subquery()
+        )
+        async with async_session() as session:
+            await session.execute(
+                update(Bet)
+                .where(Bet.owner_id == player_id, Bet.in_lab == True)
+                .values(lab_ends_at=datetime.now(timezone.utc) - timedelta(seconds=1))
+            )
+            await session.commit()
+
+    def report(self, wall_seconds: float) -> Dict[str, Any]:
+        samples = self.samples
+        handlers: Dict[str, List[Sample]] = {}
+        for sample in samples:
+            handlers.setdefault(sample.handler, []).append(sample)
+
+        statements = [float(sample.statements) for sample in samples]
+        round_trips = [float(sample.round_trips) for sample in samples]
+        return {
+            "updates": len(samples),
+            "wall_seconds": round(wall_seconds, 3),
+            "updates_per_second": round(len(samples) / wall_seconds, 1) if wall_seconds else 0.0,
+            "errors": sum(1 for sample in samples if sample.error),
+            "stuck_steps": self.stuck_steps,
+            "sql_per_update": {
+                "mean": round(sum(statements) / len(statements), 2) if statements else 0.0,
+                "p95": _percentile(statements, 0.95),
+                "max": max(statements, default=0.0),
+            },
+            "round_trips_per_update": {
+                "mean": round(sum(round_trips) / len(round_trips), 2) if round_trips else 0.0,
+                "p95": _percentile(round_trips, 0.95),
+            },
+            "bot_api_calls": len(self.api.calls),
+            "bot_api_by_method": self.api.calls_by_method(),
+            "handlers": {
+                name: {
+                    "count": len(items),
+                    "p50_ms": round(_percentile([item.ms for item in items], 0.50), 2),
+                    "p95_ms": round(_percentile([item.ms for item in items], 0.95), 2),
+                    "p99_ms": round(_percentile([item.ms for item in items], 0.99), 2),
+                    "sql_mean": round(sum(item.statements for item in items) / len(items), 2),
+                    "errors": sum(1 for item in items if item.error),
+                }
+                for name, items in sorted(handlers.items())
+            },
+            "first_errors": sorted({sample.error for sample in samples if sample.error})[:5],
+        }
+
+
+class VirtualUser:
+    """Игрок, который пишет боту и нажимает кнопки из присланных клавиатур."""
+
+    def __init__(self, harness: Harness, index: int) -> None:
+        self.harness = harness
+        self.index = index
+        self.tg_id = harness.tg_id_base + index
+        self.profile = {"id": self.tg_id, "is_bot": False, "first_name": f"bench{index}"}
+
+    @property
+    def view(self):
+        return self.harness.api.chat(self.tg_id)
+
+    def last_text(self) -> str:
+        return self.view.last_text
+
+    def _chat(self) -> Dict[str, Any]:
+        return {"id": self.tg_id, "type": "private", "first_name": self.profile["first_name"]}
+
+    async def send(self, text: str) -> Sample:
+        update_id = self.harness.next_update_id()
+        return await self.harness.feed(
+            {
+                "update_id": update_id,
+                "message": {
+                    "message_id": update_id % 1_000_000_000,
+                    "date": int(time.time()),
+                    "chat": self._chat(),
+                    "from": self.profile,
+                    "text": text,
+                },
+            }
+        )
+
+    def find_button(self, prefix: str, suffix: str = "") -> str | None:
+        return next(
+            (data for data in self.view.buttons if data.startswith(prefix) and data.endswith(suffix)),
+            None,
+        )
+
+    async def click(self, prefix: str, suffix: str = "") -> bool:
+        """Нажать первую кнопку последней клавиатуры с таким началом (и концом) callback_data."""
+        view = self.view
+        data = self.find_button(prefix, suffix)
+        if data is None:
+            self.harness.stuck_steps += 1
+            return False
+
+        message_id = view.keyboard_message_id
+        # Клавиатура «использована»: следующий шаг ждёт новую.
+        view.buttons = []
+        update_id = self.harness.next_update_id()
+        await self.harness.feed(
+            {
+                "update_id": update_id,
+                "callback_query": {
+                    "id": str(update_id),
+                    "from": self.profile,
+                    "chat_instance": "bench",
+                    "data": data,
+                    "message": {
+                        "message_id": message_id,
+                        "date": int(time.time()),
+                        "chat": self._chat(),
+                        "text": view.last_text,
+                    },
+                },
+            }
+        )
+        return True
+
+    async def wait_for_button(self, prefix: str, timeout: float = WAIT_FOR_BUTTON_SECONDS) -> bool:
+        """Дождаться кнопки, которую пришлёт ход другого игрока."""
+        deadline = time.monotonic() + timeout
+        while self.find_button(prefix) is None:
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(WAIT_POLL_SECONDS)
+        return True
+
+
+async def pull_spam(user: VirtualUser, rounds: int) -> None:
+    """Ношения подряд: первое проходит, дальше — кулдаун и нехватка нейронов."""
+    await user.send("/start")
+    for _ in range(rounds):
+        await user.send(NOSHENIE_TEXT)
+
+
+async def lab_cycle(user: VirtualUser, rounds: int) -> None:
+    """Отправить Бета в лабораторию, «дождаться» и забрать награду."""
+    await user.send("/start")
+    await user.send(NOSHENIE_TEXT)
+    for _ in range(rounds):
+        await user.send(LAB_TEXT)
+        if not await user.click("lab:start:") or not await user.click("lab:duration:"):
+            return
+        await user.harness.finish_lab(user.tg_id)
+        await user.send(LAB_TEXT)
+        await user.click("lab:collect:")
+
+
+async def merge_matchmaking(user: VirtualUser, rounds: int) -> None:
+    """Очередь слияний: найти партнёра, подтвердить, выбрать Бета."""
+    await user.send("/start")
+    await user.send(NOSHENIE_TEXT)
+    for _ in range(rounds):
+        await user.send(MERGE_TEXT)
+        if not await user.wait_for_button("merge_confirm:"):
+            # Партнёр не нашёлся — выходим из очереди.
+            user.harness.stuck_steps += 1
+            await user.send(MERGE_TEXT)
+            await user.click("merge_cancel:", ":yes")
+            return
+        await user.click("merge_confirm:", ":yes")
+        if await user.wait_for_button("merge_pick:"):
+            await user.click("merge_pick:")
+
+
+async def shelter_trading(user: VirtualUser, rounds: int) -> None:
+    """Чётные игроки выставляют Бетов в приют, нечётные — покупают."""
+    await user.send("/start")
+    if user.index % 2 == 0:
+        await user.send(NOSHENIE_TEXT)
+        await user.send(SHELTER_TEXT)
+        if not await user.click("shelter:sell") or not await user.click("shelter:sell_pick:"):
+            return
+        match = _PRICE_RANGE.search(user.last_text())
+        await user.send(match.group(1) if match else "100")
+        return
+
+    for _ in range(rounds):
+        await user.send(SHELTER_TEXT)
+        if user.find_button("shelter:buy") and await user.click("shelter:buy"):
+            await user.send("1")
+            if user.find_button("shelter:buy_confirm:"):
+                await user.click("shelter:buy_confirm:")
+                continue
+        # Лотов пока нет — продавцы ещё не успели.
+        await asyncio.sleep(0.05)
+
+
+SCENARIOS: Dict[str, Callable[[VirtualUser, int], Awaitable[None]]] = {
+    "pull_spam": pull_spam,
+    "lab_cycle": lab_cycle,
+    "merge_matchmaking": merge_matchmaking,
+    "shelter_trading": shelter_trading,
+}
+
+
+async def _run_users(harness: Harness, scenario: str, users: int, rounds: int, concurrency: int) -> None:
+    script = SCENARIOS[scenario]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(index: int) -> None:
+        async with semaphore:
+            await script(VirtualUser(harness, index), rounds)
+
+    await asyncio.gather(*(run_one(index) for index in range(users)))
+
+
+async def _run_recorded(harness: Harness, path: str, concurrency: int) -> None:
+    """Записанный поток: по пользователям параллельно, внутри — в исходном порядке."""
+    streams: Dict[Any, List[Dict[str, Any]]] = {}
+    with open(path, encoding="utf-8") as source:
+        for line in source:
+            if not line.strip():
+                continue
+            update = json.loads(line)
+            event = next((value for key, value in update.items() if key != "update_id"), {})
+            user_id = (event.get("from") or {}).get("id") if isinstance(event, dict) else None
+            streams.setdefault(user_id, []).append(update)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_stream(updates: List[Dict[str, Any]]) -> None:
+        async with semaphore:
+            for update in updates:
+                await harness.feed({**update, "update_id": harness.next_update_id()})
+
+    await asyncio.gather(*(run_stream(updates) for updates in streams.values()))
+
+
+def _print_report(name: str, report: Dict[str, Any]) -> None:
+    print(f"\n=== {name} ===")
+    print(
+        f"Апдейтов: {report['updates']} за {report['wall_seconds']} с "
+        f"→ {report['updates_per_second']} апд/с; ошибок: {report['errors']}, "
+        f"застрявших шагов: {report['stuck_steps']}"
+    )
+    sql = report["sql_per_update"]
+    print(
+        f"SQL на апдейт: среднее {sql['mean']}, p95 {sql['p95']:g}, максимум {sql['max']:g}; "
+        f"round trip: среднее {report['round_trips_per_update']['mean']}"
+    )
+    print(f"Вызовов Bot API: {report['bot_api_calls']} {report['bot_api_by_method']}")
+    print(f"{'хендлер':<48}{'кол-во':>8}{'p50 мс':>10}{'p95 мс':>10}{'p99 мс':>10}{'SQL':>8}")
+    for handler, row in report["handlers"].items():
+        print(
+            f"{handler:<48}{row['count']:>8}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+            f"{row['p99_ms']:>10.2f}{row['sql_mean']:>8.2f}"
+        )
+    for error in report["first_errors"]:
+        print(f"  ! {error}")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from aiogram.client.telegram import TelegramAPIServer
+
+    from bot.core.loader import bot
+    from bot.database.request.profile_sync import flush_profiles
+    from bot.main import _ensure_initialized, _process_update
+    from bot.service.quote_service import close_quote_session
+
+    api = FakeBotApi(latency_ms=args.api_latency_ms)
+    await api.start()
+    bot.session.api = TelegramAPIServer.from_base(api.url)
+
+    reports: Dict[str, Any] = {}
+    try:
+        await _ensure_initialized()
+        names = [args.updates] if args.updates else args.scenario
+        for name in names:
+            harness = Harness(api, _process_update)
+            api.calls.clear()
+            started_at = time.perf_counter()
+            if args.updates:
+                await _run_recorded(harness, args.updates, args.concurrency)
+            else:
+                await _run_users(harness, name, args.users, args.rounds, args.concurrency)
+            report = harness.report(time.perf_counter() - started_at)
+            reports[name] = report
+            _print_report(name, report)
+
+        await flush_profiles(force=True)
+    finally:
+        await close_quote_session()
+        await bot.session.close()
+        await api.stop()
+    return reports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк BETH: прогон апдейтов через бота")
+    parser.add_argument("--url", default=os.getenv("BENCH_DATABASE_URL"))
+    parser.add_argument(
+        "--scenario",
+        nargs="+",
+        choices=sorted(SCENARIOS),
+        default=sorted(SCENARIOS),
+    )
+    parser.add_argument("--updates", help="JSONL с записанными апдейтами вместо сценариев")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--api-latency-ms", type=float, default=0.0)
+    parser.add_argument("--json", help="Куда сохранить отчёт в JSON")
+    args = parser.parse_args()
+
+    if not args.url:
+        sys.exit("Укажи отдельную базу для бенчмарка через --url или BENCH_DATABASE_URL")
+
+    # Бот читает настройки при импорте — подменяем базу и токен до него.
+    os.environ["DATABASE_URL"] = args.url
+    os.environ.setdefault("BOT_TOKEN", "123456:bench")
+    from bot.main import _loop
+
+    reports = _loop.run_until_complete(run(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as target:
+            json.dump(reports, target, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
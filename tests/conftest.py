@@ -0,0 +1,64 @@
+"""
+Общие фикстуры тестов: файл SQLite во временной папке вместо боевой БД.
+
+Окружение выставляется до первого импорта bot — config читает его при импорте.
+Файл, а не :memory:, чтобы параллельные сессии шли через разные соединения
+(гонки из тестов приюта должны быть настоящими).
+"""
+import os
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="beth-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_TMP_DIR}/beth_test.db"
+os.environ["BOT_TOKEN"] = "123456:test"
+os.environ["TOKEN"] = "123456:test"
+os.environ["QUOTES_OFFLINE"] = "1"
+os.environ["WEBHOOK_URL"] = ""
+
+import pytest
+
+from bot.core import idempotency
+from bot.database.models.base import Base, async_session, engine
+from bot.database.models.players.player import Player
+from bot.database.models.user import User
+from bot.database.request import identity, profile_sync
+from bot.main import _loop
+
+
+@pytest.fixture
+def run():
+    """Выполнить корутину в общем цикле бота (как handler облачной функции)."""
+    return _loop.run_until_complete
+
+
+@pytest.fixture(autouse=True)
+def clean_db():
+    """Пустая схема и пустые LRU‑кэши процесса перед каждым тестом."""
+
+    async def reset() -> None:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+    _loop.run_until_complete(reset())
+    identity._identity_cache.clear()
+    profile_sync._profile_cache.clear()
+    profile_sync._pending.clear()
+    idempotency._seen_updates.clear()
+    yield
+
+
+async def create_player(tg_id: int, neurons: int = 0) -> int:
+    """Создать пользователя и игрока напрямую, вернуть players.id."""
+    async with async_session() as session:
+        user = User(tg_id=tg_id, first_name=f"user{tg_id}")
+        player = Player(user=user, neurons=neurons)
+        session.add(player)
+        await session.commit()
+        return player.id
+
+
+async def get_neurons(player_id: int) -> int:
+    async with async_session() as session:
+        player = await session.get(Player, player_id)
+        return player.neurons
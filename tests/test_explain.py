@@ -0,0 +1,16 @@
+import os
+
+import pytest
+
+from bot.database.explain_check import DEFAULT_PLAYERS, run_check
+
+EXPLAIN_DATABASE_URL = os.getenv("EXPLAIN_DATABASE_URL")
+
+
+@pytest.mark.skipif(
+    not EXPLAIN_DATABASE_URL,
+    reason="нужен локальный Postgres в EXPLAIN_DATABASE_URL",
+)
+def test_hot_queries_use_indexes(run):
+    # Засев и схема живут в транзакции проверки и откатываются вместе с ней.
+    assert run(run_check(EXPLAIN_DATABASE_URL, DEFAULT_PLAYERS)) == []
@@ -0,0 +1,43 @@
+import pytest
+from aiogram.client.telegram import TelegramAPIServer
+
+from bot.core.loader import bot
+from bot.database.sql_stats import SqlBudgetExceeded, sql_budget
+from bot.simulation.fake_bot_api import FakeBotApi
+from bot.main import _ensure_initialized, _process_update
+from bot.simulation.replay import NOSHENIE_TEXT, Harness, VirtualUser
+
+
+@pytest.fixture
+def user(run):
+    """Игрок на фейковом Bot API, прошедший /start."""
+    api = FakeBotApi()
+    run(api.start())
+    original_api = bot.session.api
+    bot.session.api = TelegramAPIServer.from_base(api.url)
+    try:
+        run(_ensure_initialized())
+        user = VirtualUser(Harness(api, _process_update), 0)
+        sample = run(user.send("/start"))
+        assert sample.error is None
+        yield user
+    finally:
+        bot.session.api = original_api
+        run(api.stop())
+
+
+def test_noshenie_stays_within_sql_budget(run, user):
+    # Бесплатное ношение на SQLite: 8 SQL и BEGIN/COMMIT двух транзакций
+    # (claim_update и сам апдейт). Рост — повод посмотреть разбивку в ошибке.
+    with sql_budget(8, max_round_trips=12):
+        sample = run(user.send(NOSHENIE_TEXT))
+
+    assert sample.error is None
+    assert sample.handler == "handler:noshenie.noshenie_handler"
+    assert "Ношение завершено" in user.last_text()
+
+
+def test_sql_budget_reports_overrun(run, user):
+    with pytest.raises(SqlBudgetExceeded, match="SQL > 1"):
+        with sql_budget(1):
+            run(user.send(NOSHENIE_TEXT))
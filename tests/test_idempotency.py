@@ -0,0 +1,45 @@
+import pytest
+
+from bot.core import idempotency
+from bot.core.idempotency import claim_update, release_update
+
+
+def test_duplicate_update_is_dropped(run):
+    assert run(claim_update(100)) is True
+    # Повтор в этот же инстанс отсекает LRU.
+    assert run(claim_update(100)) is False
+
+    # Другой инстанс (или этот после перезапуска) упирается в первичный ключ.
+    idempotency._seen_updates.clear()
+    assert run(claim_update(100)) is False
+
+    assert run(claim_update(101)) is True
+
+
+def test_released_update_is_processed_again(run):
+    assert run(claim_update(100)) is True
+    run(release_update(100))
+    assert run(claim_update(100)) is True
+
+
+class _BrokenSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, *args, **kwargs):
+        raise ConnectionError("connection lost")
+
+
+def test_failed_claim_does_not_mark_update(run, monkeypatch):
+    monkeypatch.setattr(idempotency, "async_session", _BrokenSession)
+
+    with pytest.raises(ConnectionError):
+        run(claim_update(100))
+    assert 100 not in idempotency._seen_updates
+
+    # Ретрай от Telegram после восстановления соединения обрабатывается.
+    monkeypatch.undo()
+    assert run(claim_update(100)) is True
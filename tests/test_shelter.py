@@ -0,0 +1,85 @@
+import asyncio
+
+from sqlalchemy import select
+
+from bot.database.models.base import async_session
+from bot.database.models.bets.bet import Bet
+from bot.database.models.players.player import Player
+from bot.database.models.shelter import ShelterListing
+from bot.database.request.inventory import reconcile_inventory_counters
+from bot.service.shelter_service import buy_listing
+
+from conftest import create_player, get_neurons
+
+PRICE = 200
+
+
+async def _list_bet(seller_id: int) -> tuple[int, int]:
+    """Бет продавца в приюте с активным объявлением; вернуть (bet_id, listing_id)."""
+    async with async_session() as session:
+        seller = await session.get(Player, seller_id)
+        # Бет в приюте остаётся активным — он есть в обоих счётчиках.
+        seller.active_bets_count = 1
+        seller.shelter_bets_count = 1
+        bet = Bet(owner_id=seller_id, rarity="common", name="Тоша", in_shelter=True)
+        session.add(bet)
+        await session.flush()
+        listing = ShelterListing(bet_id=bet.id, seller_id=seller_id, price=PRICE)
+        session.add(listing)
+        await session.commit()
+        return bet.id, listing.id
+
+
+async def _buy(tg_id: int, listing_id: int) -> dict:
+    async with async_session() as session:
+        result = await buy_listing(session, tg_id, listing_id)
+        await session.commit()
+        return result
+
+
+def test_parallel_buyers_get_the_bet_once(run):
+    async def scenario():
+        seller_id = await create_player(1, neurons=0)
+        first_id = await create_player(2, neurons=1000)
+        second_id = await create_player(3, neurons=1000)
+        bet_id, listing_id = await _list_bet(seller_id)
+
+        results = await asyncio.gather(_buy(2, listing_id), _buy(3, listing_id))
+
+        assert sorted(result["ok"] for result in results) == [False, True]
+        loser = next(result for result in results if not result["ok"])
+        assert loser["reason"] == "not_found"
+
+        winner_id = first_id if results[0]["ok"] else second_id
+        loser_id = second_id if results[0]["ok"] else first_id
+        async with async_session() as session:
+            bet = await session.get(Bet, bet_id)
+            listing = await session.get(ShelterListing, listing_id)
+            assert (bet.owner_id, bet.in_shelter, listing.is_active) == (winner_id, False, False)
+            # Счётчики инвентаря сходятся с таблицей bets.
+            assert await reconcile_inventory_counters(session) == 0
+
+        assert await get_neurons(seller_id) == PRICE
+        assert await get_neurons(winner_id) == 1000 - PRICE
+        assert await get_neurons(loser_id) == 1000
+
+    run(scenario())
+
+
+def test_buy_without_funds_keeps_listing(run):
+    async def scenario():
+        seller_id = await create_player(1, neurons=0)
+        await create_player(2, neurons=PRICE - 1)
+        bet_id, listing_id = await _list_bet(seller_id)
+
+        result = await _buy(2, listing_id)
+
+        assert (result["ok"], result["reason"]) == (False, "not_enough_neurons")
+        async with async_session() as session:
+            listing = await session.get(ShelterListing, listing_id)
+            bet = await session.get(Bet, bet_id)
+            assert listing.is_active
+            assert (bet.owner_id, bet.in_shelter) == (seller_id, True)
+        assert await get_neurons(seller_id) == 0
+
+    run(scenario())
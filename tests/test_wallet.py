@@ -0,0 +1,98 @@
+from sqlalchemy import select
+
+from bot.database.models.base import async_session
+from bot.database.models.ledger import NeuronLedgerEntry
+from bot.database.models.players.player import Player
+from bot.database.request.wallet import debit, transfer
+
+from conftest import create_player, get_neurons
+
+
+async def _ledger(player_id: int) -> list[tuple[int, int, str]]:
+    async with async_session() as session:
+        rows = await session.execute(
+            select(
+                NeuronLedgerEntry.delta,
+                NeuronLedgerEntry.balance_after,
+                NeuronLedgerEntry.reason,
+            )
+            .where(NeuronLedgerEntry.player_id == player_id)
+            .order_by(NeuronLedgerEntry.id)
+        )
+        return [tuple(row) for row in rows]
+
+
+def test_debit_updates_loaded_player_and_ledger(run):
+    async def scenario():
+        player_id = await create_player(1, neurons=300)
+        async with async_session() as session:
+            player = await session.get(Player, player_id)
+            assert await debit(session, player_id, 140, reason="noshenie") == 160
+            # Загруженный объект обновлён значением из RETURNING.
+            assert player.neurons == 160
+            await session.commit()
+
+        assert await get_neurons(player_id) == 160
+        assert await _ledger(player_id) == [(-140, 160, "noshenie")]
+
+    run(scenario())
+
+
+def test_debit_refuses_to_go_negative(run):
+    async def scenario():
+        player_id = await create_player(1, neurons=100)
+        async with async_session() as session:
+            assert await debit(session, player_id, 140, reason="noshenie") is None
+            await session.commit()
+
+        assert await get_neurons(player_id) == 100
+        assert await _ledger(player_id) == []
+
+    run(scenario())
+
+
+def test_transfer_moves_neurons(run):
+    async def scenario():
+        buyer_id = await create_player(1, neurons=500)
+        seller_id = await create_player(2, neurons=10)
+        async with async_session() as session:
+            balances = await transfer(session, buyer_id, seller_id, 200, reason="shelter_sale")
+            await session.commit()
+
+        assert balances == (300, 210)
+        assert await get_neurons(buyer_id) == 300
+        assert await get_neurons(seller_id) == 210
+        assert await _ledger(buyer_id) == [(-200, 300, "shelter_sale")]
+        assert await _ledger(seller_id) == [(200, 210, "shelter_sale")]
+
+    run(scenario())
+
+
+def test_transfer_without_funds_changes_nothing(run):
+    async def scenario():
+        buyer_id = await create_player(1, neurons=50)
+        seller_id = await create_player(2, neurons=10)
+        async with async_session() as session:
+            assert await transfer(session, buyer_id, seller_id, 200, reason="shelter_sale") is None
+            await session.commit()
+
+        assert await get_neurons(buyer_id) == 50
+        assert await get_neurons(seller_id) == 10
+
+    run(scenario())
+
+
+def test_transfer_to_missing_player_refunds(run):
+    async def scenario():
+        buyer_id = await create_player(1, neurons=500)
+        async with async_session() as session:
+            assert await transfer(session, buyer_id, buyer_id + 100, 200, reason="shelter_sale") is None
+            await session.commit()
+
+        assert await get_neurons(buyer_id) == 500
+        assert await _ledger(buyer_id) == [
+            (-200, 300, "shelter_sale"),
+            (200, 500, "shelter_sale_refund"),
+        ]
+
+    run(scenario())